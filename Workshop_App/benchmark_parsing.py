@@ -0,0 +1,113 @@
+# Benchmark of the scraper's HTML parsing.
+
+# Compares parsing whole pages with the standard library parser, as the scraper used to,
+# against parsing only the target elements with the fastest available parser.
+# Usage: python benchmark_parsing.py [folder of saved pages] [--repeat N]
+# Saved pages are matched by name: instructor*.html, session*.html, participant*.html, as
+# recorded by the "capture_folder" setting (see fixture_site.py).
+# Without a folder, sample pages from sample_pages.py are used.
+
+
+import sys
+from argparse import ArgumentParser
+from glob import glob
+from os import path
+from time import perf_counter
+
+import page_parser
+import sample_pages
+
+
+PARSE_FUNCTIONS = {
+    "instructor": page_parser.parse_instructor_page,
+    "session": page_parser.parse_session_page,
+    "participant": page_parser.parse_participant_page,
+}
+
+
+def load_saved_pages(pages_folder: str) -> dict:
+    """Return the saved pages in the folder grouped by page kind."""
+
+    pages = {kind: list() for kind in PARSE_FUNCTIONS}
+
+    for kind in PARSE_FUNCTIONS:
+        for file_name in sorted(glob(path.join(pages_folder, f"{kind}*.html"))):
+            with open(file_name, "rb") as f:
+                pages[kind].append(f.read())
+
+    return pages
+
+
+def make_sample_pages(number_of_workshops: int = 50) -> dict:
+    """Return generated pages grouped by page kind."""
+
+    workshops: list = [sample_pages.make_workshop(100000 + number) for number in range(number_of_workshops)]
+
+    return {
+        "instructor": [sample_pages.make_instructor_page(workshops).encode()],
+        "session": [sample_pages.make_session_page(workshop).encode() for workshop in workshops],
+        "participant": [
+            sample_pages.make_participant_page(sample_pages.make_participants(workshop)).encode()
+            for workshop in workshops
+        ],
+    }
+
+
+def time_parsing(parse, pages: list, repeat: int, parser: str, strained: bool) -> float:
+    """Return the seconds taken to parse every page repeat times."""
+
+    start_time: float = perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page, parser=parser, strained=strained)
+
+    return perf_counter() - start_time
+
+
+def run_benchmark(pages: dict, repeat: int) -> dict:
+    """Time both parsing approaches for each page kind and return the results."""
+
+    results = dict()
+
+    for kind, parse in PARSE_FUNCTIONS.items():
+        if len(pages[kind]) == 0:
+            continue
+
+        # Both approaches must agree before their speed is worth comparing.
+        for page in pages[kind]:
+            assert parse(page, parser="html.parser", strained=False) == parse(page), f"{kind} results differ"
+
+        full_seconds: float = time_parsing(parse, pages[kind], repeat, "html.parser", False)
+        targeted_seconds: float = time_parsing(parse, pages[kind], repeat, page_parser.PARSER, True)
+        results[kind] = {
+            "pages": len(pages[kind]) * repeat,
+            "full_html_parser_seconds": full_seconds,
+            "targeted_seconds": targeted_seconds,
+            "speedup": full_seconds / targeted_seconds if targeted_seconds > 0 else 0.0,
+        }
+
+    return results
+
+
+def main() -> None:
+    """Run the parsing benchmark and print the results."""
+
+    argument_parser = ArgumentParser(description="Benchmark the scraper's HTML parsing.")
+    argument_parser.add_argument("pages_folder", nargs="?", help="Folder of saved pages.")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="Times to parse every page.")
+    arguments = argument_parser.parse_args()
+
+    pages: dict = load_saved_pages(arguments.pages_folder) if arguments.pages_folder else make_sample_pages()
+    results: dict = run_benchmark(pages, arguments.repeat)
+
+    print(f"Targeted parsing uses: {page_parser.PARSER}")
+    print(f"{'Page':<12}{'Pages':>8}{'Full (s)':>12}{'Targeted (s)':>15}{'Speedup':>10}")
+    for kind, result in results.items():
+        print(
+            f"{kind:<12}{result['pages']:>8}{result['full_html_parser_seconds']:>12.3f}"
+            f"{result['targeted_seconds']:>15.3f}{result['speedup']:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
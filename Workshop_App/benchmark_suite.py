@@ -0,0 +1,389 @@
+# End-to-end benchmark of the app on synthetic workshop catalogs.
+
+# For each catalog size the workshops are made up from the sample_pages.py templates and
+# every stage is timed on its own: parsing pages, ingesting into WorkshopDatabase, the
+# searches of WorkshopsTool, get_emails, building the Excel workbook and building the Google
+# Sheets requests against a fake service. Results are saved as JSON so runs on different
+# commits can be compared with --compare.
+# Usage: python benchmark_suite.py [--sizes 100 5000 50000] [--output FILE] [--compare FILE]
+
+
+import platform
+import subprocess
+from argparse import ArgumentParser
+from datetime import datetime
+from json import dump, dumps, load
+from os import chdir, getcwd, makedirs, path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Optional
+
+import page_parser
+import sample_pages
+from database import WorkshopDatabase
+from workshop_tool import WorkshopsTool
+
+
+DEFAULT_SIZES = [100, 5000, 50000]
+RESULTS_FOLDER = "benchmark_results"
+
+
+class FakeRequest:
+    """Stands in for a Google API request, returning a canned response."""
+
+    def __init__(self, response: dict):
+        self.response = response
+
+    def execute(self) -> dict:
+        return self.response
+
+
+class FakeSheetsService:
+    """
+    Stands in for the spreadsheets() resource of the Google Sheets API. Nothing is sent, the
+    calls, requests and JSON bytes that would have been sent are counted instead.
+    """
+
+    def __init__(self):
+        self.calls: int = 0
+        self.requests: int = 0
+        self.bytes: int = 0
+
+    def values(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId: str, body: dict) -> FakeRequest:
+        self.calls += 1
+        self.requests += len(body.get("requests", body.get("data", [])))
+        self.bytes += len(dumps(body))
+        return FakeRequest({})
+
+
+def measure(function: Callable, repeat: int = 1) -> tuple:
+    """Run function repeat times and return (fastest seconds, last result)."""
+
+    fastest: Optional[float] = None
+    result = None
+
+    for _ in range(repeat):
+        start_time: float = perf_counter()
+        result = function()
+        seconds: float = perf_counter() - start_time
+        if fastest == None or seconds < fastest:
+            fastest = seconds
+
+    return fastest, result
+
+
+def make_catalog(size: int, seed: int) -> list:
+    """Return the made up details of size workshops."""
+
+    return [sample_pages.make_workshop(100000 + number, seed) for number in range(size)]
+
+
+def make_crawled_workshop(ws: WorkshopsTool, workshop: dict, seed: int) -> dict:
+    """Return a workshop in the form a refresh produces, as if its pages had been scraped."""
+
+    stub: dict = {
+        "workshop_id": workshop["workshop_id"],
+        "workshop_start_date_and_time": workshop["start"],
+        "workshop_url": f'https://example.org/Session.aspx?id={workshop["workshop_id"]}',
+    }
+    session_information: dict = {
+        "name": workshop["name"],
+        "description": workshop["description"],
+        "seats_filled": f'{workshop["signed_up"]} / {workshop["capacity"]}',
+        "location": workshop["location"],
+        "dates": "_".join(workshop["dates"]),
+        "credits": workshop["credits"],
+        "fee": workshop["fee"],
+    }
+
+    return ws.complete_workshop(stub, session_information, sample_pages.make_participants(workshop, seed))
+
+
+def write_co_op_info() -> None:
+    """Write the co_op_names.json the exporters look locations up in."""
+
+    co_op_info: dict = {
+        co_op: {"abbr": "".join(word[0] for word in co_op.replace("/", " ").split()).upper() + "C", "pd_doc_text": f"{co_op} professional development"}
+        for co_op in sample_pages.CO_OPS
+    }
+
+    with open("co_op_names.json", "w") as f:
+        dump(co_op_info, f)
+
+
+def time_parsing(catalog: list, parse_sample: int, seed: int) -> dict:
+    """
+    Time parsing the session and participant pages of up to parse_sample workshops, the pages
+    ConnectionTool parses during a refresh, and estimate the time for the whole catalog.
+    """
+
+    sample: list = catalog[:parse_sample]
+    session_pages: list = [sample_pages.make_session_page(workshop).encode() for workshop in sample]
+    participant_pages: list = [
+        sample_pages.make_participant_page(sample_pages.make_participants(workshop, seed)).encode() for workshop in sample
+    ]
+
+    session_seconds, _ = measure(lambda: [page_parser.parse_session_page(page) for page in session_pages])
+    participant_seconds, _ = measure(lambda: [page_parser.parse_participant_page(page) for page in participant_pages])
+    seconds: float = session_seconds + participant_seconds
+    pages: int = len(session_pages) + len(participant_pages)
+
+    return {
+        "parser": page_parser.PARSER,
+        "pages": pages,
+        "session_seconds": session_seconds,
+        "participant_seconds": participant_seconds,
+        "pages_per_second": pages / seconds if seconds > 0 else 0.0,
+        "estimated_catalog_seconds": seconds * len(catalog) / len(sample) if len(sample) > 0 else 0.0,
+    }
+
+
+def time_ingest(ws: WorkshopsTool, catalog: list, seed: int, batch_size: int) -> dict:
+    """Time writing the catalog into a new database in batches, the way a refresh does."""
+
+    workshops = (make_crawled_workshop(ws, workshop, seed) for workshop in catalog)
+    rows: int = 0
+    seconds: float = 0.0
+
+    with WorkshopDatabase() as ws_db:
+        ws_db.create_workshop_tables()
+        batch = list()
+        for workshop in workshops:
+            batch.append(workshop)
+            if len(batch) == batch_size:
+                ingest_stats: dict = ws_db.add_workshops(batch)
+                rows += ingest_stats["rows"]
+                seconds += ingest_stats["seconds"]
+                batch.clear()
+        if len(batch) > 0:
+            ingest_stats: dict = ws_db.add_workshops(batch)
+            rows += ingest_stats["rows"]
+            seconds += ingest_stats["seconds"]
+
+    return {"workshops": len(catalog), "rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds > 0 else 0.0}
+
+
+def time_searches(ws: WorkshopsTool, catalog: list, repeat: int) -> dict:
+    """
+    Time each kind of WorkshopsTool search from the database and again from the search cache,
+    and return the seconds and result counts.
+    """
+
+    def search_phrase(phrase: str) -> list:
+        ws.set_search_phrase(phrase)
+        return ws.get_matching_workshops()
+
+    def search_date_range(start_date: tuple, end_date: tuple) -> list:
+        ws.set_search_phrase("")
+        return ws.get_matching_workshops_by_date_range(start_date, end_date)
+
+    searches: dict = {
+        "phrase_common": lambda: search_phrase("python"),
+        "phrase_two_words": lambda: search_phrase("advanced robotics"),
+        "phrase_none": lambda: search_phrase("no such workshop"),
+        "date_range_year": lambda: search_date_range((2022, 1, 1), (2022, 12, 31)),
+        "workshop_id": lambda: ws.get_matching_workshops_by_id(catalog[len(catalog) // 2]["workshop_id"]),
+        "all_workshops": lambda: search_phrase(""),
+    }
+
+    def search_uncached(search: Callable[[], list]) -> list:
+        ws.search_cache.clear()
+        return search()
+
+    results = dict()
+    for name, search in searches.items():
+        seconds, workshops = measure(lambda: search_uncached(search), repeat)
+        results[name] = {"seconds": seconds, "results": len(workshops)}
+
+        # The same search again is answered by the search cache.
+        seconds, workshops = measure(search, repeat)
+        results[f"{name}_cached"] = {"seconds": seconds, "results": len(workshops)}
+
+    return results
+
+
+def time_emails(ws: WorkshopsTool, repeat: int) -> dict:
+    """Time get_emails over every workshop."""
+
+    ws.set_search_phrase("")
+    ws.get_matching_workshops()
+    seconds, emails = measure(ws.get_emails, repeat)
+
+    return {"seconds": seconds, "workshops": ws.get_number_of_workshops(), "characters": len(emails)}
+
+
+def time_excel_export(ws: WorkshopsTool, export_limit: int) -> dict:
+    """Time building and saving the Excel workbook for up to export_limit workshops."""
+
+    try:
+        from excel_creator import ExcelCreator
+    except ImportError as error:
+        return {"skipped": str(error)}
+
+    ws.set_search_phrase("")
+    ws.set_search_results(ws.get_matching_workshops()[:export_limit])
+
+    build_seconds, workbook = measure(lambda: ExcelCreator().build_workbook(ws))
+    save_seconds, _ = measure(lambda: workbook.save(filename="benchmark.xlsx"))
+
+    return {
+        "workshops": ws.get_number_of_workshops(),
+        "build_seconds": build_seconds,
+        "save_seconds": save_seconds,
+        "bytes": path.getsize("benchmark.xlsx"),
+    }
+
+
+def time_google_export(ws: WorkshopsTool, export_limit: int) -> dict:
+    """Time building the Google Sheets requests for up to export_limit workshops against a fake service."""
+
+    try:
+        from google_sheets_creator import GoogleSheetCreator
+        from google_sheets_tool import GoogleSheetsTool
+    except ImportError as error:
+        return {"skipped": str(error)}
+
+    ws.set_search_phrase("")
+    ws.set_search_results(ws.get_matching_workshops()[:export_limit])
+
+    gs = GoogleSheetsTool()
+    fake_service = FakeSheetsService()
+    gs.sheet = fake_service
+    seconds, _ = measure(lambda: GoogleSheetCreator().write_workshops(ws, gs))
+
+    return {
+        "workshops": ws.get_number_of_workshops(),
+        "seconds": seconds,
+        "api_calls": fake_service.calls,
+        "requests": fake_service.requests,
+        "bytes": fake_service.bytes,
+    }
+
+
+def run_size(size: int, seed: int, parse_sample: int, export_limit: int, batch_size: int, repeat: int) -> dict:
+    """Run every stage on a catalog of size workshops in a scratch folder."""
+
+    catalog: list = make_catalog(size, seed)
+    ws = WorkshopsTool()
+    results = {"workshops": size}
+    working_folder: str = getcwd()
+
+    with TemporaryDirectory() as scratch_folder:
+        # WorkshopsTool and the exporters use files in the working folder.
+        chdir(scratch_folder)
+        try:
+            write_co_op_info()
+            results["parse"] = time_parsing(catalog, parse_sample, seed)
+            results["ingest"] = time_ingest(ws, catalog, seed, batch_size)
+            results["participants"] = sum(workshop["signed_up"] for workshop in catalog)
+            results["search"] = time_searches(ws, catalog, repeat)
+            results["emails"] = time_emails(ws, repeat)
+            results["excel_export"] = time_excel_export(ws, export_limit)
+            results["google_export"] = time_google_export(ws, export_limit)
+        finally:
+            chdir(working_folder)
+
+    return results
+
+
+def get_commit() -> Optional[str]:
+    """Return the current git commit or None outside a git checkout."""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_stage_seconds(size_results: dict) -> dict:
+    """Flatten the results of one size into stage name: seconds for comparisons."""
+
+    stages = dict()
+    for stage, stage_results in size_results.items():
+        if not isinstance(stage_results, dict):
+            continue
+        if "seconds" in stage_results:
+            stages[stage] = stage_results["seconds"]
+        for name, value in stage_results.items():
+            if isinstance(value, dict) and "seconds" in value:
+                stages[f"{stage}.{name}"] = value["seconds"]
+            elif name.endswith("_seconds") and name != "estimated_catalog_seconds":
+                stages[f"{stage}.{name[:-len('_seconds')]}"] = value
+
+    return stages
+
+
+def print_results(results: dict, previous: Optional[dict]) -> None:
+    """Print the seconds of every stage, with the change from a previous run when given."""
+
+    for size, size_results in results["sizes"].items():
+        previous_stages: dict = get_stage_seconds(previous["sizes"][size]) if previous != None and size in previous["sizes"] else dict()
+        print(f"\n{size} workshops, {size_results['participants']} participants")
+        print(f"{'Stage':<32}{'Seconds':>10}{'Previous':>10}{'Change':>9}")
+        for stage, seconds in get_stage_seconds(size_results).items():
+            if stage in previous_stages and previous_stages[stage] > 0:
+                change: str = f"{seconds / previous_stages[stage] - 1:+.0%}"
+                print(f"{stage:<32}{seconds:>10.3f}{previous_stages[stage]:>10.3f}{change:>9}")
+            else:
+                print(f"{stage:<32}{seconds:>10.3f}")
+
+
+def main() -> None:
+    """Run the benchmark for each size and save the results."""
+
+    argument_parser = ArgumentParser(description="Benchmark the app on synthetic workshop catalogs.")
+    argument_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--parse-sample", type=int, default=500, help="workshops whose pages are parsed")
+    argument_parser.add_argument("--export-limit", type=int, default=500, help="workshops exported to Excel and Google Sheets")
+    argument_parser.add_argument("--batch-size", type=int, default=50, help="workshops per database transaction")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="runs of each search, the fastest counts")
+    argument_parser.add_argument("--output", help=f"results file, by default in {RESULTS_FOLDER}/")
+    argument_parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    arguments = argument_parser.parse_args()
+
+    results: dict = {
+        "commit": get_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "seed": arguments.seed,
+            "parse_sample": arguments.parse_sample,
+            "export_limit": arguments.export_limit,
+            "batch_size": arguments.batch_size,
+            "repeat": arguments.repeat,
+        },
+        "sizes": dict(),
+    }
+
+    for size in arguments.sizes:
+        print(f"Benchmarking {size} workshops...")
+        results["sizes"][str(size)] = run_size(
+            size, arguments.seed, arguments.parse_sample, arguments.export_limit, arguments.batch_size, arguments.repeat
+        )
+
+    output_file: Optional[str] = arguments.output
+    if output_file == None:
+        makedirs(RESULTS_FOLDER, exist_ok=True)
+        output_file = path.join(RESULTS_FOLDER, f"{datetime.now():%Y%m%d_%H%M%S}_{results['commit'] or 'unknown'}.json")
+
+    with open(output_file, "w") as f:
+        dump(results, f, indent=4)
+
+    previous: Optional[dict] = None
+    if arguments.compare != None:
+        with open(arguments.compare, "r") as f:
+            previous = load(f)
+
+    print_results(results, previous)
+    print(f"\nResults saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,23 @@
 
 # from requests_html import Element, HTMLSession, HTMLResponse
 from requests import Session
-from bs4 import BeautifulSoup
+from page_parser import parse_instructor_page, parse_session_page, parse_participant_page, parse_login_fields, is_login_page
 from json import load, dump
+from http_cache import ResponseCache
+from http_client import ResilientHttpClient, make_client_settings
+from fixture_site import PageRecorder, get_fixture_urls
+from instrumentation import span
+from os import open as open_file, fdopen, chmod, replace, remove, path, O_WRONLY, O_CREAT, O_TRUNC
+from threading import Lock
+from time import time
+from typing import Callable, Optional
+
+
+COOKIE_FILE = "session_cookies.json"
+
+
+class LoginFailed(Exception):
+    """Raised when the site still returns the sign-in page right after signing in."""
 
 
 class ConnectionTool:
@@ -13,85 +28,306 @@ class ConnectionTool:
     def __init__(self):
         self.session: Session = Session()
         self.connection_info: dict = self.setup_connection_info()
+        self.client = ResilientHttpClient(self.session, make_client_settings(self.connection_info))
+        self.logged_in: bool = False
+        # Counts sign-ins so crawl threads that all hit an expired session sign in only once.
+        self.login_generation: int = 0
+        self.login_lock = Lock()
+        self.recorder: Optional[PageRecorder] = self.setup_page_recorder()
+        self.cache: Optional[ResponseCache] = self.setup_response_cache()
+
+
+    def ensure_logged_in(self) -> None:
+        """
+        Sign in the first time a page is requested so the app can start without the network.
+        Cookies saved by an earlier run are tried first, get_page signs in again if they expired.
+        """
 
-        self.intial_connection()
+        with self.login_lock:
+            if not self.logged_in:
+                if not self.load_cookies():
+                    self.intial_connection()
+                self.logged_in = True
 
 
     def intial_connection(self) -> None:
         """Establishes an initial connection to the sign-in page."""
 
-        login_page_content = self.session.get(self.connection_info["signin_page_url"])            
-        login_data: dict = self.setup_login_information(login_page_content)
+        with span("login"):
+            login_page_content = self.client.get(self.connection_info["signin_page_url"])
+            self.record_page(self.connection_info["signin_page_url"], login_page_content)
+            login_data: dict = self.setup_login_information(login_page_content)
+
+            self.client.post(self.connection_info["signin_page_url"], data=login_data)
+        self.login_generation += 1
+        self.save_cookies()
+
+
+    def get_page(self, url: str, headers: Optional[dict] = None):
+        """
+        Request a page with the signed in session. When the site answers with the sign-in page
+        because the session expired, sign in again and repeat the request once.
+        """
+
+        self.ensure_logged_in()
+        login_generation: int = self.login_generation
+
+        with span("fetch"):
+            response = self.client.get(url, headers=headers)
+        if not self.is_login_response(response):
+            self.record_page(url, response)
+            return response
+
+        self.login_again(login_generation)
+
+        with span("fetch"):
+            response = self.client.get(url, headers=headers)
+        if self.is_login_response(response):
+            raise LoginFailed(f"Still signed out after signing in again to request {url}")
+
+        self.record_page(url, response)
+
+        return response
+
+
+    def record_page(self, url: str, response) -> None:
+        """Save a scrubbed copy of a downloaded page when capturing pages."""
+
+        if self.recorder != None and response.status_code == 200:
+            self.recorder.record(url, response.content)
+
+
+    def is_login_response(self, response) -> bool:
+        """Return True if a response is the sign-in page rather than the requested page."""
+
+        return response.status_code == 200 and is_login_page(response.content)
+
+
+    def login_again(self, login_generation: int) -> None:
+        """Sign in again unless another thread already did since login_generation was read."""
+
+        with self.login_lock:
+            if self.login_generation == login_generation:
+                print("Session expired, signing in again.")
+                self.session.cookies.clear()
+                self.intial_connection()
+
+
+    def save_cookies(self) -> None:
+        """
+        Keep the session cookies in COOKIE_FILE for the next run. The cookies are stored in
+        plaintext. The file is created readable by the current user only on POSIX systems, on
+        Windows it gets the permissions of its folder, and it is replaced in one step so it is
+        never left half written.
+        """
+
+        cookies: list = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": cookie.expires,
+                "secure": cookie.secure,
+            }
+            for cookie in self.session.cookies
+        ]
+        temporary_file: str = f"{COOKIE_FILE}.tmp"
+
+        with fdopen(open_file(temporary_file, O_WRONLY | O_CREAT | O_TRUNC, 0o600), "w") as f:
+            dump({"user_name": self.connection_info.get("user_name"), "cookies": cookies}, f)
+        chmod(temporary_file, 0o600)
+        replace(temporary_file, COOKIE_FILE)
+
+
+    def load_cookies(self) -> bool:
+        """
+        Put the cookies saved for the current user back into the session. Returns False when
+        there are none, or they all expired, so a normal sign-in is needed.
+        """
+
+        if not path.exists(COOKIE_FILE):
+            return False
+
+        try:
+            with open(COOKIE_FILE, "r") as f:
+                saved: dict = load(f)
+        except ValueError:
+            return False
+
+        if saved.get("user_name") != self.connection_info.get("user_name"):
+            return False
+
+        now: float = time()
+        cookies: list = [cookie for cookie in saved.get("cookies", []) if cookie["expires"] == None or cookie["expires"] > now]
+
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie["domain"],
+                path=cookie["path"],
+                expires=cookie["expires"],
+                secure=cookie["secure"]
+            )
+
+        return len(cookies) > 0
+
+
+    def forget_cookies(self) -> None:
+        """Drop the session cookies, in memory and on disk."""
+
+        self.session.cookies.clear()
+        if path.exists(COOKIE_FILE):
+            remove(COOKIE_FILE)
 
-        self.session.post(self.connection_info["signin_page_url"], data=login_data)
 
     def get_instructor_page(self) -> list:
         """Scrapes the workshop information from the instructor page."""
 
-        html = self.session.get(self.connection_info["instructor_page_url"])
-        bs_obj = BeautifulSoup(html.content, "html.parser")
-
-        # Convert the workshopContent into a list of lists skipping the first row of the table:
-        # ['Workshop Name', 'Workshop Date and Time', 'Workshop Enrollment']
-        workshops_table = []
-        for workshop in bs_obj.find("table", class_="mainBody").find_all("tr")[1:]:
-            elements = workshop.find_all("td")[1:]
-            name = elements[0].find("em").text
-            date = str(elements[0]).split("<br/>")[1][0:-5]
-            signed_up = elements[1].text
-            workshops_table.append([name, date, signed_up])
-        
-        return workshops_table
+        html = self.get_page(self.connection_info["instructor_page_url"])
 
+        with span("parse"):
+            return parse_instructor_page(html.content)
 
 
     def get_session_page_content(self, session_url: str) -> dict:
         """Returns the location and dates from session page."""
 
-        session_page_html: Session = self.session.get(session_url)
-        
-        bs_obj = BeautifulSoup(session_page_html.content, "html.parser")
-        workshop_information = dict()
+        return self.get_cached_page(session_url, parse_session_page)
 
-        date_and_location_table = bs_obj.find(class_="form-group col-xs-12 col-sm-12 mainBodySmall").find_all("tr")[2:]
-        date_and_location_filtered_content = [x.text.strip().split("\n") for x in date_and_location_table if len(x.text.strip()) > 0]
-        dates = [x[0] for x in date_and_location_filtered_content]
 
-        workshop_information["name"] = bs_obj.find(id="ctl00_mainBody_lblTitle").text
-        workshop_information["dates"] = "_".join(dates)
-        workshop_information["location"] = date_and_location_filtered_content[0][2]
-        workshop_information["description"] = bs_obj.find(id="ctl00_mainBody_lblDescription").text
-        workshop_information["fee"] = bs_obj.find(id="ctl00_mainBody_lblFee").text
-        workshop_information["credits"] = bs_obj.find(id="ctl00_mainBody_lblCredits").text
-        workshop_information["seats_filled"] = bs_obj.find(id="ctl00_mainBody_lblSeatsFilled").text
+    def get_participant_page(self, id: str) -> list:
+        """Scrapes the participant information for a target workshop based in provided ID."""
 
-        return workshop_information
+        return self.get_cached_page(self.get_participant_page_url(id), parse_participant_page)
 
 
+    def get_participant_page_url(self, id: str) -> str:
+        """Return the URL of the participant page of a workshop."""
 
-    def get_participant_page(self, id: str) -> list:
-        """Scrapes the participant information for a target workshop based in provided ID."""
+        return f'{self.connection_info["participant_page_base_url"]}{id}'
 
-        participant_url: str = f'{self.connection_info["participant_page_base_url"]}{id}'
-        page_html: Session = self.session.get(participant_url)
-        bs_obj = BeautifulSoup(page_html.content, "html.parser")
-        elements = bs_obj.find(id="RadGrid1_ctl00").find_all("tr")[1:]
 
-        participants = []
+    def get_cached_page(self, url: str, parse: Callable):
+        """
+        Request a page and return it parsed. With the response cache enabled the request is
+        conditional, and a 304 response or a body identical to the cached one reuses the
+        cached result instead of parsing the page again.
+        """
 
-        for element in elements:
-            signed_up = element.find_all("td")[1:]
-            if len(signed_up) > 0:
-                participants.append([signed_up[0].text, signed_up[1].text, signed_up[2].text])
-        
-        return participants
+        page: dict = self.fetch_page(url)
+        if page["parsed"] != None:
+            return page["parsed"]
+
+        with span("parse"):
+            parsed = parse(page["content"])
+        self.store_parsed_page(page, parsed)
+
+        return parsed
+
+
+    def fetch_page(self, url: str) -> dict:
+        """
+        Request a page without parsing it. Returns a dictionary with the url, the raw content
+        and response headers, and the cached parse under "parsed" when the cache shows the
+        page has not changed. "parsed" is None when the content still has to be parsed.
+        """
+
+        if self.cache == None:
+            response = self.get_page(url)
+            return {"url": url, "content": response.content, "headers": response.headers, "parsed": None}
+
+        response = self.get_page(url, headers=self.cache.get_conditional_headers(url))
+
+        if response.status_code == 304:
+            parsed = self.cache.get_not_modified(url)
+            if parsed != None:
+                return {"url": url, "content": None, "headers": response.headers, "parsed": parsed}
+            # The cache entry was evicted in the meantime, so ask again without validators.
+            response = self.get_page(url)
+
+        return {
+            "url": url,
+            "content": response.content,
+            "headers": response.headers,
+            "parsed": self.cache.get_unchanged(url, response.content),
+        }
+
+
+    def store_parsed_page(self, page: dict, parsed) -> None:
+        """Keep the parse of a page fetched with fetch_page in the response cache."""
+
+        if self.cache != None and page["parsed"] == None:
+            self.cache.store(page["url"], page["headers"], page["content"], parsed)
+
+
+    def set_pool_size(self, pool_size: int) -> None:
+        """Allow up to pool_size concurrent connections to be kept open by the session."""
+
+        self.client.set_pool_size(pool_size)
+
+
+    def setup_page_recorder(self) -> Optional[PageRecorder]:
+        """
+        Save scrubbed copies of the downloaded pages into the "capture_folder" of
+        connection_info.json, when it is set, for the fixture server and the benchmarks.
+        """
+
+        if not self.connection_info.get("capture_folder"):
+            return None
+
+        return PageRecorder(self.connection_info["capture_folder"], self.connection_info)
+
+
+    def setup_response_cache(self) -> Optional[ResponseCache]:
+        """
+        Open the persistent page cache unless "http_cache" is false in connection_info.json.
+        Its size is limited by "http_cache_max_mb" (default 200). While capturing pages the
+        cache is not used, so every page is downloaded and recorded.
+        """
+
+        if not self.connection_info.get("http_cache", True) or self.recorder != None:
+            return None
+
+        max_megabytes: float = float(self.connection_info.get("http_cache_max_mb", 200))
+
+        return ResponseCache(max_bytes=int(max_megabytes * 1024 * 1024))
+
+
+    def reset_stats(self) -> None:
+        """Clear the page cache counters and request latencies, usually at the start of a refresh."""
+
+        if self.cache != None:
+            self.cache.reset_stats()
+        self.client.latencies.reset()
+
+
+    def get_latency_stats(self) -> dict:
+        """Return the request latency percentiles of each endpoint."""
+
+        return self.client.get_latency_stats()
+
+
+    def get_cache_stats(self) -> Optional[dict]:
+        """Return the page cache hit and miss counters or None if the cache is disabled."""
+
+        return self.cache.get_stats() if self.cache != None else None
 
 
     def setup_connection_info(self) -> dict:
-        """Load and get the Url information from the connection_info.json file."""
+        """
+        Load and get the Url information from the connection_info.json file. A "fixture_site_url"
+        entry replaces the page URLs with those of a fixture server, see fixture_site.py.
+        """
 
         with open("connection_info.json", "r") as f:
-            return load(f)
+            connection_info: dict = load(f)
+
+        if connection_info.get("fixture_site_url"):
+            connection_info.update(get_fixture_urls(connection_info["fixture_site_url"]))
+
+        return connection_info
 
 
     def get_connection_info_for(self, item: str) -> str:
@@ -113,6 +349,12 @@ class ConnectionTool:
             connection_info["password"] = user_password
             dump(connection_info, f, indent=4)
 
+        # Sign in again with the new credentials on the next request.
+        self.connection_info["user_name"] = user_name
+        self.connection_info["password"] = user_password
+        self.forget_cookies()
+        self.logged_in = False
+
 
     def setup_login_information(self, login_page_content) -> dict:
         """Setup login information and return it."""
@@ -123,16 +365,16 @@ class ConnectionTool:
             "ctl00$mainBody$btnSubmit": "Submit",
         }
 
-        bs_obj = BeautifulSoup(login_page_content.content, "html.parser")
-        login_data["__EVENTVALIDATION"] = bs_obj.find("input", attrs={"name":"__EVENTVALIDATION"})["value"]
-        login_data["__VIEWSTATE"] = bs_obj.find("input", attrs={"name":"__VIEWSTATE"})["value"]
+        login_data.update(parse_login_fields(login_page_content.content))
 
         return login_data
 
 
     def close_session(self) -> None:
-        """For good measures, closes the HTMLSession."""
+        """For good measures, closes the HTMLSession. Cookies the site renewed are saved first."""
 
+        if self.logged_in:
+            self.save_cookies()
         self.session.close()
 
 
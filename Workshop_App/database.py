@@ -1,19 +1,65 @@
 from sqlite3 import connect, OperationalError
+from datetime import datetime, date
+from typing import Optional
+from os import path, remove
+from time import perf_counter
+from threading import Event
+from search_index import get_words
+
+
+DATABASE_FILE = "workshops.db"
+
+# Stored in PRAGMA user_version. Databases from before versioning report 0.
+SCHEMA_VERSION = 1
+
+# SQLite virtual machine steps between checks of a search's cancel event.
+CANCEL_CHECK_STEPS = 1000
+
+# database_info entry counting the writes to the workshops, so cached searches can tell
+# whether they are still current.
+GENERATION_INFO = "generation"
+
+WORKSHOP_COLUMNS = (
+    "workshop_id",
+    "workshop_start_date_and_time",
+    "workshop_url",
+    "workshop_name",
+    "workshop_description",
+    "workshop_signed_up",
+    "workshop_participant_capacity",
+    "workshop_location",
+    "workshop_credits",
+    "workshop_fees",
+    "workshop_refreshed_at",
+    "workshop_start"
+)
 
 
 class WorkshopDatabase:
     """Database to store workshop information for quicker access during use."""
 
-    def __init__(self):
-        self.connection = connect("workshops.db")
+    def __init__(self, database_file: str = DATABASE_FILE):
+        self.database_file = database_file
+        self.connection = connect(database_file)
         self.c = self.connection.cursor()
+        self.cancel_event: Optional[Event] = None
 
+        # WAL lets searches read while a refresh writes, and NORMAL sync is safe under WAL.
+        self.c.execute("PRAGMA journal_mode = WAL;")
+        self.c.execute("PRAGMA synchronous = NORMAL;")
 
-    def create_workshop_tables(self) -> None:
-        """Setup workshop database."""
+        self.migrate_schema()
 
-        # Clear the tables in the database.
-        self.drop_tables()
+
+    def create_workshop_tables(self, clear: bool = True) -> None:
+        """Setup workshop database. Existing tables are kept when clear is False."""
+
+        generation: int = 0
+        if clear:
+            # The generation outlives the tables so searches cached before the clear stay stale.
+            generation = self.get_generation()
+            # Clear the tables in the database.
+            self.drop_tables()
 
         self.c.execute(
             """CREATE TABLE IF NOT EXISTS workshops (
@@ -23,12 +69,22 @@ class WorkshopDatabase:
                 workshop_url TEXT NOT NULL,
                 workshop_name TEXT NOT NULL,
                 workshop_description TEXT NOT NULL,
-                workshop_signed_up TEXT NOT NULL,
-                workshop_participant_capacity TEXT NOT NULL,
+                workshop_signed_up INTEGER NOT NULL,
+                workshop_participant_capacity INTEGER NOT NULL,
                 workshop_location TEXT NOT NULL,
-                workshop_dates TEXT NOT NULL,
                 workshop_credits TEXT NOT NULL,
-                workshop_fees TEXT NOT NULL
+                workshop_fees TEXT NOT NULL,
+                workshop_refreshed_at DATETIME NOT NULL,
+                workshop_start DATETIME
+            );"""
+        )
+
+        # One row per session date, stored as YYYY-MM-DD.
+        self.c.execute(
+            """CREATE TABLE IF NOT EXISTS workshop_dates (
+                id INTEGER PRIMARY KEY,
+                workshop_id TEXT NOT NULL,
+                session_date DATE NOT NULL
             );"""
         )
 
@@ -42,85 +98,520 @@ class WorkshopDatabase:
             );"""
         )
 
+        self.c.execute(
+            """CREATE TABLE IF NOT EXISTS database_info (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );"""
+        )
+        if generation > 0:
+            self.set_info(GENERATION_INFO, str(generation + 1))
+
+        self.create_indexes()
+        self.create_full_text_index()
 
-    def add_workshop(self, ws_info: dict) -> None:
-        """Add a single workshop to database."""
+        self.c.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
 
-        self.c.execute(
-            """INSERT INTO workshops (
-                workshop_id, 
-                workshop_start_date_and_time, 
-                workshop_url, 
-                workshop_name, 
-                workshop_description, 
-                workshop_signed_up, 
-                workshop_participant_capacity, 
-                workshop_location, 
-                workshop_dates, 
-                workshop_credits, 
-                workshop_fees
-            ) VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
-            (
-                ws_info["workshop_id"],
-                ws_info["workshop_start_date_and_time"],         
-                ws_info["workshop_url"],
-                ws_info["workshop_name"],
-                ws_info["workshop_description"],
-                ws_info["workshop_signed_up"],
-                ws_info["workshop_participant_capacity"],
-                ws_info["workshop_location"],            
-                ws_info["workshop_dates"],
-                ws_info["workshop_credits"],
-                ws_info["workshop_fees"]
+
+    def create_full_text_index(self) -> None:
+        """
+        Create the FTS5 index over workshop names, descriptions and locations. Triggers keep it
+        in step with the workshops table. Skipped when SQLite was built without FTS5.
+        """
+
+        if self.has_full_text_index():
+            return
+
+        try:
+            self.c.execute(
+                """CREATE VIRTUAL TABLE workshops_fts USING fts5 (
+                    workshop_name,
+                    workshop_description,
+                    workshop_location,
+                    content='workshops',
+                    content_rowid='id',
+                    tokenize='unicode61'
+                );"""
             )
+        except OperationalError:
+            print("SQLite FTS5 is not available. Phrase searches will scan workshop names.")
+            return
+
+        self.c.execute(
+            """CREATE TRIGGER workshops_fts_insert AFTER INSERT ON workshops BEGIN
+                INSERT INTO workshops_fts (rowid, workshop_name, workshop_description, workshop_location)
+                VALUES (new.id, new.workshop_name, new.workshop_description, new.workshop_location);
+            END;"""
+        )
+        self.c.execute(
+            """CREATE TRIGGER workshops_fts_delete AFTER DELETE ON workshops BEGIN
+                INSERT INTO workshops_fts (workshops_fts, rowid, workshop_name, workshop_description, workshop_location)
+                VALUES ('delete', old.id, old.workshop_name, old.workshop_description, old.workshop_location);
+            END;"""
         )
 
-        for participant in ws_info["workshop_participant_info_list"]:
-            self.c.execute(
+        # Index workshops that were stored before the index existed.
+        self.c.execute("INSERT INTO workshops_fts (workshops_fts) VALUES ('rebuild');")
+
+
+    def has_full_text_index(self) -> bool:
+        """Return True if the workshops_fts index exists."""
+
+        return self.c.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'workshops_fts'"
+        ).fetchone()[0] > 0
+
+
+    def make_full_text_query(self, phrase: str) -> str:
+        """
+        Turn a search phrase into an FTS5 query where every word must be present as a word
+        or as the start of a word. Words are quoted so FTS5 operators are matched literally.
+        Words without letters or digits, such as "-", are left out as the tokenizer drops them.
+        """
+
+        words: list = [word.replace('"', '""') for word in phrase.split() if len(get_words(word)) > 0]
+
+        return " ".join(f'"{word}"*' for word in words)
+
+
+    def create_indexes(self) -> None:
+        """Index the columns used to look up workshops and their participants."""
+
+        self.c.execute("CREATE INDEX IF NOT EXISTS workshops_workshop_id ON workshops (workshop_id);")
+        self.c.execute("CREATE INDEX IF NOT EXISTS workshops_start ON workshops (workshop_start);")
+        self.c.execute(
+            "CREATE INDEX IF NOT EXISTS participant_information_workshop_id ON participant_information (workshop_id);"
+        )
+        self.c.execute("CREATE INDEX IF NOT EXISTS workshop_dates_workshop_id ON workshop_dates (workshop_id);")
+
+
+    def get_schema_version(self) -> int:
+        """Return the schema version stored in the database file."""
+
+        return self.c.execute("PRAGMA user_version;").fetchone()[0]
+
+
+    def has_workshops_table(self) -> bool:
+        """Return True if the workshops table exists."""
+
+        return self.c.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'workshops'"
+        ).fetchone()[0] > 0
+
+
+    def has_workshops(self) -> bool:
+        """Return True if the workshops table exists and holds at least one workshop."""
+
+        if not self.has_workshops_table():
+            return False
+
+        return self.c.execute("SELECT EXISTS (SELECT 1 FROM workshops)").fetchone()[0] == 1
+
+
+    def migrate_schema(self) -> None:
+        """
+        Convert a database written by an older version to the current typed schema.
+        Text counts become integers, the start becomes a timestamp and the underscore
+        joined dates move to the workshop_dates table, all in a single transaction.
+        """
+
+        if self.get_schema_version() >= SCHEMA_VERSION or not self.has_workshops_table():
+            return
+
+        # Take the write lock before checking again in case another connection migrated first.
+        self.c.execute("BEGIN IMMEDIATE;")
+        if self.get_schema_version() >= SCHEMA_VERSION:
+            self.connection.rollback()
+            return
+
+        columns: list = [column[1] for column in self.c.execute("PRAGMA table_info(workshops)")]
+        legacy_columns: list = [
+            "workshop_id",
+            "workshop_start_date_and_time",
+            "workshop_url",
+            "workshop_name",
+            "workshop_description",
+            "workshop_signed_up",
+            "workshop_participant_capacity",
+            "workshop_location",
+            "workshop_dates",
+            "workshop_credits",
+            "workshop_fees"
+        ]
+        if "workshop_refreshed_at" in columns:
+            legacy_columns.append("workshop_refreshed_at")
+
+        workshops = list()
+        for row in self.c.execute(f"SELECT {', '.join(legacy_columns)} FROM workshops ORDER BY id").fetchall():
+            workshop: dict = dict(zip(legacy_columns, row))
+            # Unknown refresh times sort before any real one so the next refresh updates them.
+            workshop.setdefault("workshop_refreshed_at", "")
+            workshops.append(workshop)
+
+        self.attach_participants(workshops, "SELECT workshop_id, name, email, school FROM participant_information ORDER BY id")
+
+        try:
+            self.drop_tables()
+            self.create_workshop_tables(clear=False)
+            self.add_workshops(workshops)
+        except Exception:
+            self.connection.rollback()
+            raise
+
+        print(f"Migrated {len(workshops)} workshops to database schema version {SCHEMA_VERSION}.")
+
+
+    def add_workshop(self, ws_info: dict) -> None:
+        """Add a single workshop to database."""
+
+        self.add_workshops([ws_info])
+
+
+    def add_workshops(self, workshops: list, replace: bool = False) -> dict:
+        """
+        Add a batch of workshops and their participants in a single transaction and return
+        the number of rows written, the seconds taken, and the rows per second. With replace,
+        stored copies of the workshops are deleted in the same transaction, so searches never
+        see a workshop missing or twice.
+        """
+
+        start_time: float = perf_counter()
+
+        workshop_rows: list = [self.make_workshop_row(ws_info) for ws_info in workshops]
+        participant_rows: list = [
+            (ws_info["workshop_id"], participant["name"], participant["email"], participant["school"])
+            for ws_info in workshops
+            for participant in ws_info["workshop_participant_info_list"]
+        ]
+        date_rows: list = [
+            (ws_info["workshop_id"], session_date)
+            for ws_info in workshops
+            for session_date in self.make_session_dates(ws_info["workshop_dates"])
+        ]
+
+        # The connection context manager commits once at the end or rolls back on error.
+        with self.connection:
+            if replace:
+                self.delete_workshop_rows([ws_info["workshop_id"] for ws_info in workshops])
+            self.c.executemany(
+                f"""INSERT INTO workshops ({', '.join(WORKSHOP_COLUMNS)})
+                VALUES ({', '.join('?' * len(WORKSHOP_COLUMNS))})""",
+                workshop_rows
+            )
+            self.c.executemany(
                 "INSERT INTO participant_information (workshop_id, name, email, school) VALUES (?,?,?,?)",
-                (
-                    ws_info["workshop_id"],
-                    participant["name"],
-                    participant["email"],
-                    participant["school"]
-                )
+                participant_rows
             )
+            self.c.executemany("INSERT INTO workshop_dates (workshop_id, session_date) VALUES (?,?)", date_rows)
+            self.bump_generation()
+
+        elapsed: float = perf_counter() - start_time
+        rows: int = len(workshop_rows) + len(participant_rows) + len(date_rows)
+
+        return {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed > 0 else 0.0}
+
+
+    def make_workshop_row(self, ws_info: dict) -> tuple:
+        """
+        Return the values of a workshop in WORKSHOP_COLUMNS order. Scraped text is parsed here
+        once so searches and exports can use the typed values.
+        """
+
+        return (
+            ws_info["workshop_id"],
+            ws_info["workshop_start_date_and_time"],
+            ws_info["workshop_url"],
+            ws_info["workshop_name"],
+            ws_info["workshop_description"],
+            self.make_count(ws_info["workshop_signed_up"]),
+            self.make_count(ws_info["workshop_participant_capacity"]),
+            ws_info["workshop_location"],
+            ws_info["workshop_credits"],
+            ws_info["workshop_fees"],
+            ws_info.get("workshop_refreshed_at", datetime.now().isoformat(timespec="seconds")),
+            self.make_start_timestamp(ws_info["workshop_start_date_and_time"])
+        )
+
+
+    def make_count(self, count) -> int:
+        """Return a scraped count such as "12" as an integer, or 0 if it is not a number."""
+
+        try:
+            return int(count)
+        except ValueError:
+            return 0
+
+
+    def make_session_dates(self, dates) -> list:
+        """
+        Return the session dates as YYYY-MM-DD strings. Accepts the scraped underscore joined
+        text such as "03/14/2022_03/15/2022" or a list of dates. Unreadable dates are skipped.
+        """
+
+        if not isinstance(dates, str):
+            return [session_date.isoformat() for session_date in dates]
+
+        session_dates = list()
+        for session_date in dates.split("_"):
+            try:
+                session_dates.append(datetime.strptime(session_date.strip(), "%m/%d/%Y").date().isoformat())
+            except ValueError:
+                pass
+
+        return session_dates
+
+
+    def set_bulk_load_pragmas(self) -> None:
+        """Trade durability of a throwaway database for ingest speed while it is being built."""
+
+        self.c.execute("PRAGMA synchronous = OFF;")
+        self.c.execute("PRAGMA temp_store = MEMORY;")
+        self.c.execute("PRAGMA cache_size = -65536;")
+
+
+    def set_cancel_event(self, cancel_event: Optional[Event]) -> None:
+        """
+        Abort the query running on this connection with OperationalError("interrupted") as
+        soon as cancel_event is set, so a superseded search stops early.
+        """
+
+        self.cancel_event = cancel_event
+
+        if cancel_event != None:
+            self.connection.set_progress_handler(lambda: 1 if cancel_event.is_set() else 0, CANCEL_CHECK_STEPS)
+        else:
+            self.connection.set_progress_handler(None, CANCEL_CHECK_STEPS)
+
+
+    def is_cancelled(self) -> bool:
+        """Return True if the cancel event of this connection is set."""
+
+        return self.cancel_event != None and self.cancel_event.is_set()
+
 
-        self.connection.commit()
-    
-    
     def get_all_workshops(self) -> list:
-        """Return all workshops in database for testing purposes."""
+        """Return all workshops in database with their participants."""
 
         workshops = list()
 
         try:
-            for workshop in self.c.execute("SELECT * FROM workshops"):
+            for workshop in self.c.execute(f"SELECT {', '.join(WORKSHOP_COLUMNS)} FROM workshops ORDER BY id"):
                 workshops.append(self.make_workshop_dict(workshop))
         except OperationalError:
+            if self.is_cancelled():
+                raise
             print("No database located.")
+            return workshops
 
-        for workshop in workshops:            
-            workshop["workshop_participant_info_list"] = list(self.get_participant_info(workshop["workshop_id"]))
+        self.attach_participants(workshops, "SELECT workshop_id, name, email, school FROM participant_information ORDER BY id")
+        self.attach_dates(workshops, "SELECT workshop_id, session_date FROM workshop_dates ORDER BY session_date")
 
         return workshops
 
+
+    def find_workshops(
+        self,
+        phrase: str = "",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        workshop_id: Optional[str] = None
+    ) -> list:
+        """
+        Return the workshops, with their participants, matching every provided filter.
+        The words of phrase are matched as prefixes against the name, description and location
+        with the best matches first. Without the full text index phrase is a case insensitive
+        substring of the workshop name. A phrase without letters or digits matches every
+        workshop, like an empty one. The date range is inclusive of the workshop start date
+        and time.
+        """
+
+        tables: str = "workshops"
+        order: str = "workshops.id"
+        conditions = list()
+        parameters = list()
+
+        if workshop_id != None:
+            conditions.append("workshops.workshop_id = ?")
+            parameters.append(workshop_id)
+        # Like the search index, a phrase of only punctuation matches every workshop.
+        if len(get_words(phrase)) > 0:
+            try:
+                full_text_search: bool = self.has_full_text_index()
+            except OperationalError:
+                full_text_search: bool = False
+
+            if full_text_search:
+                tables = "workshops JOIN workshops_fts ON workshops_fts.rowid = workshops.id"
+                # Weigh matches in the name over the location and the description.
+                order = "bm25(workshops_fts, 10.0, 1.0, 2.0), workshops.id"
+                conditions.append("workshops_fts MATCH ?")
+                parameters.append(self.make_full_text_query(phrase))
+            else:
+                conditions.append("instr(lower(workshops.workshop_name), ?) > 0")
+                parameters.append(phrase.lower())
+        if start_date != None:
+            conditions.append("workshops.workshop_start >= ?")
+            parameters.append(start_date.isoformat(timespec="minutes"))
+        if end_date != None:
+            conditions.append("workshops.workshop_start <= ?")
+            parameters.append(end_date.isoformat(timespec="minutes"))
+
+        where: str = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+
+        workshops = list()
+
+        try:
+            selected_columns: str = ", ".join(f"workshops.{column}" for column in WORKSHOP_COLUMNS)
+            for workshop in self.c.execute(f"SELECT {selected_columns} FROM {tables} {where} ORDER BY {order}", parameters):
+                workshops.append(self.make_workshop_dict(workshop))
+        except OperationalError:
+            if self.is_cancelled():
+                raise
+            print("No database located.")
+            return workshops
+
+        self.attach_participants(
+            workshops,
+            f"""SELECT workshop_id, name, email, school FROM participant_information
+            WHERE workshop_id IN (SELECT workshops.workshop_id FROM {tables} {where}) ORDER BY id""",
+            tuple(parameters)
+        )
+        self.attach_dates(
+            workshops,
+            f"""SELECT workshop_id, session_date FROM workshop_dates
+            WHERE workshop_id IN (SELECT workshops.workshop_id FROM {tables} {where}) ORDER BY session_date""",
+            tuple(parameters)
+        )
+
+        return workshops
+
+
+    def attach_participants(self, workshops: list, query: str, parameters: tuple = ()) -> None:
+        """
+        Run a single participant query and group the rows onto the matching workshops in one pass.
+        The query must select workshop_id, name, email, and school in that order.
+        """
+
+        participants_by_id = dict()
+        for workshop in workshops:
+            workshop["workshop_participant_info_list"] = participants_by_id.setdefault(workshop["workshop_id"], list())
+
+        for workshop_id, name, email, school in self.c.execute(query, parameters):
+            if workshop_id in participants_by_id:
+                participants_by_id[workshop_id].append({"name": name, "email": email, "school": school})
+
+
+    def attach_dates(self, workshops: list, query: str, parameters: tuple = ()) -> None:
+        """
+        Run a single session date query and group the dates onto the matching workshops as
+        date objects. The query must select workshop_id and session_date in that order.
+        """
+
+        dates_by_id = dict()
+        for workshop in workshops:
+            workshop["workshop_dates"] = dates_by_id.setdefault(workshop["workshop_id"], list())
+
+        for workshop_id, session_date in self.c.execute(query, parameters):
+            if workshop_id in dates_by_id:
+                dates_by_id[workshop_id].append(date.fromisoformat(session_date))
+
+
+    def get_info(self, name: str) -> Optional[str]:
+        """Return a value stored about the database itself, such as the last refresh time."""
+
+        try:
+            row = self.c.execute("SELECT value FROM database_info WHERE name = ?", (name,)).fetchone()
+        except OperationalError:
+            return None
+
+        return row[0] if row != None else None
+
+
+    def set_info(self, name: str, value: str) -> None:
+        """Store a value about the database itself."""
+
+        with self.connection:
+            self.c.execute("INSERT OR REPLACE INTO database_info (name, value) VALUES (?, ?)", (name, value))
+
+
+    def get_generation(self) -> int:
+        """Return the number of writes made to the workshops, 0 for a new or older database."""
+
+        generation: Optional[str] = self.get_info(GENERATION_INFO)
+
+        return int(generation) if generation != None else 0
+
+
+    def bump_generation(self) -> None:
+        """Count a write to the workshops, as part of the transaction making it."""
+
+        self.c.execute(
+            """INSERT INTO database_info (name, value) VALUES (?, '1')
+            ON CONFLICT (name) DO UPDATE SET value = CAST(value AS INTEGER) + 1""",
+            (GENERATION_INFO,)
+        )
+
+
+    def make_start_timestamp(self, start_date_and_time: str) -> Optional[str]:
+        """
+        Convert a start such as "03/14/2022 08:30 AM" into a sortable "2022-03-14T08:30"
+        timestamp, or None if it cannot be read.
+        """
+
+        try:
+            return datetime.strptime(start_date_and_time, "%m/%d/%Y %I:%M %p").isoformat(timespec="minutes")
+        except ValueError:
+            return None
+
+
+    def is_current_layout(self) -> bool:
+        """Return True if the workshops table exists and uses the current schema version."""
+
+        return self.has_workshops_table() and self.get_schema_version() == SCHEMA_VERSION
+
+
+    def get_workshop_refresh_info(self) -> Optional[dict]:
+        """
+        Return a dictionary of workshop_id: (start date and time, signed up, refreshed at) for
+        every stored workshop or None if the database is missing or uses an older layout.
+        """
+
+        if not self.is_current_layout():
+            return None
+
+        rows = self.c.execute(
+            """SELECT workshop_id, workshop_start_date_and_time, workshop_signed_up, workshop_refreshed_at
+            FROM workshops"""
+        ).fetchall()
+
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+
+    def delete_workshops(self, workshop_ids: list) -> None:
+        """Remove the workshops and their participants that match the provided IDs."""
+
+        with self.connection:
+            self.delete_workshop_rows(workshop_ids)
+            self.bump_generation()
+
+
+    def delete_workshop_rows(self, workshop_ids: list) -> None:
+        """Delete the rows of the provided workshops without committing."""
+
+        ids = [(workshop_id,) for workshop_id in workshop_ids]
+        self.c.executemany("DELETE FROM workshops WHERE workshop_id = ?", ids)
+        self.c.executemany("DELETE FROM participant_information WHERE workshop_id = ?", ids)
+        self.c.executemany("DELETE FROM workshop_dates WHERE workshop_id = ?", ids)
+
+
     def make_workshop_dict(self, workshop_info: tuple) -> dict:
-        """Generate a dictionary containing workshop information."""
-
-        workshop = dict()
-
-        workshop["workshop_id"] = workshop_info[1]
-        workshop["workshop_start_date_and_time"] = workshop_info[2]          
-        workshop["workshop_url"] = workshop_info[3]
-        workshop["workshop_name"] = workshop_info[4]
-        workshop["workshop_description"] = workshop_info[5]
-        workshop["workshop_signed_up"] = workshop_info[6]
-        workshop["workshop_participant_capacity"] = workshop_info[7]
-        workshop["workshop_location"] =  workshop_info[8]            
-        workshop["workshop_dates"] = workshop_info[9]
-        workshop["workshop_credits"] = workshop_info[10]
-        workshop["workshop_fees"] = workshop_info[11]
+        """
+        Generate a dictionary containing workshop information from a row selected in
+        WORKSHOP_COLUMNS order. Session dates are attached separately by attach_dates.
+        """
+
+        workshop: dict = dict(zip(WORKSHOP_COLUMNS, workshop_info))
+        workshop["workshop_dates"] = list()
 
         return workshop
 
@@ -153,8 +644,11 @@ class WorkshopDatabase:
     def drop_tables(self):
         """Clear all tables in the database."""
 
+        self.c.execute("DROP TABLE IF EXISTS workshops_fts;")
         self.c.execute("DROP TABLE IF EXISTS workshops;")
         self.c.execute("DROP TABLE IF EXISTS participant_information;")
+        self.c.execute("DROP TABLE IF EXISTS workshop_dates;")
+        self.c.execute("DROP TABLE IF EXISTS database_info;")
 
 
     def __enter__(self):
@@ -165,9 +659,90 @@ class WorkshopDatabase:
         
         self.c.close()
         self.connection.close()
-        
-        if exc_type != None or exc_value != None or exc_traceback != None:
-            raise exc_type
+
+        # Let the original exception, with its message, carry on.
+        return False
+
+
+class ShadowWorkshopDatabase(WorkshopDatabase):
+    """
+    Workshop database that is built in a separate file and swapped in place of the live
+    database when the with block completes. If the block fails the shadow file is discarded
+    and the live database is left untouched, so searches always see the last good snapshot.
+    """
+
+    def __init__(self, copy_current: bool = False, database_file: str = DATABASE_FILE):
+        self.live_database_file = database_file
+        shadow_file: str = f"{database_file}.refresh"
+
+        # Leftovers from an interrupted refresh.
+        if path.exists(shadow_file):
+            remove(shadow_file)
+
+        if copy_current and path.exists(database_file):
+            self.copy_database(database_file, shadow_file)
+
+        super().__init__(shadow_file)
+        self.set_bulk_load_pragmas()
+
+
+    def copy_database(self, source_file: str, target_file: str) -> None:
+        """Copy a consistent snapshot of the source database into the target file."""
+
+        source = connect(source_file)
+        target = connect(target_file)
+        source.backup(target)
+        target.close()
+        source.close()
+
+
+    def carry_generation_forward(self) -> None:
+        """
+        Give the shadow database a generation after the live one's, so searches cached from
+        the live database are not taken for searches of the new one.
+        """
+
+        live_generation: int = 0
+        if path.exists(self.live_database_file):
+            with WorkshopDatabase(self.live_database_file) as live_db:
+                live_generation = live_db.get_generation()
+
+        self.set_info(GENERATION_INFO, str(max(self.get_generation(), live_generation) + 1))
+
+
+    def swap_in(self) -> None:
+        """
+        Copy the completed shadow database over the live one in a single write transaction and
+        remove the shadow file. Searches already reading the live database finish on the old
+        snapshot and the next ones see the new workshops.
+        """
+
+        # Replacing the live file would leave open connections, and any journal next to it,
+        # describing the old file. The backup writes through SQLite's own locking instead.
+        shadow = connect(self.database_file)
+        live = connect(self.live_database_file)
+        try:
+            shadow.backup(live)
+        finally:
+            live.close()
+            shadow.close()
+
+        remove(self.database_file)
+
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+
+        if exc_type == None:
+            self.carry_generation_forward()
+
+        self.c.close()
+        self.connection.close()
+
+        if exc_type != None:
+            remove(self.database_file)
+            return False
+
+        self.swap_in()
 
 
 if __name__ == "__main__":
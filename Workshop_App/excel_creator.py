@@ -1,9 +1,9 @@
-from PyQt5.QtWidgets import QFileDialog
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Side, numbers
 from openpyxl.styles.borders import Border
 from workshop_tool import WorkshopsTool
 from spread_sheet_base_creator import SpreadSheetBaseCreator
+from instrumentation import span
 
 class ExcelCreator(SpreadSheetBaseCreator):
 
@@ -27,8 +27,17 @@ class ExcelCreator(SpreadSheetBaseCreator):
             "center":Alignment(horizontal="center")
         }
 
-    def export_workshops_info(self, ws: WorkshopsTool) -> None:
-        """Exports the searched workshop information to an .xlsx file."""
+    def export_workshops_info(self, ws: WorkshopsTool, file_name: str) -> None:
+        """Exports the searched workshop information to the .xlsx file file_name."""
+
+        with span("excel build"):
+            workbook = self.build_workbook(ws)
+
+        with span("excel save"):
+            workbook.save(filename=file_name)
+
+    def build_workbook(self, ws: WorkshopsTool) -> Workbook:
+        """Build the workbook for the searched workshops."""
 
         workshops: list = ws.get_most_recent_search_results()
 
@@ -89,11 +98,7 @@ class ExcelCreator(SpreadSheetBaseCreator):
         self.format_workshops_sheet(workshops_sheet)
         self.format_attendance_sheet(attendance_sheet)
 
-        save_file_info: str = QFileDialog().getSaveFileName(None, directory="workshop_info.xlsx", filter="Excel files (*.xlsx)")[0]
-
-        # Only save file if the user provided a file name and didn't cancel.
-        if save_file_info != "":
-            workbook.save(filename=save_file_info)
+        return workbook
     
     def format_workshops_sheet(self, worksheet) -> None:
         """Formats excel workshops sheet."""
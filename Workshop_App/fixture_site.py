@@ -0,0 +1,374 @@
+# Module to record the workshop site and serve a local stand-in for it.
+
+# With "capture_folder" set in connection_info.json the app saves every page it downloads,
+# with participant details, emails, the user name and the ASP.NET form state scrubbed out.
+# The fixture server replays such a folder, or makes up any number of workshops from the
+# templates in sample_pages.py, with optional latency, errors and session expiry.
+# Setting "fixture_site_url" in connection_info.json points the app at the fixture server.
+# Usage: python fixture_site.py [--replay FOLDER | --workshops N] [--port 8765] [--latency-ms 50]
+
+
+import re
+from argparse import ArgumentParser
+from functools import lru_cache
+from glob import glob
+from hashlib import sha256
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from os import path, makedirs
+from random import Random, uniform
+from secrets import token_hex
+from threading import Lock, Thread
+from time import sleep
+from urllib.parse import urlparse, parse_qs, parse_qsl
+from typing import Optional
+
+import sample_pages
+
+
+FIXTURE_PATHS = {
+    "signin_page_url": "/Login.aspx",
+    "instructor_page_url": "/Instructor.aspx",
+    "base_workshop_url": "/Session.aspx?id=",
+    "participant_page_base_url": "/Participants.aspx?id=",
+}
+FIRST_WORKSHOP_ID = 100000
+
+EMAIL_PATTERN = re.compile(rb"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+FORM_STATE_PATTERN = re.compile(rb'(name="(?:__VIEWSTATE|__EVENTVALIDATION|__VIEWSTATEGENERATOR)"[^>]*?value=")[^"]*(")')
+PARTICIPANT_TABLE_PATTERN = re.compile(rb'(<table[^>]*id="RadGrid1_ctl00".*?</table>)', re.DOTALL)
+ROW_PATTERN = re.compile(rb"<tr[^>]*>.*?</tr>", re.DOTALL)
+CELL_PATTERN = re.compile(rb"(<td[^>]*>)(.*?)(</td>)", re.DOTALL)
+
+
+def get_fixture_urls(site_url: str) -> dict:
+    """Return the connection_info.json page URLs for a fixture server at site_url."""
+
+    return {name: f"{site_url.rstrip('/')}{page_path}" for name, page_path in FIXTURE_PATHS.items()}
+
+
+def scrub_page(content: bytes, user_name: Optional[str] = None) -> bytes:
+    """
+    Return the page with everything personal replaced: participant names, emails and schools
+    become made up values, other emails and the user name are masked and the ASP.NET form
+    state, which can carry session data, is blanked.
+    """
+
+    content = FORM_STATE_PATTERN.sub(rb"\1scrubbed\2", content)
+
+    def scrub_table(table_match) -> bytes:
+        rows: list = ROW_PATTERN.findall(table_match.group(1))
+        table: bytes = table_match.group(1)
+        for number, row in enumerate(rows[1:]):
+            cells: list = CELL_PATTERN.findall(row)
+            if len(cells) < 4:
+                continue
+            values: list = [
+                cells[0][1],
+                f"Participant {number}".encode(),
+                f"participant{number}@example.org".encode(),
+                f"School {number % 10}".encode(),
+            ] + [cell[1] for cell in cells[4:]]
+            scrubbed_row: bytes = row
+            for cell, value in zip(cells, values):
+                scrubbed_row = scrubbed_row.replace(cell[0] + cell[1] + cell[2], cell[0] + value + cell[2], 1)
+            table = table.replace(row, scrubbed_row, 1)
+        return table
+
+    content = PARTICIPANT_TABLE_PATTERN.sub(scrub_table, content)
+    content = EMAIL_PATTERN.sub(lambda match: b"scrubbed@example.org" if not match.group(0).endswith(b"@example.org") else match.group(0), content)
+
+    if user_name:
+        content = content.replace(user_name.encode(), b"instructor")
+
+    return content
+
+
+class PageRecorder:
+    """
+    Saves scrubbed copies of the pages the app downloads into a folder, named the way
+    benchmark_parsing.py and the fixture server expect: login.html, instructor.html,
+    session_<id>.html and participant_<id>.html.
+    """
+
+    def __init__(self, folder: str, connection_info: dict):
+        self.folder = folder
+        self.connection_info = connection_info
+        self.lock = Lock()
+        makedirs(folder, exist_ok=True)
+
+
+    def get_file_name(self, url: str) -> Optional[str]:
+        """Return the file name for a page URL or None if it is not a page the app scrapes."""
+
+        if url == self.connection_info["signin_page_url"]:
+            return "login.html"
+        if url == self.connection_info["instructor_page_url"]:
+            return "instructor.html"
+        if url.startswith(self.connection_info["base_workshop_url"]):
+            return f'session_{url[len(self.connection_info["base_workshop_url"]):]}.html'
+        if url.startswith(self.connection_info["participant_page_base_url"]):
+            return f'participant_{url[len(self.connection_info["participant_page_base_url"]):]}.html'
+
+        return None
+
+
+    def record(self, url: str, content: bytes) -> None:
+        """Save a scrubbed copy of a downloaded page."""
+
+        file_name: Optional[str] = self.get_file_name(url)
+        if file_name == None:
+            return
+
+        scrubbed: bytes = scrub_page(content, self.connection_info.get("user_name"))
+
+        with self.lock:
+            with open(path.join(self.folder, file_name), "wb") as f:
+                f.write(scrubbed)
+
+
+class FixtureSite:
+    """
+    The pages of the stand-in site, either replayed from a folder of recorded pages or made
+    up for number_of_workshops workshops.
+    """
+
+    def __init__(self, replay_folder: Optional[str] = None, number_of_workshops: int = 100, seed: int = 0):
+        self.seed = seed
+        self.recorded_pages: Optional[dict] = None
+        # Each site keeps its own most recently requested pages, made from its own workshops.
+        self.make_page = lru_cache(maxsize=2048)(self.make_new_page)
+
+        if replay_folder != None:
+            self.recorded_pages = dict()
+            for file_name in glob(path.join(replay_folder, "*.html")):
+                with open(file_name, "rb") as f:
+                    self.recorded_pages[path.basename(file_name)] = f.read()
+        else:
+            self.workshops: list = [
+                sample_pages.make_workshop(FIRST_WORKSHOP_ID + number, seed) for number in range(number_of_workshops)
+            ]
+            self.workshops_by_id: dict = {workshop["workshop_id"]: workshop for workshop in self.workshops}
+
+
+    def get_page(self, page_path: str, workshop_id: Optional[str]) -> Optional[bytes]:
+        """Return the page at a FIXTURE_PATHS path or None if there is no such page."""
+
+        if page_path == FIXTURE_PATHS["signin_page_url"]:
+            file_name: str = "login.html"
+        elif page_path == FIXTURE_PATHS["instructor_page_url"]:
+            file_name: str = "instructor.html"
+        elif workshop_id != None and page_path == FIXTURE_PATHS["base_workshop_url"].split("?")[0]:
+            file_name: str = f"session_{workshop_id}.html"
+        elif workshop_id != None and page_path == FIXTURE_PATHS["participant_page_base_url"].split("?")[0]:
+            file_name: str = f"participant_{workshop_id}.html"
+        else:
+            return None
+
+        if self.recorded_pages != None:
+            return self.recorded_pages.get(file_name)
+
+        return self.make_page(file_name)
+
+
+    def make_new_page(self, file_name: str) -> Optional[bytes]:
+        """Make a page from the templates. Called through make_page, which keeps recent pages."""
+
+        if file_name == "login.html":
+            return sample_pages.make_login_page().encode()
+        if file_name == "instructor.html":
+            return sample_pages.make_instructor_page(self.workshops).encode()
+
+        kind, workshop_id = file_name[:-len(".html")].split("_", 1)
+        workshop: Optional[dict] = self.workshops_by_id.get(workshop_id)
+        if workshop == None:
+            return None
+        if kind == "session":
+            return sample_pages.make_session_page(workshop).encode()
+
+        return sample_pages.make_participant_page(sample_pages.make_participants(workshop, self.seed)).encode()
+
+
+class FixtureServer:
+    """
+    Local HTTP server for a FixtureSite. Each response is delayed by latency_ms plus or minus
+    jitter_ms, error_rate of the session and participant requests fail with a 503, and signed
+    in sessions expire after session_requests requests when it is above 0. Pages carry an
+    ETag so the app's page cache can be exercised.
+    """
+
+    def __init__(
+        self,
+        site: FixtureSite,
+        port: int = 8765,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        session_requests: int = 0
+    ):
+        self.site = site
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.session_requests = session_requests
+        self.sessions: dict = dict()
+        self.lock = Lock()
+        self.random = Random(site.seed)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread: Optional[Thread] = None
+
+
+    def get_url(self) -> str:
+        """Return the address of the server."""
+
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+    def start(self) -> None:
+        """Serve on a background thread."""
+
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def make_handler(self):
+        """Return the request handler class bound to this server."""
+
+        fixture_server = self
+
+        class FixtureRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                fixture_server.handle_get(self)
+
+            def do_POST(self):
+                fixture_server.handle_post(self)
+
+        return FixtureRequestHandler
+
+
+    def wait(self) -> None:
+        """Delay a response by the configured latency."""
+
+        latency_ms: float = self.latency_ms + uniform(-self.jitter_ms, self.jitter_ms)
+        if latency_ms > 0:
+            sleep(latency_ms / 1000)
+
+
+    def send(self, handler, status: int, body: bytes = b"", headers: Optional[dict] = None) -> None:
+        """Write a response."""
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or dict()).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+    def is_signed_in(self, handler) -> bool:
+        """Return True if the request carries a session that has not expired, counting the request."""
+
+        cookies: dict = dict(
+            cookie.strip().split("=", 1) for cookie in handler.headers.get("Cookie", "").split(";") if "=" in cookie
+        )
+        session_id: Optional[str] = cookies.get("ASP.NET_SessionId")
+
+        with self.lock:
+            if session_id not in self.sessions:
+                return False
+            self.sessions[session_id] += 1
+            if self.session_requests > 0 and self.sessions[session_id] > self.session_requests:
+                del self.sessions[session_id]
+                return False
+
+        return True
+
+
+    def handle_post(self, handler) -> None:
+        """Sign in: any user name and password is accepted."""
+
+        self.wait()
+        form: dict = dict(parse_qsl(handler.rfile.read(int(handler.headers.get("Content-Length", 0))).decode()))
+
+        if urlparse(handler.path).path != FIXTURE_PATHS["signin_page_url"] or "ctl00$mainBody$txtUserName" not in form:
+            self.send(handler, 404)
+            return
+
+        session_id: str = token_hex(12)
+        with self.lock:
+            self.sessions[session_id] = 0
+
+        self.send(handler, 200, b"<html><body>Signed in</body></html>", {"Set-Cookie": f"ASP.NET_SessionId={session_id}; path=/; HttpOnly"})
+
+
+    def handle_get(self, handler) -> None:
+        """Serve a page, or the sign-in page when the session is missing or expired."""
+
+        self.wait()
+        url = urlparse(handler.path)
+        workshop_id: Optional[str] = parse_qs(url.query).get("id", [None])[0]
+
+        if url.path != FIXTURE_PATHS["signin_page_url"]:
+            with self.lock:
+                failed: bool = url.path != FIXTURE_PATHS["instructor_page_url"] and self.random.random() < self.error_rate
+            if failed:
+                self.send(handler, 503)
+                return
+            if not self.is_signed_in(handler):
+                self.send(handler, 200, self.site.get_page(FIXTURE_PATHS["signin_page_url"], None))
+                return
+
+        page: Optional[bytes] = self.site.get_page(url.path, workshop_id)
+        if page == None:
+            self.send(handler, 404)
+            return
+
+        etag: str = f'"{sha256(page).hexdigest()[:16]}"'
+        if handler.headers.get("If-None-Match") == etag:
+            self.send(handler, 304, headers={"ETag": etag})
+            return
+
+        self.send(handler, 200, page, {"ETag": etag})
+
+
+def main() -> None:
+    """Run the fixture server until interrupted and print the connection_info.json entry to use."""
+
+    argument_parser = ArgumentParser(description="Serve a local stand-in for the workshop site.")
+    argument_parser.add_argument("--replay", help="folder of pages recorded with capture_folder")
+    argument_parser.add_argument("--workshops", type=int, default=100, help="number of workshops to make up")
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--port", type=int, default=8765)
+    argument_parser.add_argument("--latency-ms", type=float, default=0)
+    argument_parser.add_argument("--jitter-ms", type=float, default=0)
+    argument_parser.add_argument("--error-rate", type=float, default=0, help="share of page requests answered with 503")
+    argument_parser.add_argument("--session-requests", type=int, default=0, help="requests before a session expires, 0 for never")
+    arguments = argument_parser.parse_args()
+
+    site = FixtureSite(arguments.replay, arguments.workshops, arguments.seed)
+    server = FixtureServer(
+        site, arguments.port, arguments.latency_ms, arguments.jitter_ms, arguments.error_rate, arguments.session_requests
+    )
+
+    print(f'Serving on {server.get_url()}, set "fixture_site_url": "{server.get_url()}" in connection_info.json.')
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 from workshop_tool import WorkshopsTool
 from spread_sheet_base_creator import SpreadSheetBaseCreator
 from google_sheets_tool import GoogleSheetsTool
-from gui_window import GuiWindow
-from typing import Optional
+from instrumentation import span
 from googleapiclient.errors import HttpError
 
 class GoogleSheetCreator(SpreadSheetBaseCreator):
@@ -16,16 +15,27 @@ class GoogleSheetCreator(SpreadSheetBaseCreator):
             "dark_grey": (0.2, 0.2, 0.2)
         }
 
-    def export_workshops_info(self, ws: WorkshopsTool, ui: GuiWindow) -> None:
-        """Exports the searched workshop information to an google sheet."""
+    def export_workshops_info(
+        self,
+        ws: WorkshopsTool,
+        file_and_folder_info: tuple,
+        service_account_file: str = "google_info.json"
+    ) -> None:
+        """
+        Exports the searched workshop information to a new google sheet.
+        file_and_folder_info is (sheet name, ID of the Drive folder to create it in).
+        """
 
         gs = GoogleSheetsTool()
-        file_and_folder_info: Optional[tuple] = ui.google_filename_popup_box()
-        if file_and_folder_info != None:
-            gs.set_file_and_folder_info(file_and_folder_info)
-            gs.authenticate("google_info.json")
-        else:
-            return        
+        gs.set_file_and_folder_info(file_and_folder_info)
+        with span("google sign in"):
+            gs.authenticate(service_account_file)
+
+        with span("google sheet build"):
+            self.write_workshops(ws, gs)
+
+    def write_workshops(self, ws: WorkshopsTool, gs: GoogleSheetsTool) -> None:
+        """Build and send the sheet requests for the searched workshops to an authenticated sheet."""
 
         workshops: list = ws.get_most_recent_search_results()
 
@@ -3,6 +3,7 @@
 
 from googleapiclient.discovery import build, Resource
 from google.oauth2 import service_account
+from instrumentation import span
 from typing import Optional
 
 
@@ -79,14 +80,16 @@ class GoogleSheetsTool:
         """Batch updates all current value requests."""
 
         values_body = {"valueInputOption": "USER_ENTERED", "data": self.update_values_requests}
-        self.sheet.values().batchUpdate(spreadsheetId=self.spreadsheet_id, body=values_body).execute()
+        with span("google api"):
+            self.sheet.values().batchUpdate(spreadsheetId=self.spreadsheet_id, body=values_body).execute()
         self.update_values_requests.clear()
 
     def batch_update(self) -> None:
         """Batch updates all current requests."""
         
         body: dict = {"requests": self.requests}        
-        self.sheet.batchUpdate(spreadsheetId=self.spreadsheet_id, body=body).execute()
+        with span("google api"):
+            self.sheet.batchUpdate(spreadsheetId=self.spreadsheet_id, body=body).execute()
         self.requests.clear()
     
     def add_values_request(self, cell_range: str, rows: list) -> None:
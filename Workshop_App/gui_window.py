@@ -7,12 +7,22 @@ the workshopGUI from QT Designer.
 
 from google_filename_dialog import Ui_GoogleFilenameDialog
 from workshop_tool import WorkshopsTool
-from PyQt5.QtWidgets import QDialog, QMessageBox, QLineEdit, QMainWindow
+from PyQt5.QtWidgets import (
+    QAction, QDialog, QFileDialog, QMessageBox, QLineEdit, QMainWindow, QProgressBar, QPushButton, QLabel,
+    QSplitter, QTableView, QAbstractItemView, QPlainTextEdit
+)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFontMetrics
 from login_dialog import Ui_LoginDialog
 from workshop_gui import Ui_MainWindow
+from results_model import WorkshopResultsModel
 from typing import Optional
 
 
+# Milliseconds of no typing before a search as you type starts.
+LIVE_SEARCH_DELAY_MS = 250
+
+
 class GuiWindow(Ui_MainWindow):
     ''' 
     Class extension for Ui_MainWindow so original class can be udpated in QTdesigner.
@@ -24,27 +34,169 @@ class GuiWindow(Ui_MainWindow):
         self.font_size: int = 12
         self.smallest_font_size: int = 8
         self.largest_font_size: int = 52
+        self.refresh_worker = None
+        self.search_worker = None
+        self.running_search_workers: set = set()
+
+        # Database refresh progress, only visible while a refresh runs.
+        self.progressBarRefresh = QProgressBar()
+        self.progressBarRefresh.setMaximumWidth(250)
+        self.progressBarRefresh.hide()
+        self.buttonCancelRefresh = QPushButton("Cancel Update")
+        self.buttonCancelRefresh.hide()
+        self.labelDataAge = QLabel()
+        self.statusbar.addPermanentWidget(self.labelDataAge)
+        self.statusbar.addPermanentWidget(self.progressBarRefresh)
+        self.statusbar.addPermanentWidget(self.buttonCancelRefresh)
+        self.buttonCancelRefresh.clicked.connect(self.cancel_refresh)
+
+        self.setup_results_view()
+
+        # Where the startup time went, see instrumentation.py.
+        self.actionStartup_Report = QAction("Startup Report", main_window)
+        self.menuView.addAction(self.actionStartup_Report)
+
+        # Search as you type, once typing pauses for LIVE_SEARCH_DELAY_MS.
+        self.actionLive_Search = QAction("Search As You Type", main_window)
+        self.actionLive_Search.setCheckable(True)
+        self.actionLive_Search.setChecked(True)
+        self.menuView.addAction(self.actionLive_Search)
+        self.live_search_timer = QTimer(main_window)
+        self.live_search_timer.setSingleShot(True)
+        self.live_search_timer.setInterval(LIVE_SEARCH_DELAY_MS)
+        self.lineEditPhrase.textEdited.connect(self.schedule_live_search)
+
+
+    def schedule_live_search(self) -> None:
+        '''Restart the wait before the search as you type, so it only runs once typing pauses.'''
+
+        if self.actionLive_Search.isChecked():
+            self.live_search_timer.start()
+
+
+    def setup_results_view(self) -> None:
+        '''
+        Add the search results table above the output text, which keeps the totals and emails.
+        The display checkboxes show and hide its columns.
+        '''
+
+        self.results_model = WorkshopResultsModel()
+        self.tableResults = QTableView()
+        self.tableResults.setModel(self.results_model)
+        self.tableResults.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tableResults.setAlternatingRowColors(True)
+        self.tableResults.setWordWrap(False)
+        self.tableResults.verticalHeader().hide()
+        self.tableResults.horizontalHeader().setStretchLastSection(True)
+        # Results keep their search order until a column heading is clicked.
+        self.tableResults.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.tableResults.setSortingEnabled(True)
+
+        # A QPlainTextEdit only lays out the lines on screen, so long email lists and font
+        # changes stay quick. It replaces the QTextEdit from the designer file.
+        self.verticalLayout_2.removeWidget(self.textOutputField)
+        self.textOutputField.deleteLater()
+        self.textOutputField = QPlainTextEdit()
+        self.textOutputField.setObjectName("textOutputField")
         self.textOutputField.setReadOnly(True)
 
+        self.splitterResults = QSplitter(Qt.Vertical)
+        self.splitterResults.addWidget(self.tableResults)
+        self.splitterResults.addWidget(self.textOutputField)
+        self.splitterResults.setStretchFactor(0, 3)
+        self.splitterResults.setStretchFactor(1, 1)
+        self.verticalLayout_2.addWidget(self.splitterResults)
+
+        self.column_checkboxes: dict = {
+            self.checkBoxWsName: 0,
+            self.checkBoxWsID: 1,
+            self.checkBoxWsStartDate: 2,
+            self.checkBoxWsPartNumbers: 3,
+            self.checkBoxWsURL: 4,
+            self.checkBoxNames: 5,
+            self.checkBoxEmails: 6,
+            self.checkBoxSchools: 7,
+        }
+        for checkbox in self.column_checkboxes:
+            checkbox.toggled.connect(self.update_result_columns)
+        self.update_result_columns()
+
+
+    def update_result_columns(self) -> None:
+        '''Show the columns whose checkbox is checked, with participant rows if any participant column is shown.'''
+
+        for checkbox, column in self.column_checkboxes.items():
+            self.tableResults.setColumnHidden(column, not checkbox.isChecked())
+
+        self.results_model.set_show_participants(
+            self.checkBoxNames.isChecked() or self.checkBoxEmails.isChecked() or self.checkBoxSchools.isChecked()
+        )
+
+
+    def show_search_results(self, workshops: list) -> None:
+        '''Show the workshops of a search, in the order of the sorted column if there is one.'''
+
+        self.results_model.set_workshops(workshops)
+
+        header = self.tableResults.horizontalHeader()
+        if header.sortIndicatorSection() >= 0 and header.isSortIndicatorShown():
+            self.results_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+
+    def show_refresh_progress(self, done: int, total: int) -> None:
+        '''Show how many workshops the running refresh has scraped.'''
+
+        self.progressBarRefresh.setMaximum(max(total, 1))
+        self.progressBarRefresh.setValue(done)
+        self.statusbar.showMessage(f'Updating database: {done}/{total} workshops')
+
+
+    def cancel_refresh(self) -> None:
+        '''Ask the running refresh to stop.'''
+
+        if self.refresh_worker != None:
+            self.refresh_worker.cancel()
+            self.buttonCancelRefresh.setEnabled(False)
+            self.statusbar.showMessage('Cancelling database update...')
+
+
+    def set_refresh_running(self, running: bool) -> None:
+        '''Show or hide the refresh progress widgets and block starting a second refresh.'''
+
+        self.progressBarRefresh.setValue(0)
+        self.progressBarRefresh.setVisible(running)
+        self.buttonCancelRefresh.setVisible(running)
+        self.buttonCancelRefresh.setEnabled(running)
+        self.actionUpdate_Database.setEnabled(not running)
+
 
     def increase_font(self) -> None:
         '''Increase output font if below size 52.'''
 
         if self.font_size < self.largest_font_size:
-            text: str = self.textOutputField.toPlainText()
-            self.font_size += 4
-            self.textOutputField.setFontPointSize(self.font_size)
-            self.textOutputField.setText(text)
+            self.set_output_font_size(self.font_size + 4)
     
 
     def decrease_font(self) -> None:
         '''Decrease output font if above size 8.'''
 
         if self.font_size > self.smallest_font_size:
-            text: str = self.textOutputField.toPlainText()
-            self.font_size -= 4
-            self.textOutputField.setFontPointSize(self.font_size)
-            self.textOutputField.setText(text)
+            self.set_output_font_size(self.font_size - 4)
+
+
+    def set_output_font_size(self, font_size: int) -> None:
+        '''
+        Change the font of the output text and the results table. Only the widget fonts change,
+        the text and rows are never copied or rebuilt, so zooming costs the same for any result size.
+        '''
+
+        self.font_size = font_size
+        font = self.textOutputField.font()
+        font.setPointSize(font_size)
+
+        self.textOutputField.setFont(font)
+        self.tableResults.setFont(font)
+        self.tableResults.verticalHeader().setDefaultSectionSize(QFontMetrics(font).height() + 8)
 
 
     def creds_popup_box(self, ws: WorkshopsTool) -> None:
@@ -60,7 +212,7 @@ class GuiWindow(Ui_MainWindow):
         if ok and len(ui.inputUsername.text()) > 0 and len(ui.inputPassword.text()) > 0:
             user_name: str = ui.inputUsername.text()
             user_password: str = ui.inputPassword.text()
-            ws.connector.store_user_info(user_name, user_password)
+            ws.get_connector().store_user_info(user_name, user_password)
             self.change_creds_successful(True)
         else:
             self.change_creds_successful(False)
@@ -92,6 +244,14 @@ class GuiWindow(Ui_MainWindow):
             return None
 
 
+    def excel_filename_popup_box(self) -> Optional[str]:
+        '''Ask where to save the Excel export. Returns None if the user cancelled.'''
+
+        file_name: str = QFileDialog().getSaveFileName(None, directory="workshop_info.xlsx", filter="Excel files (*.xlsx)")[0]
+
+        return file_name if file_name != "" else None
+
+
     def strip_folder_id(self, url: str) -> str:
         """Returns teh folder ID"""
         
@@ -114,6 +274,17 @@ class GuiWindow(Ui_MainWindow):
         msg.exec_()
 
 
+    def startup_report_popup_box(self, report: str) -> None:
+        '''Pops-up the startup time with the slowest imports in the details.'''
+
+        msg = QMessageBox()
+        msg.setWindowTitle('Startup Report')
+        msg.setText(report.split('\n')[0])
+        msg.setDetailedText('\n'.join(report.split('\n')[2:]))
+        msg.setIcon(QMessageBox.Information)
+        msg.exec_()
+
+
     def export_googlesheet_successful(self, success: bool) -> None:
         '''Pops-up message if successful filename and folder provided.'''
 
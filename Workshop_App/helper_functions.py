@@ -2,83 +2,221 @@ from PyQt5.QtWidgets import QMainWindow
 from json import load
 from gui_window import GuiWindow
 from workshop_tool import WorkshopsTool
+from refresh_worker import RefreshWorker
+from search_worker import SearchWorker
+from connection_tool import LoginFailed
+from requests.exceptions import RequestException
+from instrumentation import Operation, span
+from typing import Callable, Optional
+from datetime import datetime
+from threading import Event
 
 
-def generate_workshop_info(ui: GuiWindow, ws: WorkshopsTool) -> None:
-    """Output the desired content based on selected options."""
+def generate_workshop_info(ui: GuiWindow, ws: WorkshopsTool, live: bool = False) -> SearchWorker:
+    """
+    Start a search for the selected options on a background thread and return its worker.
+    The search running before it is cancelled, only the latest search shows its results.
+    Live searches, made while typing, are answered by the in memory search index.
+    """
 
-    ui.textOutputField.clear()
-    ws.set_search_phrase(ui.lineEditPhrase.text())
+    parameters: dict = get_search_parameters(ui)
 
-    update_searched_workshops(ui, ws)
+    def search(cancel_event: Event) -> tuple:
+        workshops: list = ws.search_workshops(**parameters, cancel_event=cancel_event, use_index=live)
 
-    button_check: bool = check_button_options(ui)
+        return parameters["phrase"], workshops, get_workshop_display_text(ws, workshops)
 
-    text_to_display: str = get_workshop_display_text(ui, ws, button_check)
+    if ui.search_worker != None:
+        ui.search_worker.cancel()
 
-    ui.textOutputField.clear()
-    ui.textOutputField.insertPlainText(text_to_display)
+    worker = SearchWorker(search, "live search" if live else "search")
+    ui.search_worker = worker
+    # A cancelled search may still be finishing, its thread must be kept until it has.
+    ui.running_search_workers.add(worker)
 
+    worker.succeeded.connect(lambda result: show_search_result(ui, ws, worker, result))
+    worker.failed.connect(lambda error: show_search_error(ui, worker, error))
+    worker.finished.connect(lambda: ui.running_search_workers.discard(worker))
 
-def update_searched_workshops(ui: GuiWindow, ws: WorkshopsTool) -> list:
-    """Return the correct workshops based on selected options."""
+    if not live:
+        # A search as you type still waiting for typing to pause would replace this one.
+        ui.live_search_timer.stop()
+        ui.statusbar.showMessage("Searching...")
+    worker.start()
+
+    return worker
+
+
+def get_search_parameters(ui: GuiWindow) -> dict:
+    """
+    Return the WorkshopsTool.search_workshops arguments for the selected options. The Session ID
+    takes priority over the date range.
+    """
+
+    parameters: dict = {"phrase": ui.lineEditPhrase.text()}
 
     if ui.lineEditWorkshopID.text() != "":
-        try:
-            workshops = ws.get_matching_workshops_by_id(ui.lineEditWorkshopID.text())
-        except AttributeError:
-            workshops = []
+        parameters["workshop_id"] = ui.lineEditWorkshopID.text()
     elif ui.checkBoxUseDate.isChecked():
-        starting_date: tuple = ui.calendarWidget_StartDate.selectedDate().getDate()
-        ending_date: tuple = ui.calendarWidget_EndDate.selectedDate().getDate()        
-        workshops  = ws.get_matching_workshops_by_date_range(starting_date, ending_date)
-    else:
-        workshops  = ws.get_matching_workshops()
+        parameters["start_date"] = ui.calendarWidget_StartDate.selectedDate().getDate()
+        parameters["end_date"] = ui.calendarWidget_EndDate.selectedDate().getDate()
+
+    return parameters
+
+
+def show_search_result(ui: GuiWindow, ws: WorkshopsTool, worker: SearchWorker, result: tuple) -> None:
+    """Show the result of the latest search and keep it for the exports."""
+
+    if worker is not ui.search_worker:
+        return
+
+    phrase, workshops, text_to_display = result
+    ws.set_search_phrase(phrase)
+    ws.set_search_results(workshops)
+
+    with span("result view"):
+        ui.show_search_results(workshops)
+
+    ui.textOutputField.setPlainText(text_to_display)
+    ui.statusbar.showMessage(worker.operation.get_summary_text())
+
+
+def show_search_error(ui: GuiWindow, worker: SearchWorker, error: Exception) -> None:
+    """Report a search that failed, unless a newer search replaced it."""
+
+    print(error)
 
-    return workshops
+    if worker is ui.search_worker:
+        ui.statusbar.showMessage(f"The search failed: {error}")
 
 
-def check_button_options(ui: GuiWindow) -> bool:
-    """Return true if any button is checked."""
+def run_timed(ui: GuiWindow, name: str, action: Callable[[], None]) -> None:
+    """Run a user action as a timed operation and show where its time went in the status bar."""
 
-    return (
-        ui.checkBoxWsID.isChecked()
-        or ui.checkBoxWsStartDate.isChecked()
-        or ui.checkBoxWsPartNumbers.isChecked()
-        or ui.checkBoxWsName.isChecked()
-        or ui.checkBoxWsURL.isChecked()
-    )
+    with Operation(name) as operation:
+        action()
 
+    ui.statusbar.showMessage(operation.get_summary_text())
 
-def update_database(main_window: QMainWindow, ws: WorkshopsTool, ui: GuiWindow) -> None:
-    """Attempts to handle connecting to the website and database."""
 
-    ui.textOutputField.clear()
+def export_to_excel(ui: GuiWindow, ws: WorkshopsTool) -> None:
+    """Ask for a file name and export the searched workshops to it."""
 
-    try:
-        ws.setup_workshop_information()
-        ui.textOutputField.insertPlainText(get_welcome_text())
-    except ConnectionError:
-        ui.textOutputField.insertPlainText(get_welcome_text_for_offline())
-    except TypeError:
-        ui.textOutputField.insertPlainText(get_server_error_text())
-    except FileNotFoundError as e:
-        ui.textOutputField.insertPlainText(get_missing_file_text())
+    file_name: Optional[str] = ui.excel_filename_popup_box()
+
+    # Only save file if the user provided a file name and didn't cancel.
+    if file_name != None:
+        # openpyxl is only loaded once the first export needs it, to keep startup fast.
+        from excel_creator import ExcelCreator
+
+        ExcelCreator().export_workshops_info(ws, file_name)
+
+
+def export_to_google_sheets(ui: GuiWindow, ws: WorkshopsTool) -> None:
+    """Ask for a sheet name and folder and export the searched workshops to a new google sheet."""
+
+    file_and_folder_info: Optional[tuple] = ui.google_filename_popup_box()
+
+    if file_and_folder_info != None:
+        # The Google API client is the slowest import of the app, so it waits for an export.
+        from google_sheets_creator import GoogleSheetCreator
+
+        GoogleSheetCreator().export_workshops_info(ws, file_and_folder_info)
+
+
+def update_database(main_window: QMainWindow, ws: WorkshopsTool, ui: GuiWindow) -> Optional[RefreshWorker]:
+    """
+    Start refreshing the database in a background thread and return the worker.
+    Searches keep working against the current database while it runs.
+    """
+
+    if ui.refresh_worker != None and ui.refresh_worker.isRunning():
+        return None
+
+    worker = RefreshWorker(ws)
+    ui.refresh_worker = worker
+
+    worker.progress.connect(ui.show_refresh_progress)
+    worker.succeeded.connect(lambda: show_update_result(ui, get_welcome_text(), worker.operation))
+    worker.failed.connect(lambda error: show_update_result(ui, get_update_error_text(error), worker.operation))
+    worker.cancelled.connect(lambda: show_update_result(ui, get_cancelled_text(), worker.operation))
+    worker.finished.connect(lambda: ui.set_refresh_running(False))
+    worker.finished.connect(lambda: update_data_age(ui, ws))
+
+    ui.set_refresh_running(True)
+    ui.statusbar.showMessage("Updating database...")
+    worker.start()
 
     main_window.repaint()
 
+    return worker
+
+
+def show_update_result(ui: GuiWindow, text: str, operation: Optional[Operation] = None) -> None:
+    """
+    Report the outcome of a refresh, and where its time went, without replacing search results
+    the user is reading.
+    """
 
-def get_workshop_display_text(ui: GuiWindow, ws: WorkshopsTool, button_check: bool) -> str:
-    display_text = list()
-    display_text.append(f"Number of matching workshops: {ws.get_number_of_workshops()}\n\n")
-    display_text.append(f"Total Signed Up: {ws.get_number_of_participants()}\n\n")
+    status_text: str = text.split("\n")[0]
+    if operation != None:
+        status_text = f"{status_text} {operation.get_summary_text()}"
 
-    if button_check:
-        display_text = setup_workshop_information_text(ui, display_text, ws)
+    ui.statusbar.showMessage(status_text)
 
-    display_text.append(f"All emails for these workshops:\n\n{ws.get_emails()}")
+    if ui.textOutputField.document().isEmpty():
+        ui.textOutputField.insertPlainText(text)
+
+
+def get_update_error_text(error: Exception) -> str:
+    """Return the message that matches an error raised while updating the database."""
+
+    if isinstance(error, (ConnectionError, RequestException)):
+        return get_welcome_text_for_offline()
+    elif isinstance(error, FileNotFoundError):
+        return get_missing_file_text()
+    elif isinstance(error, LoginFailed):
+        return get_login_failed_text()
+    else:
+        print(error)
+        return get_server_error_text()
+
+
+def update_data_age(ui: GuiWindow, ws: WorkshopsTool) -> None:
+    """Show how old the workshop data being searched is."""
+
+    ui.labelDataAge.setText(get_data_age_text(ws.get_last_refresh_time()))
+
+
+def get_data_age_text(last_refresh: Optional[datetime]) -> str:
+    """Return a short description of how long ago the database was refreshed."""
+
+    if last_refresh == None:
+        return "No workshop data yet"
+
+    minutes: int = int((datetime.now() - last_refresh).total_seconds() // 60)
+
+    if minutes < 1:
+        return "Data updated just now"
+    elif minutes < 60:
+        return f"Data updated {minutes} min ago"
+    elif minutes < 60 * 24:
+        return f"Data updated {minutes // 60} h ago"
+    else:
+        return f"Data updated {minutes // (60 * 24)} days ago"
+
+
+def get_workshop_display_text(ws: WorkshopsTool, workshops: list) -> str:
+    """Return the totals and emails of the found workshops, which are listed in the results table."""
+
+    with span("display text"):
+        display_text = list()
+        display_text.append(f"Number of matching workshops: {len(workshops)}\n\n")
+        display_text.append(f"Total Signed Up: {sum(workshop['workshop_signed_up'] for workshop in workshops)}\n\n")
+
+        display_text.append(f"All emails for these workshops:\n\n{ws.get_emails(workshops)}")
     
-    return "".join(display_text)
+        return "".join(display_text)
 
 
 def get_welcome_text() -> str:
@@ -96,6 +234,12 @@ def get_welcome_text() -> str:
     return "\n".join(welcome_text)
 
 
+def get_startup_text() -> str:
+    """Get text that first appears in output window when opening on the saved database."""
+
+    return "\n".join(get_welcome_text().split("\n")[2:])
+
+
 def get_welcome_text_for_offline() -> str:
     """Get text that first appears in output window if offline."""
 
@@ -109,6 +253,14 @@ def get_welcome_text_for_offline() -> str:
     return "\n".join(offline_text)
 
 
+def get_cancelled_text() -> str:
+    """Return cancelled update message."""
+
+    cancelled_text: str = "The database update was cancelled. Your previous workshops are still available."
+
+    return cancelled_text
+
+
 def get_server_error_text() -> str:
     """Return server error message."""
 
@@ -117,6 +269,14 @@ def get_server_error_text() -> str:
     return server_error_text
 
 
+def get_login_failed_text() -> str:
+    """Return sign-in failure message."""
+
+    login_failed_text: str = "Could not sign in to the workshop site...\nCheck your user name and password with Update Credentials."
+
+    return login_failed_text
+
+
 def get_missing_file_text() -> str:
     """Return missing file message. """
 
@@ -125,49 +285,5 @@ def get_missing_file_text() -> str:
     return missing_file_text
 
 
-def setup_workshop_information_text(ui: GuiWindow, display_text: str, ws: WorkshopsTool) -> str:
-    """Prepare the output of the workshops based on selected information."""
-
-    for workshop in ws.get_most_recent_search_results():
-        text = list()
-        if ui.checkBoxWsID.isChecked():
-            text.append(f"{workshop['workshop_id']}")
-        if ui.checkBoxWsStartDate.isChecked():
-            text.append(f"{workshop['workshop_start_date_and_time']}")
-        if ui.checkBoxWsPartNumbers.isChecked():
-            text.append(f"{workshop['workshop_signed_up']}/{workshop['workshop_participant_capacity']}")
-        if ui.checkBoxWsName.isChecked():
-            text.append(f"{workshop['workshop_name']}")
-        if ui.checkBoxWsURL.isChecked():
-            text.append(f"\n   Url: {workshop['workshop_url']}")
-
-        display_text.append(" - ".join(text))
-        display_text.append("\n")
-
-        if (
-            ui.checkBoxNames.isChecked()
-            or ui.checkBoxEmails.isChecked()
-            or ui.checkBoxSchools.isChecked()
-        ):
-
-            display_text.append("   Contact Information:\n")
-
-            for participant_info in workshop["workshop_participant_info_list"]:
-                text = list()
-                if ui.checkBoxNames.isChecked():
-                    text.append(f'{participant_info["name"]}')
-                if ui.checkBoxEmails.isChecked():
-                    text.append(f'{participant_info["email"]}')
-                if ui.checkBoxSchools.isChecked():
-                    text.append(f'{participant_info["school"]}')
-                display_text.append("    + ")
-                display_text.append(" - ".join(text))
-                display_text.append("\n")
-
-        display_text.append("\n")
-
-    return display_text
-
-    
 if __name__ == '__main__':
     print('This is a module...')
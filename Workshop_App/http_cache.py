@@ -0,0 +1,166 @@
+# Module to keep scraped pages between refreshes so unchanged pages are not parsed again.
+
+
+from sqlite3 import connect
+from threading import Lock
+from hashlib import sha256
+from json import dumps, loads
+from time import time
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    Persistent, size bounded cache of parsed pages keyed by URL. Each entry keeps the ETag,
+    Last-Modified and a hash of the body so requests can be conditional and unchanged bodies
+    can skip parsing. The least recently used entries are evicted once max_bytes is exceeded.
+    """
+
+    def __init__(self, cache_file: str = "http_cache.db", max_bytes: int = 200 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+        # Crawl threads share the connection, the lock serialises their use of it.
+        self.connection = connect(cache_file, check_same_thread=False)
+        self.c = self.connection.cursor()
+        self.c.execute("PRAGMA journal_mode = WAL;")
+        self.c.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                parsed TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );"""
+        )
+        self.c.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);")
+        self.connection.commit()
+
+        self.reset_stats()
+
+
+    def reset_stats(self) -> None:
+        """Clear the hit and miss counters, usually at the start of a refresh."""
+
+        with self.lock:
+            self.not_modified_hits: int = 0
+            self.unchanged_hits: int = 0
+            self.misses: int = 0
+
+
+    def get_stats(self) -> dict:
+        """Return the hit and miss counters since the last reset."""
+
+        with self.lock:
+            hits: int = self.not_modified_hits + self.unchanged_hits
+            total: int = hits + self.misses
+
+            return {
+                "not_modified_hits": self.not_modified_hits,
+                "unchanged_hits": self.unchanged_hits,
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total > 0 else 0.0
+            }
+
+
+    def get_conditional_headers(self, url: str) -> dict:
+        """Return the If-None-Match and If-Modified-Since headers for a cached URL."""
+
+        with self.lock:
+            row = self.c.execute("SELECT etag, last_modified FROM responses WHERE url = ?", (url,)).fetchone()
+
+        headers = dict()
+        if row != None:
+            if row[0] != None:
+                headers["If-None-Match"] = row[0]
+            if row[1] != None:
+                headers["If-Modified-Since"] = row[1]
+
+        return headers
+
+
+    def get_not_modified(self, url: str):
+        """Return the parsed page for a 304 Not Modified response or None if it is not cached."""
+
+        return self.use_entry(url, None, "not_modified_hits")
+
+
+    def get_unchanged(self, url: str, body: bytes):
+        """Return the parsed page if the body matches the cached one or None if it changed."""
+
+        return self.use_entry(url, self.hash_body(body), "unchanged_hits")
+
+
+    def use_entry(self, url: str, content_hash: Optional[str], counter: str):
+        """Return a cached parsed page, count the hit, and mark it as recently used."""
+
+        with self.lock:
+            row = self.c.execute("SELECT content_hash, parsed FROM responses WHERE url = ?", (url,)).fetchone()
+
+            if row == None or (content_hash != None and row[0] != content_hash):
+                self.misses += 1
+                return None
+
+            setattr(self, counter, getattr(self, counter) + 1)
+            with self.connection:
+                self.c.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time(), url))
+
+        return loads(row[1])
+
+
+    def store(self, url: str, headers: dict, body: bytes, parsed) -> None:
+        """Cache the parsed page with the validators from the response headers."""
+
+        parsed_text: str = dumps(parsed)
+
+        with self.lock:
+            with self.connection:
+                self.c.execute(
+                    """INSERT OR REPLACE INTO responses (url, etag, last_modified, content_hash, parsed, size, last_used)
+                    VALUES (?,?,?,?,?,?,?)""",
+                    (
+                        url,
+                        headers.get("ETag"),
+                        headers.get("Last-Modified"),
+                        self.hash_body(body),
+                        parsed_text,
+                        len(url) + len(parsed_text),
+                        time()
+                    )
+                )
+                self.evict()
+
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in max_bytes."""
+
+        total_size: int = self.c.execute("SELECT coalesce(sum(size), 0) FROM responses").fetchone()[0]
+
+        if total_size <= self.max_bytes:
+            return
+
+        for url, size in self.c.execute("SELECT url, size FROM responses ORDER BY last_used").fetchall():
+            self.c.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+
+    def hash_body(self, body: bytes) -> str:
+        """Return the hash used to tell whether a page body changed."""
+
+        return sha256(body).hexdigest()
+
+
+    def close(self) -> None:
+        """Close the cache database."""
+
+        with self.lock:
+            self.c.close()
+            self.connection.close()
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -0,0 +1,394 @@
+# Module to make the scraper's HTTP requests resilient to a slow or failing site.
+
+# Every request waits for the adaptive rate limiter, is refused while the circuit breaker is
+# open, has a connect and read timeout, and is retried with exponential backoff after a
+# connection error or a 429/5xx response. Latencies are kept per endpoint for reporting.
+
+
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import NewConnectionError
+from collections import deque
+from threading import Lock
+from time import monotonic, sleep
+from random import uniform
+from urllib.parse import urlparse
+from typing import Optional
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpen(ConnectionError):
+    """Raised instead of sending a request while the site is considered down."""
+
+
+def is_connect_failure(error: Exception) -> bool:
+    """Return whether error means no connection was made, so nothing reached the site."""
+
+    if isinstance(error, ConnectTimeout):
+        return True
+
+    # Requests wraps a refused connection in a MaxRetryError whose reason is the urllib3 error.
+    reason = getattr(error.args[0], "reason", None) if len(error.args) > 0 else None
+
+    return isinstance(reason, NewConnectionError)
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing rate requests per second with bursts of up to burst requests.
+    The rate is adjusted after every window of at least window_requests requests and
+    window_seconds: it halves when more than max_error_rate of the window failed, shrinks when
+    the average latency rose above both twice the quickest average seen and slow_latency
+    seconds, and grows otherwise.
+    It stays between min_rate and max_rate.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: int = 10,
+        window_requests: int = 10,
+        window_seconds: float = 0.25,
+        max_error_rate: float = 0.1,
+        slow_latency: float = 0.2
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.window_requests = window_requests
+        self.window_seconds = window_seconds
+        self.max_error_rate = max_error_rate
+        self.slow_latency = slow_latency
+        self.tokens: float = burst
+        self.updated_at: float = monotonic()
+        self.window_started_at: float = monotonic()
+        self.window_successes: int = 0
+        self.window_failures: int = 0
+        self.average_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.lock = Lock()
+
+
+    def acquire(self) -> None:
+        """Wait until a request may be sent."""
+
+        while True:
+            with self.lock:
+                now: float = monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait: float = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+    def record_success(self, latency: float) -> None:
+        """Count a successful request and its latency."""
+
+        with self.lock:
+            if self.average_latency == None:
+                self.average_latency = latency
+            else:
+                self.average_latency = 0.9 * self.average_latency + 0.1 * latency
+            if self.baseline_latency == None or self.average_latency < self.baseline_latency:
+                self.baseline_latency = self.average_latency
+
+            self.window_successes += 1
+            self.adjust_rate()
+
+
+    def record_failure(self) -> None:
+        """Count a failed request."""
+
+        with self.lock:
+            self.window_failures += 1
+            self.adjust_rate()
+
+
+    def adjust_rate(self) -> None:
+        """Change the rate at the end of a window. Called with the lock held."""
+
+        total: int = self.window_successes + self.window_failures
+        now: float = monotonic()
+        if total < self.window_requests or now - self.window_started_at < self.window_seconds:
+            return
+
+        if self.window_failures / total > self.max_error_rate:
+            self.rate = max(self.min_rate, self.rate * 0.5)
+        elif self.average_latency != None and self.average_latency > max(2 * self.baseline_latency, self.slow_latency):
+            self.rate = max(self.min_rate, self.rate * 0.75)
+        else:
+            self.rate = min(self.max_rate, self.rate * 1.2)
+
+        self.window_started_at = now
+        self.window_successes = 0
+        self.window_failures = 0
+
+
+class CircuitBreaker:
+    """
+    Stops requests after failure_threshold failures in a row. Once reset_seconds have passed a
+    single trial request is let through, which closes the breaker again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures: int = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running: bool = False
+        self.lock = Lock()
+
+
+    def before_request(self) -> None:
+        """Raise CircuitOpen if a request may not be sent now."""
+
+        with self.lock:
+            if self.opened_at == None:
+                return
+            if monotonic() - self.opened_at < self.reset_seconds or self.trial_running:
+                raise CircuitOpen(f"The site failed {self.failures} times in a row, requests are paused.")
+            self.trial_running = True
+
+
+    def end_trial(self) -> None:
+        """Let another trial request through after one ended without a verdict."""
+
+        with self.lock:
+            self.trial_running = False
+
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the breaker at the threshold or when a trial fails."""
+
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = monotonic()
+            self.trial_running = False
+
+
+class LatencyTracker:
+    """Keeps the latest max_samples latencies of each endpoint, the URL path, with error counts."""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.lock = Lock()
+        self.reset()
+
+
+    def reset(self) -> None:
+        """Forget the recorded latencies, usually at the start of a refresh."""
+
+        with self.lock:
+            self.latencies: dict = dict()
+            self.errors: dict = dict()
+
+
+    def record(self, url: str, latency: float, ok: bool) -> None:
+        """Record the latency of a request and whether it failed."""
+
+        endpoint: str = urlparse(url).path
+
+        with self.lock:
+            if endpoint not in self.latencies:
+                self.latencies[endpoint] = deque(maxlen=self.max_samples)
+                self.errors[endpoint] = 0
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+    def get_stats(self) -> dict:
+        """Return {endpoint: {"count", "errors", "p50", "p90", "p99", "max"}} with latencies in seconds."""
+
+        with self.lock:
+            samples: dict = {endpoint: sorted(latencies) for endpoint, latencies in self.latencies.items()}
+            errors: dict = dict(self.errors)
+
+        stats = dict()
+        for endpoint, latencies in samples.items():
+            stats[endpoint] = {
+                "count": len(latencies),
+                "errors": errors[endpoint],
+                "p50": self.get_percentile(latencies, 50),
+                "p90": self.get_percentile(latencies, 90),
+                "p99": self.get_percentile(latencies, 99),
+                "max": latencies[-1],
+            }
+
+        return stats
+
+
+    def get_percentile(self, sorted_latencies: list, percentile: float) -> float:
+        """Return the nearest-rank percentile of sorted latencies."""
+
+        rank: int = max(1, -(-len(sorted_latencies) * percentile // 100))
+
+        return sorted_latencies[int(rank) - 1]
+
+
+class ResilientHttpClient:
+    """
+    Sends the requests of a Session through the rate limiter, circuit breaker and retry logic.
+    Settings come from connection_info.json, see make_client_settings for the entries.
+    """
+
+    def __init__(self, session: Session, settings: dict):
+        self.session = session
+        self.connect_timeout: float = settings["connect_timeout"]
+        self.read_timeout: float = settings["read_timeout"]
+        self.max_retries: int = settings["max_retries"]
+        self.backoff_seconds: float = settings["backoff_seconds"]
+        self.max_backoff_seconds: float = settings["max_backoff_seconds"]
+        self.rate_limiter = TokenBucket(
+            settings["requests_per_second"],
+            settings["min_requests_per_second"],
+            settings["max_requests_per_second"]
+        )
+        self.circuit_breaker = CircuitBreaker(settings["circuit_breaker_failures"], settings["circuit_breaker_reset_seconds"])
+        self.latencies = LatencyTracker()
+        self.set_pool_size(settings["pool_size"])
+
+
+    def set_pool_size(self, pool_size: int) -> None:
+        """Keep up to pool_size connections open. Requests beyond that wait for a free connection."""
+
+        old_adapters: set = {self.session.adapters.get(prefix) for prefix in ("https://", "http://")}
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # The replaced adapters would otherwise keep their pooled connections open.
+        for old_adapter in old_adapters:
+            if old_adapter != None:
+                old_adapter.close()
+
+
+    def get(self, url: str, headers: Optional[dict] = None) -> Response:
+        """GET a page, retrying connection errors, timeouts, 429 and 5xx responses."""
+
+        return self.request("GET", url, self.max_retries, headers=headers)
+
+
+    def post(self, url: str, data: dict) -> Response:
+        """
+        POST a form. Only failures to connect, a refused connection or a connect timeout, are
+        retried, so a form is never posted twice.
+        """
+
+        return self.request("POST", url, self.max_retries, data=data)
+
+
+    def request(self, method: str, url: str, max_retries: int, **kwargs) -> Response:
+        """
+        Send a request with up to max_retries retries. The last 429/5xx response is returned
+        once the retries run out, while connection errors and timeouts are raised.
+        """
+
+        for attempt in range(max_retries + 1):
+            self.circuit_breaker.before_request()
+            self.rate_limiter.acquire()
+
+            start_time: float = monotonic()
+            try:
+                response: Response = self.session.request(
+                    method, url, timeout=(self.connect_timeout, self.read_timeout), **kwargs
+                )
+            except (RequestsConnectionError, Timeout) as error:
+                self.record_failure(url, monotonic() - start_time)
+                # A POST that failed after connecting may have arrived, so it is only retried
+                # when the connection could not be made.
+                if attempt == max_retries or (method == "POST" and not is_connect_failure(error)):
+                    raise
+                self.wait_before_retry(attempt, None)
+                continue
+            except Exception:
+                # Errors such as a bad URL say nothing about the site being up.
+                self.circuit_breaker.end_trial()
+                raise
+
+            latency: float = monotonic() - start_time
+
+            if response.status_code in RETRY_STATUS_CODES:
+                self.record_failure(url, latency)
+                if attempt == max_retries or method == "POST":
+                    return response
+                self.wait_before_retry(attempt, response.headers.get("Retry-After"))
+                continue
+
+            self.latencies.record(url, latency, True)
+            self.rate_limiter.record_success(latency)
+            self.circuit_breaker.record_success()
+
+            return response
+
+
+    def record_failure(self, url: str, latency: float) -> None:
+        """Tell the rate limiter, circuit breaker and latency tracker about a failed request."""
+
+        self.latencies.record(url, latency, False)
+        self.rate_limiter.record_failure()
+        self.circuit_breaker.record_failure()
+
+
+    def wait_before_retry(self, attempt: int, retry_after: Optional[str]) -> None:
+        """
+        Sleep for the Retry-After seconds or an exponential backoff with jitter, but no longer
+        than max_backoff_seconds so a refresh is never held up for as long as the site asks.
+        """
+
+        if retry_after != None and retry_after.isdigit():
+            seconds: float = int(retry_after)
+        else:
+            seconds = self.backoff_seconds * 2 ** attempt * uniform(0.5, 1.5)
+
+        sleep(min(seconds, self.max_backoff_seconds))
+
+
+    def get_latency_stats(self) -> dict:
+        """Return the latency percentiles of each endpoint since the last reset."""
+
+        return self.latencies.get_stats()
+
+
+def make_client_settings(connection_info: dict) -> dict:
+    """Read the HTTP client settings from connection_info.json, using defaults for missing entries."""
+
+    defaults: dict = {
+        "pool_size": 10,
+        "connect_timeout": 5.0,
+        "read_timeout": 30.0,
+        "max_retries": 3,
+        "backoff_seconds": 0.5,
+        "max_backoff_seconds": 30.0,
+        "requests_per_second": 25.0,
+        "min_requests_per_second": 1.0,
+        "max_requests_per_second": 200.0,
+        "circuit_breaker_failures": 5,
+        "circuit_breaker_reset_seconds": 30.0,
+    }
+
+    return {name: type(default)(connection_info.get(name, default)) for name, default in defaults.items()}
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -0,0 +1,402 @@
+# Module to time the slow parts of the app and, when asked, profile them.
+
+# Hot paths wrap their work in span("name"). A user action such as a refresh, search or
+# export runs inside an Operation, which collects the spans recorded on its behalf, summarises
+# them for the status bar and appends them to TIMINGS_LOG_FILE. Caches count their hits and
+# misses with record_cache_lookup, and an operation reports its hit rate alongside its spans.
+
+# The running operations are kept in a context variable, so a search made while a refresh
+# runs in the background only reports its own spans. Threads working for an operation must
+# run in a copy of its context, executor.submit(copy_context().run, function, ...), and their
+# spans add up, so a span can total more than the wall time of a refresh whose pages are
+# fetched in parallel. Every span also goes into the process wide timings.
+
+# Setting the WORKSHOP_APP_PROFILE environment variable, or starting the app with --profile,
+# also runs each operation under cProfile and tracemalloc and writes the reports to
+# PROFILE_FOLDER. The variable may list operation names, "refresh,excel export", to profile
+# only those. cProfile only sees the thread running the operation, the spans still cover the
+# crawl threads and parsing processes.
+
+# import_timer times the modules the app imports while it starts, like python -X importtime,
+# so the app can report what its cold start is spent on.
+
+
+import builtins
+import cProfile
+import pstats
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from importlib.util import resolve_name
+from os import environ, makedirs, path
+from threading import Lock, get_ident
+from time import perf_counter
+from typing import Iterator, Optional
+
+
+TIMINGS_LOG_FILE = "timings.log"
+PROFILE_FOLDER = "profiles"
+PROFILE_ENV_VAR = "WORKSHOP_APP_PROFILE"
+
+
+class SpanTimings:
+    """Thread safe totals of the count and seconds of every span name."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.spans: dict = dict()
+
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one span that took seconds, for work timed elsewhere such as in another process."""
+
+        with self.lock:
+            count, total = self.spans.get(name, (0, 0.0))
+            self.spans[name] = (count + 1, total + seconds)
+
+
+    def snapshot(self) -> dict:
+        """Return a copy of the totals, {name: (count, seconds)}."""
+
+        with self.lock:
+            return dict(self.spans)
+
+
+class CacheCounters:
+    """Thread safe totals of the hits and misses of every cache name."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.lookups: dict = dict()
+
+
+    def record(self, name: str, hit: bool) -> None:
+        """Count one lookup in the cache called name."""
+
+        with self.lock:
+            hits, misses = self.lookups.get(name, (0, 0))
+            self.lookups[name] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+
+    def snapshot(self) -> dict:
+        """Return a copy of the totals, {name: (hits, misses)}."""
+
+        with self.lock:
+            return dict(self.lookups)
+
+
+timings = SpanTimings()
+cache_counters = CacheCounters()
+# The operations the code running in this context works for, innermost last.
+active_operations: ContextVar = ContextVar("active_operations", default=())
+profiling_lock = Lock()
+profiling_requested: bool = False
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the body of a with statement under name."""
+
+    start_time: float = perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, perf_counter() - start_time)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add a span, for example one timed in another process, to the running operations."""
+
+    timings.record(name, seconds)
+    for operation in active_operations.get():
+        operation.timings.record(name, seconds)
+
+
+def record_cache_lookup(name: str, hit: bool) -> None:
+    """Count a hit or a miss of a cache for the running operations."""
+
+    cache_counters.record(name, hit)
+    for operation in active_operations.get():
+        operation.cache_counters.record(name, hit)
+
+
+def get_hit_rate(hits: int, misses: int) -> float:
+    """Return the share of lookups that were hits, 0.0 without lookups."""
+
+    return hits / (hits + misses) if hits + misses > 0 else 0.0
+
+
+def enable_profiling() -> None:
+    """Profile every operation from now on, as the --profile flag does."""
+
+    global profiling_requested
+    profiling_requested = True
+
+
+def is_profiling_enabled(operation_name: str) -> bool:
+    """Return True if operation_name should run under the profilers."""
+
+    if profiling_requested:
+        return True
+
+    setting: str = environ.get(PROFILE_ENV_VAR, "").strip().lower()
+    if setting in ("", "0", "false", "no"):
+        return False
+    if setting in ("1", "true", "yes", "all"):
+        return True
+
+    return operation_name.lower() in [name.strip() for name in setting.split(",")]
+
+
+class Operation:
+    """
+    Times one user action, such as a refresh or an export, for use in a with statement.
+    The spans recorded in its context while it runs are written to TIMINGS_LOG_FILE when it
+    ends, and get_summary_text returns them for the status bar.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds: float = 0.0
+        self.spans: dict = dict()
+        self.cache_lookups: dict = dict()
+        self.failed: bool = False
+        self.start_time: float = 0.0
+        self.timings = SpanTimings()
+        self.cache_counters = CacheCounters()
+        self.context_token = None
+        self.profiler: Optional[cProfile.Profile] = None
+
+
+    def __enter__(self):
+        if is_profiling_enabled(self.name):
+            self.start_profiling()
+
+        self.timings = SpanTimings()
+        self.cache_counters = CacheCounters()
+        self.context_token = active_operations.set(active_operations.get() + (self,))
+        self.start_time = perf_counter()
+
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.seconds = perf_counter() - self.start_time
+        active_operations.reset(self.context_token)
+        self.spans = self.timings.snapshot()
+        self.cache_lookups = self.cache_counters.snapshot()
+        self.failed = exc_type != None
+
+        if self.profiler != None:
+            self.stop_profiling()
+
+        try:
+            self.write_log()
+        except OSError as error:
+            print(f"Could not write {TIMINGS_LOG_FILE}: {error}")
+
+        return False
+
+
+    def get_sorted_spans(self) -> list:
+        """Return [(name, count, seconds)] with the slowest spans first."""
+
+        return sorted(((name, count, total) for name, (count, total) in self.spans.items()), key=lambda span: -span[2])
+
+
+    def get_summary_text(self, max_spans: int = 5) -> str:
+        """Return a one line summary of the operation, its slowest spans and its cache hits."""
+
+        spans: list = [
+            f"{name} {total:.2f} s" if count == 1 else f"{name} {count}x {total:.2f} s"
+            for name, count, total in self.get_sorted_spans()[:max_spans]
+        ]
+        spans.extend(f"{name} {hits}/{hits + misses} hits" for name, (hits, misses) in sorted(self.cache_lookups.items()))
+        summary: str = f"{self.name.capitalize()} took {self.seconds:.2f} s"
+
+        return f"{summary}: {', '.join(spans)}" if len(spans) > 0 else summary
+
+
+    def write_log(self) -> None:
+        """Append the operation and all of its spans to TIMINGS_LOG_FILE."""
+
+        lines: list = [
+            f"{datetime.now().isoformat(timespec='seconds')} {self.name} "
+            f"{'failed' if self.failed else 'finished'} in {self.seconds:.3f} s"
+        ]
+        for name, count, total in self.get_sorted_spans():
+            lines.append(f"    {name}: {count} x, {total:.3f} s total, {total / count * 1000:.1f} ms average")
+        for name, (hits, misses) in sorted(self.cache_lookups.items()):
+            lines.append(f"    {name}: {hits} hits, {misses} misses, {get_hit_rate(hits, misses):.0%} hit rate")
+
+        with open(TIMINGS_LOG_FILE, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+    def start_profiling(self) -> None:
+        """Start cProfile and tracemalloc unless another operation is being profiled."""
+
+        if not profiling_lock.acquire(blocking=False):
+            print(f"Not profiling {self.name}, another operation is being profiled.")
+            return
+
+        tracemalloc.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+
+    def stop_profiling(self) -> None:
+        """Stop the profilers and write their reports to PROFILE_FOLDER."""
+
+        self.profiler.disable()
+        memory_snapshot = tracemalloc.take_snapshot()
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        try:
+            makedirs(PROFILE_FOLDER, exist_ok=True)
+            report_name: str = path.join(PROFILE_FOLDER, f"{self.name.replace(' ', '_')}_{datetime.now():%Y%m%d_%H%M%S}")
+
+            # The .prof file opens in snakeviz or pstats, the .txt file is readable as is.
+            self.profiler.dump_stats(f"{report_name}.prof")
+            with open(f"{report_name}.txt", "w") as f:
+                stats = pstats.Stats(self.profiler, stream=f)
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+
+            with open(f"{report_name}_memory.txt", "w") as f:
+                f.write(f"Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MB, at the end: {current_bytes / 1024 / 1024:.1f} MB\n\n")
+                for statistic in memory_snapshot.statistics("lineno")[:30]:
+                    f.write(f"{statistic}\n")
+
+            print(f"Profile of {self.name} written to {report_name}.txt and {report_name}_memory.txt")
+        except OSError as error:
+            print(f"Could not write the profile of {self.name}: {error}")
+        finally:
+            self.profiler = None
+            profiling_lock.release()
+
+
+class ImportTimer:
+    """
+    Times the modules imported between start and stop by wrapping builtins.__import__.
+    Each module gets its cumulative time, including the modules it imported, and its self
+    time. Only imports on the thread that called start are timed.
+    """
+
+    def __init__(self):
+        self.original_import = None
+        self.thread_id: Optional[int] = None
+        self.modules: dict = dict()
+        self.child_seconds: list = list()
+        self.import_seconds: float = 0.0
+        self.started_at: float = 0.0
+        self.stopped_at: Optional[float] = None
+
+
+    def start(self) -> None:
+        """Start timing imports."""
+
+        self.original_import = builtins.__import__
+        self.thread_id = get_ident()
+        self.started_at = perf_counter()
+        builtins.__import__ = self.timed_import
+
+
+    def stop(self) -> None:
+        """Stop timing imports, the time since start is the startup time."""
+
+        if builtins.__import__ == self.timed_import:
+            builtins.__import__ = self.original_import
+        self.stopped_at = perf_counter()
+
+
+    def timed_import(self, name: str, globals=None, locals=None, fromlist=(), level: int = 0):
+        """Stand-in for builtins.__import__ that times imports which load new modules."""
+
+        # Imports of modules that are already loaded only cost a dictionary lookup.
+        if get_ident() != self.thread_id or (level == 0 and not fromlist and name in sys.modules):
+            return self.original_import(name, globals, locals, fromlist, level)
+
+        modules_before: int = len(sys.modules)
+        self.child_seconds.append(0.0)
+        start_time: float = perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            seconds: float = perf_counter() - start_time
+            child_seconds: float = self.child_seconds.pop()
+            if len(self.child_seconds) > 0:
+                self.child_seconds[-1] += seconds
+            else:
+                self.import_seconds += seconds
+
+            if len(sys.modules) > modules_before:
+                module_name: str = self.get_module_name(name, globals, level)
+                self_total, cumulative_total = self.modules.get(module_name, (0.0, 0.0))
+                self.modules[module_name] = (self_total + seconds - child_seconds, cumulative_total + seconds)
+
+
+    def get_module_name(self, name: str, globals: Optional[dict], level: int) -> str:
+        """Return the absolute name of a possibly relative import."""
+
+        if level == 0:
+            return name
+
+        try:
+            return resolve_name("." * level + name, (globals or {}).get("__package__"))
+        except (ImportError, ValueError):
+            return name
+
+
+    def get_startup_seconds(self) -> float:
+        """Return the seconds from start to stop, or until now while still timing."""
+
+        return (self.stopped_at or perf_counter()) - self.started_at
+
+
+    def get_slowest_modules(self, max_modules: int) -> list:
+        """Return [(name, self seconds, cumulative seconds)] with the slowest imports first."""
+
+        modules: list = [(name, self_seconds, cumulative) for name, (self_seconds, cumulative) in self.modules.items()]
+
+        return sorted(modules, key=lambda module: -module[2])[:max_modules]
+
+
+    def get_summary_text(self) -> str:
+        """Return a one line summary for the status bar."""
+
+        return (
+            f"Started in {self.get_startup_seconds():.2f} s, "
+            f"{self.import_seconds:.2f} s of it importing {len(self.modules)} modules"
+        )
+
+
+    def get_report(self, max_modules: int = 30) -> str:
+        """Return the summary and the slowest imports, cumulative and self milliseconds."""
+
+        lines: list = [self.get_summary_text(), "", f"{'cumulative':>10} {'self':>8}  module"]
+        for name, self_seconds, cumulative in self.get_slowest_modules(max_modules):
+            lines.append(f"{cumulative * 1000:>8.1f}ms {self_seconds * 1000:>6.1f}ms  {name}")
+
+        return "\n".join(lines)
+
+
+    def write_log(self, max_modules: int = 30) -> None:
+        """Append the startup report to TIMINGS_LOG_FILE."""
+
+        report: str = "\n".join(f"    {line}" if line != "" else "" for line in self.get_report(max_modules).split("\n"))
+
+        try:
+            with open(TIMINGS_LOG_FILE, "a") as f:
+                f.write(f"{datetime.now().isoformat(timespec='seconds')} {report.strip()}\n")
+        except OSError as error:
+            print(f"Could not write {TIMINGS_LOG_FILE}: {error}")
+
+
+import_timer = ImportTimer()
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -0,0 +1,197 @@
+# Module to parse the pages scraped by connection_tool.py.
+
+# When lxml is installed pages are parsed by lxml and only the target elements are turned
+# into Python values. Otherwise BeautifulSoup parses just the target elements, picked out
+# with SoupStrainers, using the standard library parser.
+
+
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import Optional
+
+try:
+    from lxml import html as lxml_html
+    PARSER = "lxml"
+except ImportError:
+    lxml_html = None
+    PARSER = "html.parser"
+
+
+SESSION_DETAIL_IDS = [
+    "ctl00_mainBody_lblTitle",
+    "ctl00_mainBody_lblDescription",
+    "ctl00_mainBody_lblFee",
+    "ctl00_mainBody_lblCredits",
+    "ctl00_mainBody_lblSeatsFilled",
+]
+SESSION_DATES_CLASS = "form-group col-xs-12 col-sm-12 mainBodySmall"
+
+INSTRUCTOR_STRAINER = SoupStrainer("table", class_="mainBody")
+SESSION_DETAILS_STRAINER = SoupStrainer(id=SESSION_DETAIL_IDS)
+SESSION_DATES_STRAINER = SoupStrainer(class_=SESSION_DATES_CLASS)
+PARTICIPANT_STRAINER = SoupStrainer(id="RadGrid1_ctl00")
+LOGIN_STRAINER = SoupStrainer("input", attrs={"name": ["__EVENTVALIDATION", "__VIEWSTATE"]})
+# Only the sign-in page has the user name field, so pages served after a session expired have it.
+LOGIN_PAGE_MARKER = b'name="ctl00$mainBody$txtUserName"'
+
+
+def make_lxml_document(content: bytes):
+    """
+    Return the page parsed by lxml, or None when lxml is not installed or the page is not UTF-8
+    so the caller can fall back to BeautifulSoup, which detects the encoding itself.
+    """
+
+    if lxml_html == None:
+        return None
+
+    try:
+        return lxml_html.fromstring(content.decode("utf-8"))
+    except UnicodeDecodeError:
+        return None
+
+
+def find_lxml_element(document, xpath: str):
+    """Return the first element matching xpath. Like BeautifulSoup, a missing element raises AttributeError."""
+
+    elements: list = document.xpath(xpath)
+    if len(elements) == 0:
+        raise AttributeError(f"No element matches {xpath}")
+
+    return elements[0]
+
+
+def make_soup(content: bytes, strainer: Optional[SoupStrainer], parser: str, strained: bool) -> BeautifulSoup:
+    """Parse the page, keeping only the elements the strainer matches when strained is True."""
+
+    # BeautifulSoup is the fallback for lxml, so it uses the standard library parser.
+    if parser == "lxml":
+        parser = "html.parser"
+
+    if strained:
+        return BeautifulSoup(content, parser, parse_only=strainer)
+
+    return BeautifulSoup(content, parser)
+
+
+def parse_instructor_page(content: bytes, parser: str = PARSER, strained: bool = True) -> list:
+    """
+    Convert the workshop table of the instructor page into a list of lists skipping the first row:
+    ['Workshop Name', 'Workshop Date and Time', 'Workshop Enrollment']
+    """
+
+    document = make_lxml_document(content) if parser == "lxml" else None
+
+    workshops_table = []
+
+    if document != None:
+        table = find_lxml_element(document, "//table[contains(concat(' ', normalize-space(@class), ' '), ' mainBody ')]")
+        for workshop in list(table.iter("tr"))[1:]:
+            elements = list(workshop.iter("td"))[1:]
+            name = find_lxml_element(elements[0], ".//em").text_content()
+            # The start is the text after the line break in the session cell.
+            date = find_lxml_element(elements[0], ".//br").tail or ""
+            signed_up = elements[1].text_content()
+            workshops_table.append([name, date, signed_up])
+
+        return workshops_table
+
+    bs_obj = make_soup(content, INSTRUCTOR_STRAINER, parser, strained)
+
+    for workshop in bs_obj.find("table", class_="mainBody").find_all("tr")[1:]:
+        elements = workshop.find_all("td")[1:]
+        name = elements[0].find("em").text
+        date = str(elements[0]).split("<br/>")[1][0:-5]
+        signed_up = elements[1].text
+        workshops_table.append([name, date, signed_up])
+
+    return workshops_table
+
+
+def parse_session_page(content: bytes, parser: str = PARSER, strained: bool = True) -> dict:
+    """Scrapes the workshop details, dates and location out of a session page."""
+
+    document = make_lxml_document(content) if parser == "lxml" else None
+
+    if document != None:
+        dates_element = find_lxml_element(document, f'//*[@class="{SESSION_DATES_CLASS}"]')
+        date_and_location_table = [row.text_content() for row in list(dates_element.iter("tr"))[2:]]
+        details: dict = {
+            detail_id: find_lxml_element(document, f'//*[@id="{detail_id}"]').text_content()
+            for detail_id in SESSION_DETAIL_IDS
+        }
+    else:
+        details_obj = make_soup(content, SESSION_DETAILS_STRAINER, parser, strained)
+        # A strainer keeps one kind of element, so the dates table is parsed on its own.
+        dates_obj = make_soup(content, SESSION_DATES_STRAINER, parser, strained) if strained else details_obj
+
+        date_and_location_table = [row.text for row in dates_obj.find(class_=SESSION_DATES_CLASS).find_all("tr")[2:]]
+        details: dict = {detail_id: details_obj.find(id=detail_id).text for detail_id in SESSION_DETAIL_IDS}
+
+    workshop_information = dict()
+
+    date_and_location_filtered_content = [x.strip().split("\n") for x in date_and_location_table if len(x.strip()) > 0]
+    dates = [x[0] for x in date_and_location_filtered_content]
+
+    workshop_information["name"] = details["ctl00_mainBody_lblTitle"]
+    workshop_information["dates"] = "_".join(dates)
+    workshop_information["location"] = date_and_location_filtered_content[0][2]
+    workshop_information["description"] = details["ctl00_mainBody_lblDescription"]
+    workshop_information["fee"] = details["ctl00_mainBody_lblFee"]
+    workshop_information["credits"] = details["ctl00_mainBody_lblCredits"]
+    workshop_information["seats_filled"] = details["ctl00_mainBody_lblSeatsFilled"]
+
+    return workshop_information
+
+
+def parse_participant_page(content: bytes, parser: str = PARSER, strained: bool = True) -> list:
+    """Scrapes the name, email, and school of every participant out of a participant page."""
+
+    document = make_lxml_document(content) if parser == "lxml" else None
+
+    if document != None:
+        rows = [
+            [cell.text_content() for cell in list(row.iter("td"))[1:]]
+            for row in list(find_lxml_element(document, '//*[@id="RadGrid1_ctl00"]').iter("tr"))[1:]
+        ]
+    else:
+        bs_obj = make_soup(content, PARTICIPANT_STRAINER, parser, strained)
+        rows = [
+            [cell.text for cell in row.find_all("td")[1:]]
+            for row in bs_obj.find(id="RadGrid1_ctl00").find_all("tr")[1:]
+        ]
+
+    participants = []
+
+    for signed_up in rows:
+        if len(signed_up) > 0:
+            participants.append([signed_up[0], signed_up[1], signed_up[2]])
+
+    return participants
+
+
+def parse_login_fields(content: bytes, parser: str = PARSER, strained: bool = True) -> dict:
+    """Return the ASP.NET form state fields that must be posted back with the sign-in form."""
+
+    document = make_lxml_document(content) if parser == "lxml" else None
+
+    if document != None:
+        return {
+            name: find_lxml_element(document, f'//input[@name="{name}"]').get("value")
+            for name in ["__EVENTVALIDATION", "__VIEWSTATE"]
+        }
+
+    bs_obj = make_soup(content, LOGIN_STRAINER, parser, strained)
+
+    return {
+        "__EVENTVALIDATION": bs_obj.find("input", attrs={"name": "__EVENTVALIDATION"})["value"],
+        "__VIEWSTATE": bs_obj.find("input", attrs={"name": "__VIEWSTATE"})["value"],
+    }
+
+
+def is_login_page(content: bytes) -> bool:
+    """Return True if the content is the sign-in page, which the site returns once a session expires."""
+
+    return LOGIN_PAGE_MARKER in content
+
+
+if __name__ == "__main__":
+    print("This is a module...")
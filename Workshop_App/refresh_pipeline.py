@@ -0,0 +1,243 @@
+# Module to scrape workshops in three stages: fetching, parsing and writing.
+
+# Fetching waits on the network and runs on a pool of threads. Parsing is CPU bound and runs
+# on a pool of processes so it is not held back by the GIL. The thread iterating over the
+# pipeline is the single writer. Bounded queues between the stages stop a fast stage from
+# running ahead of a slow one, and workshops are only fetched a window ahead of the one the
+# writer waits for, so a slow page never leaves the whole crawl waiting in memory.
+
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from contextvars import copy_context
+from itertools import islice
+from queue import Queue, Empty, Full
+from threading import Event, Semaphore, Thread
+from page_parser import parse_session_page, parse_participant_page
+from instrumentation import record_span
+from time import perf_counter
+from typing import Iterator, Optional
+
+
+def parse_workshop_pages(session_content: Optional[bytes], participant_content: Optional[bytes]) -> tuple:
+    """
+    Parse the session and participant pages of one workshop in a worker process. Pages that
+    were served from the cache are None and are left for the caller. Returns
+    (session information, participants, error, seconds) where error is the message of a failed
+    parse and seconds the time spent parsing, which the caller adds to the "parse" span.
+    """
+
+    start_time: float = perf_counter()
+    try:
+        session_information = parse_session_page(session_content) if session_content != None else None
+        participants = parse_participant_page(participant_content) if participant_content != None else None
+    except AttributeError as error:
+        return None, None, str(error), perf_counter() - start_time
+
+    return session_information, participants, None, perf_counter() - start_time
+
+
+class RefreshPipeline:
+    """
+    Fetches the pages of many workshops with fetch_workers threads, parses them with
+    parse_processes processes and hands the results back in order to the caller.
+    At most queue_size workshops wait between two stages, and no more than queue_size, or
+    fetch_workers if that is larger, are fetched, parsed or held back for their turn at once.
+    """
+
+    def __init__(self, connector, fetch_workers: int, parse_processes: int, queue_size: int = 32):
+        self.connector = connector
+        self.fetch_workers = fetch_workers
+        self.parse_processes = parse_processes
+        self.queue_size = queue_size
+        self.stopped = Event()
+
+
+    def run(self, workshops: list, cancel_event: Optional[Event] = None) -> Iterator[tuple]:
+        """
+        Yield (workshop, session information, participants, error) for each workshop dict, which
+        needs "workshop_id" and "workshop_url", in the order of workshops. Session information
+        and participants are None when error says why the pages could not be parsed, or when
+        the workshop was skipped after a cancel.
+        """
+
+        self.stopped.clear()
+        fetched_queue = Queue(maxsize=self.queue_size)
+        parsed_queue = Queue()
+        # Each slot is a workshop being parsed or waiting for the writer.
+        parse_slots = Semaphore(self.queue_size)
+
+        self.connector.set_pool_size(self.fetch_workers)
+        fetch_executor = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        parse_executor = ProcessPoolExecutor(max_workers=self.parse_processes)
+        dispatcher = Thread(
+            target=self.dispatch,
+            args=(len(workshops), fetched_queue, parsed_queue, parse_slots, parse_executor),
+            daemon=True
+        )
+
+        # Fetches are submitted a window ahead of the workshop being waited for, so the
+        # results held back for their turn never outgrow the window.
+        fetch_window: int = max(self.queue_size, self.fetch_workers)
+        workshops_to_fetch = iter(enumerate(workshops))
+
+        def submit_fetches(count: int) -> None:
+            for index, workshop in islice(workshops_to_fetch, count):
+                # The fetch spans count towards the operation running the refresh.
+                fetch_executor.submit(copy_context().run, self.fetch, index, workshop, fetched_queue, cancel_event)
+
+        try:
+            submit_fetches(fetch_window)
+            dispatcher.start()
+
+            pending = dict()
+            for next_index in range(len(workshops)):
+                # Results arrive as they finish and are held back until their turn.
+                while next_index not in pending:
+                    index, future, workshop, pages = parsed_queue.get()
+                    parse_slots.release()
+                    pending[index] = self.collect(future, workshop, pages)
+
+                result = pending.pop(next_index)
+                if isinstance(result, Exception):
+                    raise result
+
+                submit_fetches(1)
+
+                yield result
+        finally:
+            self.stopped.set()
+            fetch_executor.shutdown(wait=True, cancel_futures=True)
+            parse_executor.shutdown(wait=True, cancel_futures=True)
+
+
+    def fetch(self, index: int, workshop: dict, fetched_queue: Queue, cancel_event: Optional[Event]) -> None:
+        """Fetch stage: download the session and participant pages of one workshop."""
+
+        if self.stopped.is_set():
+            return
+
+        if cancel_event != None and cancel_event.is_set():
+            self.put(fetched_queue, (index, workshop, None, None, None))
+            return
+
+        try:
+            session_page: dict = self.connector.fetch_page(workshop["workshop_url"])
+            participant_page: dict = self.connector.fetch_page(self.connector.get_participant_page_url(workshop["workshop_id"]))
+        except Exception as error:
+            self.put(fetched_queue, (index, workshop, None, None, error))
+            return
+
+        self.put(fetched_queue, (index, workshop, session_page, participant_page, None))
+
+
+    def dispatch(
+        self,
+        total: int,
+        fetched_queue: Queue,
+        parsed_queue: Queue,
+        parse_slots: Semaphore,
+        parse_executor: ProcessPoolExecutor
+    ) -> None:
+        """Parse stage: send the fetched pages to the worker processes as slots free up."""
+
+        for _ in range(total):
+            item: Optional[tuple] = self.get(fetched_queue)
+            if item == None or not self.acquire(parse_slots):
+                return
+
+            index, workshop, session_page, participant_page, error = item
+            pages: tuple = (session_page, participant_page)
+
+            if error != None or session_page == None:
+                future = Future()
+                if error != None:
+                    future.set_exception(error)
+                else:
+                    future.set_result((None, None, "Skipped", None))
+            elif session_page["parsed"] != None and participant_page["parsed"] != None:
+                # Both pages came from the cache, so there is nothing left to parse.
+                future = Future()
+                future.set_result((None, None, None, None))
+            else:
+                try:
+                    future = parse_executor.submit(
+                        parse_workshop_pages,
+                        session_page["content"] if session_page["parsed"] == None else None,
+                        participant_page["content"] if participant_page["parsed"] == None else None
+                    )
+                except Exception as error:
+                    # A broken process pool is reported to the writer like a failed fetch.
+                    future = Future()
+                    future.set_exception(error)
+
+            future.add_done_callback(
+                lambda future, index=index, workshop=workshop, pages=pages:
+                    parsed_queue.put((index, future, workshop, pages))
+            )
+
+
+    def collect(self, future: Future, workshop: dict, pages: tuple):
+        """
+        Writer stage: combine a finished parse with the pages served from the cache and keep
+        the new parses in the cache. Returns the result tuple or the exception to raise.
+        """
+
+        try:
+            session_information, participants, error, seconds = future.result()
+        except Exception as error:
+            return error
+
+        if seconds != None:
+            record_span("parse", seconds)
+
+        if error != None:
+            return (workshop, None, None, error)
+
+        session_page, participant_page = pages
+        if session_information == None:
+            session_information = session_page["parsed"]
+        else:
+            self.connector.store_parsed_page(session_page, session_information)
+        if participants == None:
+            participants = participant_page["parsed"]
+        else:
+            self.connector.store_parsed_page(participant_page, participants)
+
+        return (workshop, session_information, participants, None)
+
+
+    def put(self, queue: Queue, item) -> None:
+        """Put item on a bounded queue, giving up once the pipeline is stopped."""
+
+        while not self.stopped.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return
+            except Full:
+                continue
+
+
+    def get(self, queue: Queue):
+        """Take the next item off a queue or return None once the pipeline is stopped."""
+
+        while not self.stopped.is_set():
+            try:
+                return queue.get(timeout=0.1)
+            except Empty:
+                continue
+
+        return None
+
+
+    def acquire(self, semaphore: Semaphore) -> bool:
+        """Wait for a free slot, returning False once the pipeline is stopped."""
+
+        while not self.stopped.is_set():
+            if semaphore.acquire(timeout=0.1):
+                return True
+
+        return False
+
+
+if __name__ == "__main__":
+    print("This is a module...")
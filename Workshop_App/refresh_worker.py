@@ -0,0 +1,46 @@
+# Module to run database refreshes away from the GUI thread.
+
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from threading import Event
+from workshop_tool import WorkshopsTool, RefreshCancelled
+from instrumentation import Operation
+
+
+class RefreshWorker(QThread):
+    """Thread that refreshes the workshop database and reports its progress through signals."""
+
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal()
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, ws: WorkshopsTool):
+        super().__init__()
+        self.ws = ws
+        self.cancel_event = Event()
+        self.operation = Operation("refresh")
+
+
+    def run(self) -> None:
+        """Refresh the database. Searches keep using the current database until it is swapped."""
+
+        try:
+            with self.operation:
+                self.ws.setup_workshop_information(progress_callback=self.progress.emit, cancel_event=self.cancel_event)
+        except RefreshCancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(error)
+        else:
+            self.succeeded.emit()
+
+
+    def cancel(self) -> None:
+        """Ask the refresh to stop. The current database is kept."""
+
+        self.cancel_event.set()
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -0,0 +1,184 @@
+# Module with the table model behind the search results view.
+
+# The model reads the workshop dictionaries of a search directly and only builds the rows the
+# view has scrolled to, FETCH_BATCH_SIZE at a time through canFetchMore/fetchMore, so showing
+# thousands of participants costs about the same as showing a screenful.
+
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QVariant
+from typing import Optional
+
+
+# (heading, workshop key, participant key) of each column. Workshop columns are filled on
+# the first row of a workshop, participant columns on every row.
+COLUMNS = (
+    ("Workshop Name", "workshop_name", None),
+    ("Session ID", "workshop_id", None),
+    ("Start Date", "workshop_start_date_and_time", None),
+    ("Participants", "workshop_signed_up", None),
+    ("Url", "workshop_url", None),
+    ("Name", None, "name"),
+    ("Email", None, "email"),
+    ("School", None, "school"),
+)
+FETCH_BATCH_SIZE = 256
+
+
+class WorkshopResultsModel(QAbstractTableModel):
+    """
+    Table of the workshops found by a search. With participants shown each participant gets a
+    row under its workshop, otherwise there is one row per workshop.
+    Sorting by a workshop column reorders the workshops, sorting by a participant column
+    reorders the participants within each workshop.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.workshops: list = list()
+        self.sorted_workshops: list = list()
+        self.show_participants: bool = False
+        self.participant_key: Optional[str] = None
+        self.participant_reverse: bool = False
+        self.rows: list = list()
+        self.next_workshop: int = 0
+
+
+    def set_workshops(self, workshops: list) -> None:
+        """Show the workshops of a new search in their search order."""
+
+        self.workshops = list(workshops)
+        self.participant_key = None
+        self.sorted_workshops = self.workshops
+        self.reset_rows()
+
+
+    def set_show_participants(self, show_participants: bool) -> None:
+        """Switch between one row per workshop and one row per participant."""
+
+        if show_participants != self.show_participants:
+            self.show_participants = show_participants
+            self.reset_rows()
+
+
+    def reset_rows(self) -> None:
+        """Start the rows again from the first workshop with the first batch already fetched."""
+
+        self.beginResetModel()
+        self.next_workshop = 0
+        # The view does not always ask for more rows after a reset, so the first batch is ready.
+        self.rows = self.make_next_rows()
+        self.endResetModel()
+
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and self.next_workshop < len(self.sorted_workshops)
+
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        """Add the rows of the next workshops, about FETCH_BATCH_SIZE of them."""
+
+        if parent.isValid():
+            return
+
+        new_rows: list = self.make_next_rows()
+        if len(new_rows) == 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(new_rows) - 1)
+        self.rows.extend(new_rows)
+        self.endInsertRows()
+
+
+    def make_next_rows(self) -> list:
+        """Return the rows of the next workshops to show and move past them."""
+
+        new_rows = list()
+        while len(new_rows) < FETCH_BATCH_SIZE and self.next_workshop < len(self.sorted_workshops):
+            new_rows.extend(self.make_rows(self.sorted_workshops[self.next_workshop]))
+            self.next_workshop += 1
+
+        return new_rows
+
+
+    def make_rows(self, workshop: dict) -> list:
+        """Return the (workshop, participant, first row of the workshop) rows of a workshop."""
+
+        participants: list = workshop["workshop_participant_info_list"]
+        if not self.show_participants or len(participants) == 0:
+            return [(workshop, None, True)]
+
+        if self.participant_key != None:
+            participants = sorted(
+                participants,
+                key=lambda participant: (participant[self.participant_key] or "").lower(),
+                reverse=self.participant_reverse
+            )
+
+        return [(workshop, participant, number == 0) for number, participant in enumerate(participants)]
+
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return QVariant()
+
+        workshop, participant, first_row = self.rows[index.row()]
+        heading, workshop_key, participant_key = COLUMNS[index.column()]
+
+        if workshop_key == "workshop_signed_up":
+            return f"{workshop['workshop_signed_up']}/{workshop['workshop_participant_capacity']}" if first_row else ""
+        elif workshop_key != None:
+            return str(workshop[workshop_key]) if first_row else ""
+        elif participant != None:
+            return participant[participant_key] or ""
+        else:
+            return ""
+
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+
+        return QVariant()
+
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+        """Sort by a column, or go back to the search order when column is -1."""
+
+        reverse: bool = order == Qt.DescendingOrder
+
+        if column < 0:
+            self.participant_key = None
+            self.sorted_workshops = self.workshops
+        elif COLUMNS[column][1] != None:
+            self.participant_key = None
+            self.sorted_workshops = sorted(self.workshops, key=self.get_sort_key(COLUMNS[column][1]), reverse=reverse)
+        else:
+            # Participants stay with their workshop, so only their order within it changes.
+            self.participant_key = COLUMNS[column][2]
+            self.participant_reverse = reverse
+
+        self.reset_rows()
+
+
+    def get_sort_key(self, workshop_key: str):
+        """Return the sort key function for a workshop column."""
+
+        if workshop_key == "workshop_start_date_and_time":
+            # workshop_start is the ISO timestamp of the start, which sorts in date order.
+            return lambda workshop: workshop["workshop_start"] or ""
+        elif workshop_key in ("workshop_id", "workshop_signed_up"):
+            return lambda workshop: int(workshop[workshop_key]) if str(workshop[workshop_key]).isdigit() else -1
+        else:
+            return lambda workshop: str(workshop[workshop_key]).lower()
+
+
+if __name__ == "__main__":
+    print("This is a module...")
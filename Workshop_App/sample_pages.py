@@ -0,0 +1,179 @@
+# Module to build stand-in copies of the workshop site pages.
+
+# The pages reproduce the markup that page_parser.py reads, surrounded by the kind of
+# navigation, scripts and form state the real ASP.NET pages carry, so parsing them costs
+# about the same as parsing the live site.
+
+
+from random import Random
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<title>{title}</title>
+<link rel="stylesheet" href="/css/bootstrap.min.css" />
+<script type="text/javascript">{script}</script>
+</head>
+<body>
+<form method="post" action="./{action}" id="aspnetForm">
+<div class="aspNetHidden">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{view_state}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{event_validation}" />
+</div>
+<nav class="navbar navbar-default">
+<ul class="nav navbar-nav">
+{navigation}
+</ul>
+</nav>
+<div class="container">
+{body}
+</div>
+<footer class="footer"><p>Professional Development Registration</p></footer>
+</form>
+</body>
+</html>
+"""
+
+CO_OPS = ["Arch Ford", "Crowley's Ridge", "Dawson", "DeQueen/Mena", "Great Rivers", "Northwest", "Ozarks Unlimited", "Wilbur Mills"]
+SUBJECTS = ["Algebra", "Computer Science", "Python", "Robotics", "Cyber Security", "Data Science", "Networking", "Web Design"]
+LEVELS = ["Introduction to", "Advanced", "Teaching", "Hands-on", "Summer Institute:"]
+SCHOOLS = ["High School", "Middle School", "Elementary", "Academy", "Junior High"]
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn", "Drew"]
+LAST_NAMES = ["Smith", "Johnson", "Lee", "Brown", "Garcia", "Miller", "Davis", "Wilson", "Moore", "Clark"]
+
+
+def make_page(title: str, action: str, body: str, seed: int = 0) -> str:
+    """Wrap page content in the shared layout with navigation, scripts and form state."""
+
+    random = Random(seed)
+    navigation: str = "\n".join(f'<li><a href="/page{i}.aspx">Menu item {i}</a></li>' for i in range(40))
+    script: str = "var theForm = document.forms['aspnetForm'];" * 50
+
+    return PAGE_TEMPLATE.format(
+        title=title,
+        action=action,
+        body=body,
+        navigation=navigation,
+        script=script,
+        view_state="".join(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdef0123456789+/") for _ in range(4000)),
+        event_validation="".join(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdef0123456789+/") for _ in range(400)),
+    )
+
+
+def make_workshop(workshop_id: int, seed: int = 0) -> dict:
+    """Return the made up details of one workshop in the form the pages are built from."""
+
+    random = Random(seed * 1_000_003 + workshop_id)
+    capacity: int = random.choice([20, 25, 30, 40])
+    number_of_days: int = random.choice([1, 1, 1, 2, 3])
+    month: int = random.randint(1, 12)
+    day: int = random.randint(1, 25)
+    year: int = random.choice([2021, 2022, 2023])
+
+    return {
+        "workshop_id": str(workshop_id),
+        "name": f"{workshop_id} {random.choice(LEVELS)} {random.choice(SUBJECTS)}",
+        "start": f"{month:02d}/{day:02d}/{year} {random.choice(['08', '09', '01'])}:{random.choice(['00', '30'])} {random.choice(['AM', 'PM'])}",
+        "dates": [f"{month:02d}/{day + offset:02d}/{year}" for offset in range(number_of_days)],
+        "location": f"{random.choice(CO_OPS)} - Room {random.randint(1, 20)}",
+        "description": " ".join(random.choice(SUBJECTS).lower() for _ in range(random.randint(20, 200))),
+        "fee": random.choice(["$0.00", "$25.00", "$50.00"]),
+        "credits": f"{random.choice([3, 6, 12])} hours",
+        "signed_up": random.randint(0, capacity),
+        "capacity": capacity,
+    }
+
+
+def make_participants(workshop: dict, seed: int = 0) -> list:
+    """Return [name, email, school] for everyone signed up to the workshop."""
+
+    random = Random(seed * 7_000_003 + int(workshop["workshop_id"]))
+    participants = list()
+
+    for number in range(workshop["signed_up"]):
+        first_name: str = random.choice(FIRST_NAMES)
+        last_name: str = random.choice(LAST_NAMES)
+        participants.append([
+            f"{first_name} {last_name}",
+            f"{first_name.lower()}.{last_name.lower()}{number}@example.org",
+            f"{random.choice(LAST_NAMES)} {random.choice(SCHOOLS)}",
+        ])
+
+    return participants
+
+
+def make_instructor_page(workshops: list) -> str:
+    """Build the instructor page listing every workshop with its start and enrollment."""
+
+    rows = ["<tr><th></th><th>Session</th><th>Enrollment</th></tr>"]
+    for workshop in workshops:
+        rows.append(
+            f'<tr><td><a href="/Session.aspx?id={workshop["workshop_id"]}">View</a></td>'
+            f'<td><em>{workshop["name"]}</em><br/>{workshop["start"]}</td>'
+            f'<td>{workshop["signed_up"]}</td></tr>'
+        )
+
+    body: str = '<table class="mainBody">\n' + "\n".join(rows) + "\n</table>"
+
+    return make_page("Instructor Sessions", "Instructor.aspx", body)
+
+
+def make_session_page(workshop: dict) -> str:
+    """Build the session page with the workshop details and the table of dates and locations."""
+
+    date_rows = "\n".join(
+        f"<tr><td>{date}\n</td><td>8:30 AM - 3:30 PM\n</td><td>{workshop['location']}</td></tr>"
+        for date in workshop["dates"]
+    )
+    body: str = f"""
+<h2><span id="ctl00_mainBody_lblTitle">{workshop["name"]}</span></h2>
+<div class="row">
+<p><span id="ctl00_mainBody_lblDescription">{workshop["description"]}</span></p>
+<p>Fee: <span id="ctl00_mainBody_lblFee">{workshop["fee"]}</span></p>
+<p>Credit: <span id="ctl00_mainBody_lblCredits">{workshop["credits"]}</span></p>
+<p>Seats: <span id="ctl00_mainBody_lblSeatsFilled">{workshop["signed_up"]} / {workshop["capacity"]}</span></p>
+</div>
+<div class="form-group col-xs-12 col-sm-12 mainBodySmall">
+<table>
+<tr><th colspan="3">Session Dates</th></tr>
+<tr><th>Date</th><th>Time</th><th>Location</th></tr>
+{date_rows}
+</table>
+</div>
+"""
+
+    return make_page(workshop["name"], f"Session.aspx?id={workshop['workshop_id']}", body, int(workshop["workshop_id"]))
+
+
+def make_participant_page(participants: list) -> str:
+    """Build the participant page with the RadGrid table of everyone signed up."""
+
+    rows = ["<tr><th></th><th>Name</th><th>Email</th><th>School</th></tr>"]
+    for participant in participants:
+        rows.append(
+            f'<tr><td><input type="checkbox" /></td><td>{participant[0]}</td>'
+            f"<td>{participant[1]}</td><td>{participant[2]}</td></tr>"
+        )
+
+    body: str = '<div class="RadGrid"><table id="RadGrid1_ctl00">\n' + "\n".join(rows) + "\n</table></div>"
+
+    return make_page("Participants", "Participants.aspx", body)
+
+
+def make_login_page() -> str:
+    """Build the sign-in page with its user name and password form."""
+
+    body: str = """
+<div class="login">
+<input name="ctl00$mainBody$txtUserName" type="text" id="ctl00_mainBody_txtUserName" />
+<input name="ctl00$mainBody$txtPassword" type="password" id="ctl00_mainBody_txtPassword" />
+<input type="submit" name="ctl00$mainBody$btnSubmit" value="Submit" id="ctl00_mainBody_btnSubmit" />
+</div>
+"""
+
+    return make_page("Sign In", "Login.aspx", body)
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -0,0 +1,87 @@
+# Module with the cache of recent search results.
+
+# WorkshopsTool keys each search by its phrase, date range and Session ID together with the
+# generation of the database, which every write to the workshops increases. Searching again
+# for the same thing, for example after changing only the display checkboxes, is answered
+# from memory, and a refresh changes the generation so older results are never served.
+# The least recently used results are dropped once there are more than max_entries, or more
+# than max_workshops workshops held in total.
+
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Optional
+from instrumentation import get_hit_rate, record_cache_lookup
+
+
+class SearchCache:
+    """Thread safe least recently used cache of search results, counted in the instrumentation."""
+
+    def __init__(self, max_entries: int = 32, max_workshops: int = 100000, name: str = "search cache"):
+        self.max_entries = max_entries
+        self.max_workshops = max_workshops
+        self.name = name
+        self.entries: OrderedDict = OrderedDict()
+        self.number_of_workshops: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.lock = Lock()
+
+
+    def get(self, key: Hashable) -> Optional[list]:
+        """Return a copy of the workshops cached under key, or None."""
+
+        with self.lock:
+            workshops: Optional[list] = self.entries.get(key)
+
+            if workshops == None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+        record_cache_lookup(self.name, workshops != None)
+
+        return list(workshops) if workshops != None else None
+
+
+    def put(self, key: Hashable, workshops: list) -> None:
+        """Cache the workshops under key and drop the least recently used results over the limits."""
+
+        with self.lock:
+            if key in self.entries:
+                self.number_of_workshops -= len(self.entries.pop(key))
+
+            self.entries[key] = list(workshops)
+            self.number_of_workshops += len(workshops)
+
+            # The newest results are kept even when they are over max_workshops on their own.
+            while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries or self.number_of_workshops > self.max_workshops
+            ):
+                self.number_of_workshops -= len(self.entries.popitem(last=False)[1])
+
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+
+        with self.lock:
+            self.entries.clear()
+            self.number_of_workshops = 0
+
+
+    def get_stats(self) -> dict:
+        """Return the hits, misses and hit rate since the cache was created, and its size."""
+
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": get_hit_rate(self.hits, self.misses),
+                "entries": len(self.entries),
+                "workshops": self.number_of_workshops,
+            }
+
+
+if __name__ == "__main__":
+    print("This is a module...")
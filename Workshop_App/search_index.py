@@ -0,0 +1,138 @@
+# Module with the in memory index that serves search as you type.
+
+# The index holds every workshop of the database, with its participants, and maps the words
+# of the names, descriptions and locations to the workshops using them. A search looks each
+# typed word up as a prefix in the sorted word list, so a keystroke costs a few set
+# intersections instead of a database query. Words are split and folded like the unicode61
+# tokenizer of the database's full text index, so results match the phrase search. Only the
+# ranking is simpler: workshops matching every word in their name come first, then the rest,
+# each in database order.
+
+
+from bisect import bisect_left
+from datetime import datetime
+from itertools import islice
+from re import compile
+from typing import Optional
+from unicodedata import combining, normalize
+
+
+# Runs of letters and digits, as the unicode61 tokenizer splits text.
+WORD_PATTERN = compile(r"[^\W_]+")
+
+
+def get_words(text: str) -> list:
+    """Return the lowercase words of text with accents removed."""
+
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(character for character in normalize("NFKD", text) if not combining(character))
+
+    return WORD_PATTERN.findall(text)
+
+
+class WorkshopSearchIndex:
+    """Word index over a list of workshops, searched with the filters of the database search."""
+
+    def __init__(self, workshops: list):
+        self.workshops = workshops
+        self.postings: dict = dict()
+        self.name_postings: dict = dict()
+
+        for position, workshop in enumerate(workshops):
+            name_words: set = set(get_words(workshop["workshop_name"]))
+            other_words: set = set(get_words(f"{workshop['workshop_description'] or ''} {workshop['workshop_location'] or ''}"))
+
+            for word in name_words:
+                self.name_postings.setdefault(word, set()).add(position)
+            for word in name_words | other_words:
+                self.postings.setdefault(word, set()).add(position)
+
+        self.words: list = sorted(self.postings)
+        self.name_words: list = sorted(self.name_postings)
+
+
+    def get_number_of_workshops(self) -> int:
+        """Return the number of workshops in the index."""
+
+        return len(self.workshops)
+
+
+    def search(
+        self,
+        phrase: str = "",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        workshop_id: Optional[str] = None
+    ) -> list:
+        """
+        Return the workshops matching every provided filter, like WorkshopDatabase.find_workshops.
+        Each word of phrase must start a word of the name, description or location.
+        """
+
+        positions: Optional[set] = self.find_positions(phrase, self.words, self.postings)
+
+        if positions == None:
+            ordered_positions = range(len(self.workshops))
+        else:
+            name_positions: set = self.find_positions(phrase, self.name_words, self.name_postings)
+            ordered_positions: list = sorted(name_positions) + sorted(positions - name_positions)
+
+        start: Optional[str] = start_date.isoformat(timespec="minutes") if start_date != None else None
+        end: Optional[str] = end_date.isoformat(timespec="minutes") if end_date != None else None
+
+        workshops = list()
+        for position in ordered_positions:
+            workshop: dict = self.workshops[position]
+
+            if workshop_id != None and workshop["workshop_id"] != workshop_id:
+                continue
+            if start != None and (workshop["workshop_start"] == None or workshop["workshop_start"] < start):
+                continue
+            if end != None and (workshop["workshop_start"] == None or workshop["workshop_start"] > end):
+                continue
+
+            workshops.append(workshop)
+
+        return workshops
+
+
+    def find_positions(self, phrase: str, words: list, postings: dict) -> Optional[set]:
+        """
+        Return the positions of the workshops having every word of phrase, or None when the
+        phrase has no words and everything matches. The last word split out of each typed
+        word is matched as a prefix, the others must match whole.
+        """
+
+        positions: Optional[set] = None
+
+        for typed_word in phrase.split():
+            parts: list = get_words(typed_word)
+            if len(parts) == 0:
+                continue
+
+            matches: set = self.find_prefix(parts[-1], words, postings)
+            for part in parts[:-1]:
+                matches = matches & postings.get(part, set())
+
+            positions = matches if positions == None else positions & matches
+            if len(positions) == 0:
+                break
+
+        return positions
+
+
+    def find_prefix(self, prefix: str, words: list, postings: dict) -> set:
+        """Return the positions of the workshops with a word starting with prefix."""
+
+        matches = set()
+        for word in islice(words, bisect_left(words, prefix), None):
+            if not word.startswith(prefix):
+                break
+            matches |= postings[word]
+
+        return matches
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -0,0 +1,55 @@
+# Module to run searches away from the GUI thread.
+
+# Every search gets its own worker. Starting a new search cancels the one before it, which
+# interrupts its database query, and results are only shown for the latest search, so the
+# newest query always wins however the searches finish.
+
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from threading import Event
+from typing import Callable
+from workshop_tool import SearchCancelled
+from instrumentation import Operation
+
+
+class SearchWorker(QThread):
+    """
+    Thread that runs one search and reports its result through signals.
+    search is called with the cancel event of the worker and returns the result to emit.
+    """
+
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, search: Callable[[Event], object], name: str = "search"):
+        super().__init__()
+        self.search = search
+        self.cancel_event = Event()
+        self.operation = Operation(name)
+
+
+    def run(self) -> None:
+        """Run the search, unless it was cancelled before the thread started."""
+
+        try:
+            with self.operation:
+                if self.cancel_event.is_set():
+                    raise SearchCancelled()
+                result = self.search(self.cancel_event)
+        except SearchCancelled:
+            self.cancelled.emit()
+        except Exception as error:
+            self.failed.emit(error)
+        else:
+            self.succeeded.emit(result)
+
+
+    def cancel(self) -> None:
+        """Ask the search to stop. Its result is not emitted once it is cancelled."""
+
+        self.cancel_event.set()
+
+
+if __name__ == "__main__":
+    print("This is a module...")
@@ -1,5 +1,3 @@
-from datetime import datetime
-
 class SpreadSheetBaseCreator:
     """Abstract class for the spread sheet tools."""
 
@@ -16,14 +14,14 @@ class SpreadSheetBaseCreator:
             workshop["workshop_id"],
             workshop["workshop_name"],
             workshop["workshop_start_date_and_time"],
-            int(workshop["workshop_signed_up"]),
+            workshop["workshop_signed_up"],
             workshop["workshop_participant_capacity"],
             co_op_session_location[location]["pd_doc_text"],
             workshop["workshop_url"],
             workshop["workshop_participant_info_list"],
             workshop["workshop_description"],
             workshop["workshop_location"],            
-            workshop["workshop_dates"].split("_"),
+            [session_date.strftime("%m/%d/%Y") for session_date in workshop["workshop_dates"]],
             workshop["workshop_credits"],
             workshop["workshop_fees"]
         ]
@@ -35,7 +33,7 @@ class SpreadSheetBaseCreator:
         """Formats all the dates."""
 
         dates_text: str = ""
-        dates: list = [datetime.strptime(date, "%m/%d/%Y") for date in workshop["workshop_dates"].split("_")]
+        dates: list = workshop["workshop_dates"]
         if len(dates) > 1:
             for date in dates:
                 if dates_text == "":
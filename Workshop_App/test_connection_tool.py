@@ -0,0 +1,131 @@
+# Tests for signing in and keeping the session of ConnectionTool. Run with: python -m pytest
+
+
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dump
+from threading import Thread
+from typing import Optional
+
+from connection_tool import ConnectionTool, LoginFailed
+from sample_pages import make_login_page
+from test_database import DatabaseTestCase
+
+
+class FakeSite(BaseHTTPRequestHandler):
+    """
+    Serves the sign-in page at /login and a page at /page for signed in sessions. Posting the
+    sign-in form starts a new session unless the server's reject_logins is set.
+    """
+
+    def do_GET(self):
+        if self.path == "/page" and self.get_session() in self.server.sessions:
+            self.send_page(b"<html>Workshops</html>")
+        else:
+            self.send_page(make_login_page().encode())
+
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.logins += 1
+
+        if self.server.reject_logins:
+            self.send_page(make_login_page().encode())
+            return
+
+        session: str = f"session{self.server.logins}"
+        self.server.sessions.add(session)
+        self.send_page(b"<html>Welcome</html>", f"session={session}; Path=/")
+
+
+    def get_session(self) -> str:
+        cookie: str = self.headers.get("Cookie", "")
+
+        return cookie.split("session=")[1].split(";")[0] if "session=" in cookie else ""
+
+
+    def send_page(self, content: bytes, cookie: Optional[str] = None) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        if cookie != None:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ConnectionToolTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSite)
+        self.server.sessions = set()
+        self.server.logins = 0
+        self.server.reject_logins = False
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.site_url: str = f"http://127.0.0.1:{self.server.server_port}"
+        self.write_connection_info("ada")
+
+
+    def write_connection_info(self, user_name: str) -> None:
+        with open("connection_info.json", "w") as f:
+            dump({
+                "signin_page_url": f"{self.site_url}/login",
+                "user_name": user_name,
+                "password": "secret",
+                "http_cache": False,
+            }, f)
+
+
+    def open_connector(self) -> ConnectionTool:
+        connector = ConnectionTool()
+        self.addCleanup(connector.session.close)
+        return connector
+
+
+    def test_expired_session_signs_in_again(self):
+        connector = self.open_connector()
+        self.assertEqual(connector.get_page(f"{self.site_url}/page").content, b"<html>Workshops</html>")
+
+        self.server.sessions.clear()
+
+        self.assertEqual(connector.get_page(f"{self.site_url}/page").content, b"<html>Workshops</html>")
+        self.assertEqual(self.server.logins, 2)
+
+
+    def test_still_signed_out_after_signing_in_raises(self):
+        self.server.reject_logins = True
+
+        with self.assertRaises(LoginFailed):
+            self.open_connector().get_page(f"{self.site_url}/page")
+
+
+    def test_saved_cookies_are_used_by_the_next_run(self):
+        connector = self.open_connector()
+        connector.get_page(f"{self.site_url}/page")
+        connector.close_session()
+
+        self.assertEqual(self.open_connector().get_page(f"{self.site_url}/page").content, b"<html>Workshops</html>")
+        self.assertEqual(self.server.logins, 1)
+
+
+    def test_saved_cookies_of_another_user_are_ignored(self):
+        connector = self.open_connector()
+        connector.get_page(f"{self.site_url}/page")
+        connector.close_session()
+
+        self.write_connection_info("alan")
+        self.open_connector().get_page(f"{self.site_url}/page")
+
+        self.assertEqual(self.server.logins, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
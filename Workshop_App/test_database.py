@@ -0,0 +1,113 @@
+# Tests for the workshop database. Run with: python -m pytest
+
+
+import unittest
+from os import chdir, getcwd
+from sqlite3 import connect
+from tempfile import TemporaryDirectory
+
+from database import WorkshopDatabase, ShadowWorkshopDatabase
+
+
+def make_workshop(number: int, name: str = "Robotics For Beginners") -> dict:
+    """Return a scraped workshop as WorkshopDatabase.add_workshops expects it."""
+
+    return {
+        "workshop_id": f"{100000 + number}",
+        "workshop_start_date_and_time": "03/14/2022 08:30 AM",
+        "workshop_url": f"https://example.com/session/{100000 + number}",
+        "workshop_name": f"{name} {number}",
+        "workshop_description": "Build and program a small robot.",
+        "workshop_signed_up": "2",
+        "workshop_participant_capacity": "20",
+        "workshop_location": "Main Campus - Room 4",
+        "workshop_credits": "1",
+        "workshop_fees": "0",
+        "workshop_dates": "03/14/2022",
+        "workshop_participant_info_list": [
+            {"name": "Ada", "email": f"ada{number}@example.com", "school": "North"},
+            {"name": "Alan", "email": f"alan{number}@example.com", "school": "South"},
+        ],
+    }
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Runs each test in an empty working folder, where the database files are created."""
+
+    def setUp(self):
+        self.folder = TemporaryDirectory()
+        self.original_folder = getcwd()
+        chdir(self.folder.name)
+
+
+    def tearDown(self):
+        chdir(self.original_folder)
+        self.folder.cleanup()
+
+
+class RefreshInfoTest(DatabaseTestCase):
+
+    def test_missing_database_has_no_refresh_info(self):
+        with WorkshopDatabase() as ws_db:
+            self.assertEqual(ws_db.get_workshop_refresh_info(), None)
+
+
+    def test_delete_workshops_removes_their_participants(self):
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(3)])
+            ws_db.delete_workshops([make_workshop(1)["workshop_id"]])
+
+            self.assertEqual(set(ws_db.get_workshop_refresh_info()), {"100000", "100002"})
+            self.assertEqual(len(ws_db.get_participant_info("100001")), 0)
+            self.assertEqual(len(ws_db.get_participant_info("100002")), 2)
+
+
+class ShadowSwapTest(DatabaseTestCase):
+
+    def test_swap_while_a_reader_is_open(self):
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(30)])
+
+        reader = WorkshopDatabase()
+        self.assertEqual(len(reader.get_all_workshops()), 30)
+
+        # A recent write leaves frames in the WAL of the live database.
+        with WorkshopDatabase() as ws_db:
+            ws_db.add_workshops([make_workshop(30)])
+
+        with ShadowWorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number, "Pottery") for number in range(40)])
+
+        # The open connection sees the new workshops, not the file it was opened on.
+        workshops: list = reader.get_all_workshops()
+        self.assertEqual(len(workshops), 40)
+        self.assertTrue(all(workshop["workshop_name"].startswith("Pottery") for workshop in workshops))
+        reader.c.close()
+        reader.connection.close()
+
+        connection = connect("workshops.db")
+        self.assertEqual(connection.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+        self.assertEqual(connection.execute("SELECT count(*) FROM workshops").fetchone()[0], 40)
+        connection.close()
+
+
+    def test_failed_build_keeps_the_live_database(self):
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(5)])
+
+        with self.assertRaises(RuntimeError):
+            with ShadowWorkshopDatabase() as ws_db:
+                ws_db.create_workshop_tables()
+                ws_db.add_workshops([make_workshop(number, "Pottery") for number in range(3)])
+                raise RuntimeError("crawl failed")
+
+        with WorkshopDatabase() as ws_db:
+            self.assertEqual(len(ws_db.get_all_workshops()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
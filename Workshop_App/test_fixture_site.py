@@ -0,0 +1,37 @@
+# Tests for the stand-in workshop site. Run with: python -m pytest
+
+
+import gc
+import unittest
+from weakref import ref
+
+from fixture_site import FixtureSite
+
+
+class FixtureSiteTest(unittest.TestCase):
+
+    def test_sites_do_not_share_their_pages(self):
+        first_site = FixtureSite(number_of_workshops=5, seed=1)
+        second_site = FixtureSite(number_of_workshops=5, seed=2)
+
+        first_page: bytes = first_site.make_page("participant_100000.html")
+
+        self.assertEqual(first_site.make_page("participant_100000.html"), first_page)
+        self.assertNotEqual(second_site.make_page("participant_100000.html"), first_page)
+        self.assertEqual(first_site.make_page.cache_info().hits, 1)
+        self.assertEqual(second_site.make_page.cache_info().hits, 0)
+
+
+    def test_cached_pages_do_not_keep_the_site_alive(self):
+        site = FixtureSite(number_of_workshops=5)
+        site.make_page("instructor.html")
+        site_reference = ref(site)
+
+        del site
+        gc.collect()
+
+        self.assertEqual(site_reference(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# Tests for the persistent cache of parsed pages. Run with: python -m pytest
+
+
+import unittest
+from itertools import count
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from http_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        folder = TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.cache_file: str = path.join(folder.name, "http_cache.db")
+        # Every use of the cache happens one second after the last, so the LRU order is exact.
+        patcher = mock.patch("http_cache.time", side_effect=count(1000))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def open_cache(self, max_bytes: int = 1024 * 1024) -> ResponseCache:
+        cache = ResponseCache(self.cache_file, max_bytes)
+        self.addCleanup(cache.close)
+        return cache
+
+
+    def test_not_modified_response_reuses_the_parse(self):
+        cache = self.open_cache()
+        cache.store("session/1", {"ETag": '"v1"', "Last-Modified": "Mon, 14 Mar 2022"}, b"<html>", {"name": "Robotics"})
+
+        self.assertEqual(
+            cache.get_conditional_headers("session/1"),
+            {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 14 Mar 2022"}
+        )
+        self.assertEqual(cache.get_conditional_headers("session/2"), {})
+        self.assertEqual(cache.get_not_modified("session/1"), {"name": "Robotics"})
+        self.assertEqual(cache.get_not_modified("session/2"), None)
+
+        stats: dict = cache.get_stats()
+        self.assertEqual((stats["not_modified_hits"], stats["misses"]), (1, 1))
+
+
+    def test_unchanged_body_is_found_by_its_hash(self):
+        cache = self.open_cache()
+        cache.store("session/1", {}, b"<html>first</html>", ["Ada"])
+
+        self.assertEqual(cache.get_unchanged("session/1", b"<html>first</html>"), ["Ada"])
+        self.assertEqual(cache.get_unchanged("session/1", b"<html>second</html>"), None)
+
+        stats: dict = cache.get_stats()
+        self.assertEqual((stats["unchanged_hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+
+    def test_entries_survive_reopening(self):
+        self.open_cache().store("session/1", {}, b"<html>", ["Ada"])
+
+        self.assertEqual(self.open_cache().get_unchanged("session/1", b"<html>"), ["Ada"])
+
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # Each entry takes len(url) + len('"page"') = 9 + 6 bytes, so two fit.
+        cache = self.open_cache(max_bytes=30)
+        cache.store("session/1", {}, b"1", "page")
+        cache.store("session/2", {}, b"2", "page")
+        cache.get_not_modified("session/1")
+        cache.store("session/3", {}, b"3", "page")
+
+        self.assertEqual(cache.get_not_modified("session/1"), "page")
+        self.assertEqual(cache.get_not_modified("session/2"), None)
+        self.assertEqual(cache.get_not_modified("session/3"), "page")
+
+
+if __name__ == "__main__":
+    unittest.main()
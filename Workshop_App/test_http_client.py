@@ -0,0 +1,83 @@
+# Tests for the retrying HTTP client used by the scraper. Run with: python -m pytest
+
+
+import unittest
+from unittest import mock
+
+from requests import Session
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout, ReadTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from http_client import ResilientHttpClient, make_client_settings
+
+
+class ResilientHttpClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = Session()
+        self.addCleanup(self.session.close)
+        self.client = ResilientHttpClient(self.session, make_client_settings({"backoff_seconds": 0, "circuit_breaker_failures": 100}))
+
+
+    def test_set_pool_size_closes_the_replaced_adapter(self):
+        old_adapter = self.session.adapters["https://"]
+
+        with mock.patch.object(old_adapter, "close") as close:
+            self.client.set_pool_size(20)
+
+        close.assert_called_once_with()
+        self.assertIsNot(self.session.adapters["https://"], old_adapter)
+        self.assertIs(self.session.adapters["http://"], self.session.adapters["https://"])
+
+
+    def test_retry_after_is_capped(self):
+        with mock.patch("http_client.sleep") as sleep:
+            self.client.wait_before_retry(0, "86400")
+
+        sleep.assert_called_once_with(self.client.max_backoff_seconds)
+
+        with mock.patch("http_client.sleep") as sleep:
+            self.client.wait_before_retry(0, "2")
+
+        sleep.assert_called_once_with(2)
+
+
+    def post_failing_with(self, error: Exception) -> int:
+        """POST while every attempt raises error and return the number of attempts."""
+
+        with mock.patch.object(self.session, "request", side_effect=error) as request:
+            with self.assertRaises(type(error)):
+                self.client.post("http://localhost/form", {"name": "value"})
+
+        return request.call_count
+
+
+    def test_post_is_retried_when_no_connection_was_made(self):
+        refused = RequestsConnectionError(
+            MaxRetryError(None, "/form", NewConnectionError(None, "Connection refused"))
+        )
+
+        self.assertEqual(self.post_failing_with(refused), self.client.max_retries + 1)
+        self.assertEqual(self.post_failing_with(ConnectTimeout()), self.client.max_retries + 1)
+
+
+    def test_post_failing_after_connect_is_not_retried(self):
+        # The form may have reached the site before the connection dropped or the read timed out.
+        dropped = RequestsConnectionError(ProtocolError("Connection aborted."))
+
+        self.assertEqual(self.post_failing_with(dropped), 1)
+        self.assertEqual(self.post_failing_with(ReadTimeout()), 1)
+
+
+    def test_get_failing_after_connect_is_retried(self):
+        dropped = RequestsConnectionError(ProtocolError("Connection aborted."))
+
+        with mock.patch.object(self.session, "request", side_effect=dropped) as request:
+            with self.assertRaises(RequestsConnectionError):
+                self.client.get("http://localhost/page")
+
+        self.assertEqual(request.call_count, self.client.max_retries + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
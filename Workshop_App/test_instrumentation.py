@@ -0,0 +1,78 @@
+# Tests for the spans and cache lookups that operations report. Run with: python -m pytest
+
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from threading import Barrier, Thread
+from unittest import mock
+
+import instrumentation
+from instrumentation import Operation, span, record_cache_lookup
+
+
+class OperationTest(unittest.TestCase):
+
+    def setUp(self):
+        # Keep the operations from writing to the timings log.
+        patcher = mock.patch.object(Operation, "write_log")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def test_overlapping_operations_only_see_their_own_spans(self):
+        # Both operations are running before either records anything, and both have
+        # recorded everything before either ends.
+        started = Barrier(2)
+        recorded = Barrier(2)
+        operations: dict = dict()
+
+        def fetch_page() -> None:
+            with span("fetch"):
+                record_cache_lookup("page cache", hit=False)
+
+        def refresh() -> None:
+            with Operation("refresh") as operation, ThreadPoolExecutor(max_workers=2) as executor:
+                started.wait()
+                futures = [executor.submit(copy_context().run, fetch_page) for _ in range(3)]
+                for future in futures:
+                    future.result()
+                recorded.wait()
+            operations["refresh"] = operation
+
+        def search() -> None:
+            with Operation("search") as operation:
+                started.wait()
+                with span("search"):
+                    record_cache_lookup("search cache", hit=True)
+                recorded.wait()
+            operations["search"] = operation
+
+        threads = [Thread(target=refresh), Thread(target=search)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(set(operations["refresh"].spans), {"fetch"})
+        self.assertEqual(operations["refresh"].spans["fetch"][0], 3)
+        self.assertEqual(operations["refresh"].cache_lookups, {"page cache": (0, 3)})
+        self.assertEqual(set(operations["search"].spans), {"search"})
+        self.assertEqual(operations["search"].cache_lookups, {"search cache": (1, 0)})
+
+
+    def test_nested_operations_both_see_the_inner_spans(self):
+        with Operation("export") as outer:
+            with span("write"):
+                pass
+            with Operation("search") as inner:
+                with span("search"):
+                    pass
+
+        self.assertEqual(set(outer.spans), {"write", "search"})
+        self.assertEqual(set(inner.spans), {"search"})
+        self.assertEqual(instrumentation.active_operations.get(), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
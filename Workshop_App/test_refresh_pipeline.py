@@ -0,0 +1,70 @@
+# Tests for the fetch, parse and write pipeline of a refresh. Run with: python -m pytest
+
+
+import unittest
+from threading import Lock
+from time import sleep
+
+from refresh_pipeline import RefreshPipeline
+
+
+class FakeConnector:
+    """
+    Stands in for ConnectionTool, serving pages that are already parsed so no parsing process
+    is needed. The session page of slow_url takes slow_seconds to fetch.
+    """
+
+    def __init__(self, slow_url: str = "", slow_seconds: float = 0.0):
+        self.slow_url = slow_url
+        self.slow_seconds = slow_seconds
+        self.fetched_urls = list()
+        self.lock = Lock()
+
+    def set_pool_size(self, pool_size: int) -> None:
+        pass
+
+    def get_participant_page_url(self, workshop_id: str) -> str:
+        return f"participants/{workshop_id}"
+
+    def fetch_page(self, url: str) -> dict:
+        if url == self.slow_url:
+            sleep(self.slow_seconds)
+        with self.lock:
+            self.fetched_urls.append(url)
+        return {"content": None, "parsed": {"url": url}}
+
+    def store_parsed_page(self, page: dict, parsed) -> None:
+        pass
+
+
+def make_workshops(number: int) -> list:
+    return [{"workshop_id": f"{index}", "workshop_url": f"session/{index}"} for index in range(number)]
+
+
+class RefreshPipelineTest(unittest.TestCase):
+
+    def test_results_keep_their_order(self):
+        pipeline = RefreshPipeline(FakeConnector(), fetch_workers=4, parse_processes=1, queue_size=8)
+
+        results: list = list(pipeline.run(make_workshops(100)))
+
+        self.assertEqual([workshop["workshop_id"] for workshop, *_ in results], [f"{index}" for index in range(100)])
+        self.assertTrue(all(error == None for *_, error in results))
+
+
+    def test_slow_workshop_does_not_let_the_crawl_run_ahead(self):
+        connector = FakeConnector(slow_url="session/0", slow_seconds=1.0)
+        pipeline = RefreshPipeline(connector, fetch_workers=4, parse_processes=1, queue_size=8)
+
+        results = pipeline.run(make_workshops(200))
+        next(results)
+        with connector.lock:
+            fetched_workshops: int = len(connector.fetched_urls) // 2
+
+        # Only a window of workshops is fetched while the first one is waited for.
+        self.assertLessEqual(fetched_workshops, 8 + 1)
+        self.assertEqual(len(list(results)), 199)
+
+
+if __name__ == "__main__":
+    unittest.main()
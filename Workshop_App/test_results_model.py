@@ -0,0 +1,60 @@
+# Tests for the table model behind the search results view. Run with: python -m pytest
+
+
+import unittest
+
+from PyQt5.QtCore import QModelIndex, Qt
+
+from results_model import WorkshopResultsModel, FETCH_BATCH_SIZE
+from test_database import make_workshop
+
+
+class ResultsModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = WorkshopResultsModel()
+        self.inserted: list = list()
+        self.model.rowsInserted.connect(lambda parent, first, last: self.inserted.append((first, last)))
+        # make_workshop gives every workshop two participants.
+        self.model.set_workshops([make_workshop(number) for number in range(300)])
+
+
+    def fetch_all(self) -> None:
+        while self.model.canFetchMore(QModelIndex()):
+            self.model.fetchMore(QModelIndex())
+
+
+    def test_rows_are_fetched_in_batches(self):
+        self.assertEqual(self.model.rowCount(), FETCH_BATCH_SIZE)
+        self.assertTrue(self.model.canFetchMore(QModelIndex()))
+
+        self.fetch_all()
+
+        self.assertEqual(self.model.rowCount(), 300)
+        self.assertEqual(self.inserted, [(FETCH_BATCH_SIZE, 299)])
+
+
+    def test_participant_rows_follow_their_workshop(self):
+        self.model.set_show_participants(True)
+        self.assertEqual(self.model.rowCount(), FETCH_BATCH_SIZE)
+
+        self.fetch_all()
+
+        self.assertEqual(self.model.rowCount(), 600)
+        self.assertEqual(self.inserted, [(FETCH_BATCH_SIZE, 2 * FETCH_BATCH_SIZE - 1), (2 * FETCH_BATCH_SIZE, 599)])
+        self.assertEqual(self.model.data(self.model.index(2, 1)), "100001")
+        self.assertEqual(self.model.data(self.model.index(3, 1)), "")
+        self.assertEqual(self.model.data(self.model.index(3, 6)), "alan1@example.com")
+
+
+    def test_sorting_starts_again_from_the_first_batch(self):
+        self.fetch_all()
+
+        self.model.sort(1, Qt.DescendingOrder)
+
+        self.assertEqual(self.model.rowCount(), FETCH_BATCH_SIZE)
+        self.assertEqual(self.model.data(self.model.index(0, 1)), "100299")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# Tests for the cache of recent search results. Run with: python -m pytest
+
+
+import unittest
+
+from database import WorkshopDatabase, ShadowWorkshopDatabase
+from search_cache import SearchCache
+from test_database import DatabaseTestCase, make_workshop
+from workshop_tool import WorkshopsTool
+
+
+class SearchCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_search_is_dropped(self):
+        cache = SearchCache(max_entries=2)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        cache.get("a")
+        cache.put("c", [3])
+
+        self.assertEqual(cache.get("a"), [1])
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("c"), [3])
+
+
+    def test_searches_are_dropped_over_the_workshop_limit(self):
+        cache = SearchCache(max_workshops=5)
+        cache.put("a", [1, 2, 3])
+        cache.put("b", [4, 5, 6])
+
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.get_stats()["workshops"], 3)
+
+        # The newest search is kept even when it is over the limit on its own.
+        cache.put("c", list(range(10)))
+        self.assertEqual(len(cache.get("c")), 10)
+
+
+    def test_cached_results_are_copies(self):
+        cache = SearchCache()
+        cache.put("a", [1, 2])
+        cache.get("a").append(3)
+
+        self.assertEqual(cache.get("a"), [1, 2])
+
+
+class SearchCacheGenerationTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ws = WorkshopsTool()
+
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(5)])
+
+
+    def test_repeated_search_is_answered_from_the_cache(self):
+        self.assertEqual(len(self.ws.search_workshops("robotics")), 5)
+        self.assertEqual(len(self.ws.search_workshops("robotics")), 5)
+
+        stats: dict = self.ws.search_cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+    def test_write_from_another_connection_invalidates_cached_searches(self):
+        self.assertEqual(len(self.ws.search_workshops("pottery")), 0)
+
+        # A refresh from the command line writes through its own connection.
+        with WorkshopDatabase() as ws_db:
+            ws_db.add_workshops([make_workshop(10, "Pottery")])
+
+        self.assertEqual(len(self.ws.search_workshops("pottery")), 1)
+
+        with WorkshopDatabase() as ws_db:
+            ws_db.delete_workshops([make_workshop(10)["workshop_id"]])
+
+        self.assertEqual(len(self.ws.search_workshops("pottery")), 0)
+
+
+    def test_full_refresh_invalidates_cached_searches(self):
+        self.assertEqual(len(self.ws.search_workshops("robotics")), 5)
+
+        # A shadow database starts counting writes from scratch, its generation must still be newer.
+        with ShadowWorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(3)])
+
+        self.assertEqual(len(self.ws.search_workshops("robotics")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# Tests for the in memory search index behind search as you type. Run with: python -m pytest
+
+
+import unittest
+
+from database import WorkshopDatabase
+from test_database import DatabaseTestCase, make_workshop
+from workshop_tool import WorkshopsTool
+
+
+class SearchIndexTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ws = WorkshopsTool()
+
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(5)])
+
+
+    def test_index_follows_writes_from_another_connection(self):
+        self.assertEqual(len(self.ws.search_workshops("pottery", use_index=True)), 0)
+
+        # A refresh from the command line writes through its own connection.
+        with WorkshopDatabase() as ws_db:
+            ws_db.add_workshops([make_workshop(10, "Pottery")])
+
+        self.assertEqual(len(self.ws.search_workshops("pottery", use_index=True)), 1)
+
+        with WorkshopDatabase() as ws_db:
+            ws_db.delete_workshops([make_workshop(10)["workshop_id"]])
+
+        self.assertEqual(len(self.ws.search_workshops("pottery", use_index=True)), 0)
+
+
+    def test_index_and_database_agree_on_punctuation(self):
+        with WorkshopDatabase() as ws_db:
+            ws_db.add_workshops([make_workshop(number, "C++ & Arduino") for number in range(10, 13)])
+
+        for phrase in ("-", "(", "*", '"', "- (", "robotics -", "c++", "robo-tics", "(arduino)", "&"):
+            with self.subTest(phrase=phrase):
+                database_ids: set = {workshop["workshop_id"] for workshop in self.ws.search_workshops(phrase)}
+                index_ids: set = {workshop["workshop_id"] for workshop in self.ws.search_workshops(phrase, use_index=True)}
+                self.assertEqual(database_ids, index_ids)
+
+        # Punctuation alone matches every workshop, like an empty phrase.
+        self.assertEqual(len(self.ws.search_workshops("-")), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+# Tests for the headless command line. Run with: python -m pytest
+
+
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import workshop_cli
+from database import WorkshopDatabase
+from test_database import DatabaseTestCase, make_workshop
+
+
+class SearchCommandTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        # make_workshop starts at 03/14/2022 08:30 AM.
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(1)])
+
+
+    def search(self, *arguments: str) -> str:
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(workshop_cli.main(["search", *arguments]), 0)
+
+        return output.getvalue()
+
+
+    def test_end_date_includes_the_whole_day(self):
+        self.assertIn("matching workshops: 1", self.search("--start-date", "2022-03-14", "--end-date", "2022-03-14"))
+        self.assertIn("matching workshops: 0", self.search("--end-date", "2022-03-13"))
+        self.assertIn("matching workshops: 0", self.search("--start-date", "2022-03-15"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+# Tests for starting the GUI program. Run with: python -m pytest
+
+
+import builtins
+import unittest
+from os import path
+from runpy import run_path
+
+
+class ProgramImportTest(unittest.TestCase):
+
+    def test_spawned_process_does_not_start_the_gui(self):
+        # A process spawned on Windows runs the main module again under this name.
+        original_import = builtins.__import__
+        program: dict = run_path(path.join(path.dirname(__file__), "workshop_program.pyw"), run_name="__mp_main__")
+
+        self.assertIs(builtins.__import__, original_import)
+        self.assertNotIn("GuiWindow", program)
+        self.assertNotIn("QApplication", program)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+# Tests for the refresh logic of WorkshopsTool. Run with: python -m pytest
+
+
+import unittest
+from datetime import datetime, timedelta
+from threading import Lock
+from time import sleep
+from typing import Optional
+from unittest import mock
+
+from database import WorkshopDatabase
+from test_database import DatabaseTestCase, make_workshop
+from workshop_tool import WorkshopsTool
+
+
+def make_instructor_row(number: int, start: str = "03/14/2022 08:30 AM", enrollment: str = "2 / 20") -> list:
+    """Return a row of the instructor page for the workshop of make_workshop(number)."""
+
+    return [f"{100000 + number} Robotics For Beginners {number}", start, enrollment]
+
+
+class NeedsRefreshTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # The connector signs in to the site, which a decision about stored rows never needs.
+        patcher = mock.patch("workshop_tool.ConnectionTool")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ws = WorkshopsTool()
+
+        refreshed_at: str = (datetime.now() - timedelta(days=1)).isoformat(timespec="seconds")
+        stale: dict = make_workshop(1)
+        stale["workshop_refreshed_at"] = (datetime.now() - timedelta(days=30)).isoformat(timespec="seconds")
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            fresh: dict = make_workshop(0)
+            fresh["workshop_refreshed_at"] = refreshed_at
+            ws_db.add_workshop(fresh)
+            ws_db.add_workshop(stale)
+            self.stored_workshops: dict = ws_db.get_workshop_refresh_info()
+
+        self.stale_before: str = (datetime.now() - timedelta(days=7)).isoformat(timespec="seconds")
+
+
+    def needs_refresh(self, row: list) -> bool:
+        return self.ws.needs_refresh(row, self.stored_workshops, self.stale_before)
+
+
+    def test_unchanged_recent_workshop_is_kept(self):
+        self.assertFalse(self.needs_refresh(make_instructor_row(0)))
+
+
+    def test_new_workshop_is_scraped(self):
+        self.assertTrue(self.needs_refresh(make_instructor_row(2)))
+
+
+    def test_changed_enrollment_is_scraped(self):
+        self.assertTrue(self.needs_refresh(make_instructor_row(0, enrollment="3 / 20")))
+
+
+    def test_moved_start_is_scraped(self):
+        self.assertTrue(self.needs_refresh(make_instructor_row(0, start="03/15/2022 08:30 AM")))
+
+
+    def test_stale_workshop_is_scraped(self):
+        self.assertTrue(self.needs_refresh(make_instructor_row(1)))
+
+
+class CrawlWorkshopsTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("workshop_tool.ConnectionTool")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ws = WorkshopsTool()
+        self.ws.get_connector()
+
+        self.scraped: list = list()
+        self.lock = Lock()
+
+
+    def construct_workshop(self, workshop_info: list) -> dict:
+        sleep(0.1)
+        with self.lock:
+            self.scraped.append(workshop_info[0])
+        return {"workshop_id": workshop_info[0][:6]}
+
+
+    def test_results_keep_the_instructor_page_order(self):
+        rows: list = [make_instructor_row(number) for number in range(20)]
+
+        with mock.patch.object(self.ws, "construct_workshop", side_effect=lambda row: {"workshop_id": row[0][:6]}):
+            workshops: list = list(self.ws.crawl_workshops(rows, max_workers=4))
+
+        self.assertEqual([workshop["workshop_id"] for workshop in workshops], [row[0][:6] for row in rows])
+
+
+    def test_closing_the_crawl_skips_the_queued_scrapes(self):
+        rows: list = [make_instructor_row(number) for number in range(40)]
+
+        with mock.patch.object(self.ws, "construct_workshop", side_effect=self.construct_workshop):
+            crawled_workshops = self.ws.crawl_workshops(rows, max_workers=2)
+            next(crawled_workshops)
+            # As after a failed database write: the threads finish their current scrape and stop.
+            crawled_workshops.close()
+
+        self.assertLessEqual(len(self.scraped), 4)
+
+
+class SetupWorkshopInformationTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("workshop_tool.ConnectionTool")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ws = WorkshopsTool()
+        self.connector = self.ws.get_connector()
+        self.connector.connection_info = dict()
+        self.connector.get_cache_stats.return_value = None
+        self.connector.get_latency_stats.return_value = dict()
+
+
+    def test_failed_instructor_page_still_closes_the_session(self):
+        self.connector.get_instructor_page.side_effect = ConnectionError("The site is down.")
+
+        with self.assertRaises(ConnectionError):
+            self.ws.setup_workshop_information()
+
+        self.connector.close_session.assert_called_once_with()
+        self.connector.get_latency_stats.assert_called_once_with()
+
+
+class UpdateWorkshopDatabaseTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ws = WorkshopsTool()
+
+        with WorkshopDatabase() as ws_db:
+            ws_db.create_workshop_tables()
+            ws_db.add_workshops([make_workshop(number) for number in range(20)])
+
+
+    def crawl(self, fail_after: Optional[int] = None):
+        """Yield renamed copies of the stored workshops, raising after fail_after of them."""
+
+        for number in range(20):
+            if number == fail_after:
+                raise ConnectionError("The site went down.")
+            yield make_workshop(number, "Pottery")
+
+
+    def test_incremental_refresh_is_swapped_in_complete(self):
+        self.ws.update_workshop_database(self.crawl(), ["100019"], batch_size=5)
+
+        with WorkshopDatabase() as ws_db:
+            self.assertEqual(len(ws_db.find_workshops("pottery")), 19)
+            self.assertEqual(len(ws_db.find_workshops("robotics")), 0)
+
+
+    def test_failed_incremental_refresh_leaves_the_database_untouched(self):
+        with self.assertRaises(ConnectionError):
+            self.ws.update_workshop_database(self.crawl(fail_after=12), ["100019"], batch_size=5)
+
+        with WorkshopDatabase() as ws_db:
+            self.assertEqual(len(ws_db.find_workshops("pottery")), 0)
+            self.assertEqual(len(ws_db.find_workshops("robotics")), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+# Headless command line for the workshop tools, for scheduled refreshes and exports.
+
+# It uses WorkshopsTool, ExcelCreator and GoogleSheetCreator directly and never imports PyQt,
+# so it runs on a server without a display, for example from cron:
+#   python workshop_cli.py refresh
+#   python workshop_cli.py export --phrase robotics --xlsx /srv/exports/robotics.xlsx
+#   python workshop_cli.py export --start-date 2022-06-01 --end-date 2022-08-31 --google "Summer" --folder FOLDER_URL
+# Like the app it reads connection_info.json, co_op_names.json and google_info.json from the
+# working folder, or from --data-folder. Exits with 1 when something failed.
+
+
+import sys
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from os import chdir, path
+from typing import Optional
+
+import instrumentation
+from connection_tool import LoginFailed
+from requests.exceptions import RequestException
+from workshop_tool import WorkshopsTool, RefreshCancelled
+
+
+def refresh(ws: WorkshopsTool, arguments: Namespace) -> int:
+    """Refresh the workshop database and print how it went."""
+
+    def show_progress(done: int, total: int) -> None:
+        if done == total or done % 100 == 0:
+            print(f"Updating database: {done}/{total} workshops")
+
+    try:
+        with instrumentation.Operation("refresh") as operation:
+            ws.setup_workshop_information(
+                max_workers=arguments.workers,
+                incremental=False if arguments.full else None,
+                progress_callback=show_progress
+            )
+    except FileNotFoundError:
+        print('Missing "connection_info.json". Cannot update database.', file=sys.stderr)
+        return 1
+    except LoginFailed:
+        print("Could not sign in to the workshop site. Check the user name and password in connection_info.json.", file=sys.stderr)
+        return 1
+    # Offline and timed out requests raise the requests errors, an open circuit ConnectionError.
+    except (ConnectionError, RequestException, RefreshCancelled) as error:
+        print(f"The database update failed, the saved database was kept: {error}", file=sys.stderr)
+        return 1
+
+    print(f"Your database has been updated! {operation.get_summary_text()}")
+
+    return 0
+
+
+def search(ws: WorkshopsTool, arguments: Namespace) -> list:
+    """Run the ID, date range or phrase search the arguments ask for, in that order of priority."""
+
+    ws.set_search_phrase(arguments.phrase)
+
+    if arguments.id != None:
+        return ws.get_matching_workshops_by_id(arguments.id)
+    elif arguments.start_date != None or arguments.end_date != None:
+        start_date: tuple = (arguments.start_date or datetime(1900, 1, 1)).timetuple()[:3]
+        end_date: tuple = (arguments.end_date or datetime(9999, 12, 31)).timetuple()[:3]
+        return ws.get_matching_workshops_by_date_range(start_date, end_date)
+    else:
+        return ws.get_matching_workshops()
+
+
+def print_search_results(ws: WorkshopsTool, arguments: Namespace) -> int:
+    """Search and print the matching workshops, and their emails when asked."""
+
+    workshops: list = search(ws, arguments)
+
+    print(f"Number of matching workshops: {ws.get_number_of_workshops()}")
+    print(f"Total Signed Up: {ws.get_number_of_participants()}")
+    print()
+    for workshop in workshops:
+        print(
+            f"{workshop['workshop_id']} - {workshop['workshop_start_date_and_time']} - "
+            f"{workshop['workshop_signed_up']}/{workshop['workshop_participant_capacity']} - {workshop['workshop_name']}"
+        )
+
+    if arguments.emails:
+        print()
+        print(ws.get_emails())
+
+    return 0
+
+
+def export(ws: WorkshopsTool, arguments: Namespace) -> int:
+    """Search and export the matching workshops to an .xlsx file and/or a new google sheet."""
+
+    if arguments.xlsx == None and arguments.google == None:
+        print("Nothing to export to, use --xlsx and/or --google.", file=sys.stderr)
+        return 1
+    if arguments.google != None and arguments.folder == None:
+        print("--google needs the Drive --folder to create the sheet in.", file=sys.stderr)
+        return 1
+
+    workshops: list = search(ws, arguments)
+    if len(workshops) == 0:
+        print("No workshops matched the search, nothing was exported.", file=sys.stderr)
+        return 1
+
+    try:
+        if arguments.xlsx != None:
+            from excel_creator import ExcelCreator
+
+            with instrumentation.Operation("excel export") as operation:
+                ExcelCreator().export_workshops_info(ws, arguments.xlsx)
+            print(f"Exported {len(workshops)} workshops to {arguments.xlsx}. {operation.get_summary_text()}")
+
+        if arguments.google != None:
+            from google_sheets_creator import GoogleSheetCreator
+
+            with instrumentation.Operation("google export") as operation:
+                GoogleSheetCreator().export_workshops_info(
+                    ws, (arguments.google, get_folder_id(arguments.folder)), arguments.service_account
+                )
+            print(f'Exported {len(workshops)} workshops to the google sheet "{arguments.google}". {operation.get_summary_text()}')
+    except FileNotFoundError as error:
+        print(f'Missing "{error.filename}". Cannot export.', file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def get_folder_id(folder: str) -> str:
+    """Return the ID of a Drive folder given its ID or its URL."""
+
+    if "folders/" in folder:
+        folder = folder.split("folders/")[1]
+
+    return folder.split("?")[0].strip("/")
+
+
+def parse_date(text: str) -> datetime:
+    """Read a YYYY-MM-DD date argument."""
+
+    return datetime.strptime(text, "%Y-%m-%d")
+
+
+def make_argument_parser() -> ArgumentParser:
+    """Build the parser for the refresh, search and export commands."""
+
+    argument_parser = ArgumentParser(description="Refresh, search and export the workshop database without the GUI.")
+    argument_parser.add_argument("--data-folder", help="folder with connection_info.json and the database, default the working folder")
+    argument_parser.add_argument("--profile", action="store_true", help="profile each operation, see instrumentation.py")
+    commands = argument_parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = commands.add_parser("refresh", help="update the workshop database from the site")
+    refresh_parser.add_argument("--full", action="store_true", help="scrape every workshop instead of only the changed ones")
+    refresh_parser.add_argument("--workers", type=int, help="pages fetched at once, default from connection_info.json")
+
+    search_arguments = ArgumentParser(add_help=False)
+    search_arguments.add_argument("--phrase", default="", help="words to search for, leave out to match every workshop")
+    search_arguments.add_argument("--start-date", type=parse_date, help="first day to search, YYYY-MM-DD")
+    search_arguments.add_argument("--end-date", type=parse_date, help="last day to search, YYYY-MM-DD")
+    search_arguments.add_argument("--id", help="Session ID, takes priority over phrase and date range")
+
+    search_parser = commands.add_parser("search", parents=[search_arguments], help="print the matching workshops")
+    search_parser.add_argument("--emails", action="store_true", help="also print the participant emails")
+
+    export_parser = commands.add_parser("export", parents=[search_arguments], help="export the matching workshops")
+    export_parser.add_argument("--xlsx", help="Excel file to write")
+    export_parser.add_argument("--google", metavar="NAME", help="name of a new google sheet to write")
+    export_parser.add_argument("--folder", help="ID or URL of the Drive folder for the google sheet")
+    export_parser.add_argument("--service-account", default="google_info.json", help="Google service account key file")
+
+    return argument_parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Run the command given on the command line and return the exit code."""
+
+    arguments: Namespace = make_argument_parser().parse_args(argv)
+
+    # Output files are relative to where the command was run, not to the data folder.
+    if getattr(arguments, "xlsx", None) != None:
+        arguments.xlsx = path.abspath(arguments.xlsx)
+    if getattr(arguments, "service_account", None) != None and path.exists(arguments.service_account):
+        arguments.service_account = path.abspath(arguments.service_account)
+    if arguments.data_folder != None:
+        chdir(arguments.data_folder)
+    if arguments.profile:
+        instrumentation.enable_profiling()
+
+    ws = WorkshopsTool()
+
+    if arguments.command == "refresh":
+        return refresh(ws, arguments)
+    elif arguments.command == "search":
+        return print_search_results(ws, arguments)
+    else:
+        return export(ws, arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
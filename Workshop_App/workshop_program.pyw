@@ -6,45 +6,74 @@
 
 
 import sys
-
-from PyQt5.QtWidgets import QApplication, QMainWindow
-from workshop_tool import WorkshopsTool
-from gui_window import GuiWindow
-from splash_screen import SplashScreen
-from excel_creator import ExcelCreator
-from google_sheets_creator import GoogleSheetCreator
-
-import helper_functions
+import instrumentation
 
 
 def main() -> None:
     """Main"""
 
+    # Run every refresh, search and export under cProfile and tracemalloc, see instrumentation.py.
+    if "--profile" in sys.argv:
+        instrumentation.enable_profiling()
+
     app = QApplication(sys.argv)
     main_window = QMainWindow()
     ui = GuiWindow()
     ui.setup_ui(main_window)
 
-    splash = SplashScreen()
     ws = WorkshopsTool()
-    ex_tool = ExcelCreator()
-    google_tool = GoogleSheetCreator()
     
     # Connect buttons and menu items.
     ui.buttonGetWorkshops.clicked.connect(lambda: helper_functions.generate_workshop_info(ui, ws))
+    ui.live_search_timer.timeout.connect(lambda: helper_functions.generate_workshop_info(ui, ws, live=True))
     ui.actionIncrease_CTRL.triggered.connect(ui.increase_font)
     ui.actionDecrease_CTRL.triggered.connect(ui.decrease_font)
-    ui.actionExport_To_Excel.triggered.connect(lambda: ex_tool.export_workshops_info(ws))
-    ui.actionExport_to_Google_Sheets.triggered.connect(lambda: google_tool.export_workshops_info(ws, ui))
+    ui.actionExport_To_Excel.triggered.connect(
+        lambda: helper_functions.run_timed(ui, "excel export", lambda: helper_functions.export_to_excel(ui, ws))
+    )
+    ui.actionExport_to_Google_Sheets.triggered.connect(
+        lambda: helper_functions.run_timed(ui, "google export", lambda: helper_functions.export_to_google_sheets(ui, ws))
+    )
     ui.actionUpdate_Credentials.triggered.connect(lambda: ui.creds_popup_box(ws))
     ui.actionUpdate_Database.triggered.connect( lambda: helper_functions.update_database(main_window, ws, ui))
+    ui.actionStartup_Report.triggered.connect(lambda: ui.startup_report_popup_box(instrumentation.import_timer.get_report()))
 
-    # Peform an initial update attempt of the database when the software is launched
-    helper_functions.update_database(main_window, ws, ui)
-    splash.close()
+    # Open straight away on the saved database and keep its age up to date.
+    ui.textOutputField.insertPlainText(helper_functions.get_startup_text())
+    helper_functions.update_data_age(ui, ws)
+    data_age_timer = QTimer()
+    data_age_timer.timeout.connect(lambda: helper_functions.update_data_age(ui, ws))
+    data_age_timer.start(60 * 1000)
     main_window.show()
+
+    # Startup ends once the window is up. Exporters imported later are not part of it.
+    instrumentation.import_timer.stop()
+    instrumentation.import_timer.write_log()
+    ui.statusbar.showMessage(instrumentation.import_timer.get_summary_text())
+
+    # Sign in and refresh in the background only when the saved database is missing or old.
+    try:
+        if ws.is_database_stale():
+            ui.textOutputField.clear()
+            helper_functions.update_database(main_window, ws, ui)
+    except FileNotFoundError:
+        ui.textOutputField.clear()
+        ui.textOutputField.insertPlainText(helper_functions.get_missing_file_text())
+
     sys.exit(app.exec_())
 
 
 if __name__ == "__main__":
+    # Time the imports below for the startup report under View > Startup Report. They are made
+    # here because the parsing processes spawned on Windows run this module again as
+    # __mp_main__, and must neither patch imports nor load PyQt.
+    instrumentation.import_timer.start()
+
+    from PyQt5.QtWidgets import QApplication, QMainWindow
+    from PyQt5.QtCore import QTimer
+    from workshop_tool import WorkshopsTool
+    from gui_window import GuiWindow
+
+    import helper_functions
+
     main()
@@ -3,9 +3,36 @@
 
 from json import load
 from connection_tool import ConnectionTool
-from re import search
-from datetime import datetime
-from database import WorkshopDatabase
+from datetime import datetime, timedelta
+from database import WorkshopDatabase, ShadowWorkshopDatabase, DATABASE_FILE
+from search_index import WorkshopSearchIndex
+from search_cache import SearchCache
+from sqlite3 import OperationalError
+from os import path, cpu_count
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from collections import deque
+from itertools import islice
+from refresh_pipeline import RefreshPipeline
+from instrumentation import span
+from threading import Event, Lock
+from typing import Callable, Iterator, Optional
+
+
+# Smaller crawls finish before a pool of parsing processes would have started.
+PIPELINE_MIN_WORKSHOPS = 100
+
+# Limits of the cache of recent database search results, see search_cache.py.
+SEARCH_CACHE_ENTRIES = 32
+SEARCH_CACHE_WORKSHOPS = 100000
+
+
+class RefreshCancelled(Exception):
+    """Raised when a database refresh is cancelled before it completes."""
+
+
+class SearchCancelled(Exception):
+    """Raised when a search is cancelled before it completes."""
 
 
 class WorkshopsTool:
@@ -13,52 +40,305 @@ class WorkshopsTool:
         self.number_of_workshops: int = 0
         self.number_of_participants: int = 0
         self.search_phrase: str = ""
-        self.connector = ConnectionTool()
+        # Created on first use so the app can open on the cached database without the network.
+        self.connector: Optional[ConnectionTool] = None
         self.searched_workshops = list()
         self.workshops_dict = dict()
+        # Built from the whole database on the first search as you type, see search_index.py.
+        self.search_index: Optional[WorkshopSearchIndex] = None
+        self.search_index_generation: int = 0
+        self.search_index_build_lock = Lock()
+        self.search_cache = SearchCache(SEARCH_CACHE_ENTRIES, SEARCH_CACHE_WORKSHOPS)
+
+
+    def setup_workshop_information(
+        self,
+        max_workers: Optional[int] = None,
+        incremental: Optional[bool] = None,
+        stale_after_days: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        cancel_event: Optional[Event] = None,
+        parse_processes: Optional[int] = None,
+        write_batch_size: Optional[int] = None
+    ) -> None:
+        """
+        Rip, organize, and clean the workshop information. Settings left as None come from
+        connection_info.json (see the README), and setting cancel_event raises RefreshCancelled.
+        """
 
+        self.get_connector()
+
+        if max_workers == None:
+            max_workers = int(self.connector.connection_info.get("max_workers", 8))
+        if incremental == None:
+            incremental = bool(self.connector.connection_info.get("incremental_refresh", True))
+        if stale_after_days == None:
+            stale_after_days = int(self.connector.connection_info.get("stale_after_days", 7))
+        if parse_processes == None:
+            parse_processes = int(self.connector.connection_info.get("parse_processes", cpu_count() or 1))
+        if write_batch_size == None:
+            write_batch_size = int(self.connector.connection_info.get("write_batch_size", 50))
+
+        self.connector.reset_stats()
+        crawled_workshops: Optional[Iterator] = None
+
+        try:
+            # Inside the try, so a site that is down or refuses the sign-in still closes the session.
+            workshops_from_instructor_page: list = self.connector.get_instructor_page()
+
+            stored_workshops: Optional[dict] = None
+            if incremental:
+                with WorkshopDatabase() as ws_db:
+                    stored_workshops = ws_db.get_workshop_refresh_info()
+
+            if stored_workshops != None:
+                stale_before: str = (datetime.now() - timedelta(days=stale_after_days)).isoformat(timespec="seconds")
+                workshops_to_crawl: list = [
+                    workshop_info for workshop_info in workshops_from_instructor_page
+                    if self.needs_refresh(workshop_info, stored_workshops, stale_before)
+                ]
+            else:
+                workshops_to_crawl: list = workshops_from_instructor_page
+
+            if parse_processes > 0 and max_workers > 1 and len(workshops_to_crawl) >= PIPELINE_MIN_WORKSHOPS:
+                crawled_workshops = self.crawl_workshops_pipelined(
+                    workshops_to_crawl, max_workers, parse_processes, progress_callback, cancel_event
+                )
+            else:
+                crawled_workshops = self.crawl_workshops(workshops_to_crawl, max_workers, progress_callback, cancel_event)
+
+            if stored_workshops != None:
+                current_ids: set = {workshop_info[0][:6] for workshop_info in workshops_from_instructor_page}
+                removed_ids: list = [workshop_id for workshop_id in stored_workshops if workshop_id not in current_ids]
+                self.update_workshop_database(crawled_workshops, removed_ids, write_batch_size, cancel_event)
+                print(f"Incremental refresh: {len(workshops_to_crawl)} of {len(workshops_from_instructor_page)} workshops scraped, {len(removed_ids)} removed.")
+            else:
+                self.construct_workshop_database(crawled_workshops, write_batch_size, cancel_event)
+        finally:
+            # Stops the crawl threads and processes if the database write failed part way.
+            if crawled_workshops != None:
+                crawled_workshops.close()
+            self.connector.close_session()
+            # Even a failed or cancelled refresh may have written some workshops. The database
+            # generation already keeps cached searches current, clearing also frees their memory.
+            self.invalidate_search_index()
+            self.search_cache.clear()
+            self.report_cache_stats(self.connector.get_cache_stats())
+            self.report_latency_stats(self.connector.get_latency_stats())
+
+
+    def crawl_workshops(
+        self,
+        workshops_to_crawl: list,
+        max_workers: int,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        cancel_event: Optional[Event] = None
+    ) -> Iterator[Optional[dict]]:
+        """
+        Scrape the instructor page rows with up to max_workers threads and yield the results in
+        the same order as the rows. Rows that could not be scraped, or were skipped after a
+        cancel, are None.
+        """
 
-    def setup_workshop_information(self) -> None:
-        """Rip, organize, and clean the workshop information."""
-
-        workshops_from_instructor_page: list = self.connector.get_instructor_page()
+        def crawl(workshop_info: list) -> Optional[dict]:
+            if cancel_event != None and cancel_event.is_set():
+                return None
+            return self.construct_workshop(workshop_info)
 
-        workshops = list()        
+        total: int = len(workshops_to_crawl)
 
-        for workshop_info in workshops_from_instructor_page:
+        if max_workers > 1:
+            self.connector.set_pool_size(max_workers)
+            rows = iter(workshops_to_crawl)
+            executor = ThreadPoolExecutor(max_workers=max_workers)
             try:
-                workshop = dict()
-
-                workshop["workshop_id"] = workshop_info[0][:6]
-                workshop["workshop_start_date_and_time"] = workshop_info[1]          
-                workshop["workshop_url"] = f'{self.connector.get_connection_info_for("base_workshop_url")}{workshop["workshop_id"]}'
-
-                workshop_information: dict = self.connector.get_session_page_content(workshop["workshop_url"])
-                workshop["workshop_name"] = workshop_information["name"]
-                workshop["workshop_description"] = workshop_information["description"]
-                workshop["workshop_signed_up"] = workshop_information["seats_filled"].split(" / ")[0]
-                workshop["workshop_participant_capacity"] = workshop_information["seats_filled"].split(" / ")[1]
-                workshop["workshop_location"] =  workshop_information["location"]            
-                workshop["workshop_dates"] = workshop_information["dates"]
-                workshop["workshop_credits"] = workshop_information["credits"]
-                workshop["workshop_fees"] = workshop_information["fee"] 
-                workshop["workshop_participant_info_list"] = self.construct_participant_info(workshop["workshop_id"])
-                
-                workshops.append(workshop)    
-            except AttributeError as error:
-                print("Phantom Workshop", workshop["workshop_id"], workshop["workshop_url"])
-                print(error)
-    
-        self.construct_workshop_database(workshops)
-        self.connector.close_session()
+                # Only a few rows per thread are scraped ahead of the one being yielded, which
+                # keeps the output in instructor page order without holding every result.
+                # Each task runs in a copy of this context so its spans count towards the refresh.
+                futures = deque(
+                    executor.submit(copy_context().run, crawl, workshop_info) for workshop_info in islice(rows, max_workers * 4)
+                )
+                done: int = 0
+                while len(futures) > 0:
+                    workshop: Optional[dict] = futures.popleft().result()
+                    for workshop_info in islice(rows, 1):
+                        futures.append(executor.submit(copy_context().run, crawl, workshop_info))
+                    done += 1
+                    if progress_callback != None:
+                        progress_callback(done, total)
+                    yield workshop
+            finally:
+                # When the caller stops early only the scrapes already running are waited for.
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for index, workshop_info in enumerate(workshops_to_crawl):
+                workshop: Optional[dict] = crawl(workshop_info)
+                if progress_callback != None:
+                    progress_callback(index + 1, total)
+                yield workshop
+
+
+    def crawl_workshops_pipelined(
+        self,
+        workshops_to_crawl: list,
+        max_workers: int,
+        parse_processes: int,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        cancel_event: Optional[Event] = None
+    ) -> Iterator[Optional[dict]]:
+        """
+        Like crawl_workshops, but max_workers threads only fetch the pages and parse_processes
+        processes parse them, so parsing a page never holds up the network.
+        """
+
+        pipeline = RefreshPipeline(self.connector, max_workers, parse_processes)
+        stubs: list = [self.make_workshop_stub(workshop_info) for workshop_info in workshops_to_crawl]
+        total: int = len(stubs)
+
+        for done, (workshop, workshop_information, participants, error) in enumerate(pipeline.run(stubs, cancel_event), start=1):
+            if progress_callback != None:
+                progress_callback(done, total)
+            if workshop_information != None:
+                yield self.complete_workshop(workshop, workshop_information, participants)
+            else:
+                if error != "Skipped":
+                    print("Phantom Workshop", workshop["workshop_id"], workshop["workshop_url"])
+                    print(error)
+                yield None
+
+
+    def get_connector(self) -> ConnectionTool:
+        """Return the connection tool, creating it the first time it is needed."""
+
+        if self.connector == None:
+            self.connector = ConnectionTool()
+
+        return self.connector
+
+
+    def get_last_refresh_time(self) -> Optional[datetime]:
+        """Return when the database was last refreshed or None if there are no workshops yet."""
+
+        if not path.exists(DATABASE_FILE):
+            return None
+
+        with WorkshopDatabase() as ws_db:
+            # An empty database file has never been refreshed, however new the file is.
+            if not ws_db.has_workshops():
+                return None
+            last_refreshed: Optional[str] = ws_db.get_info("last_refreshed")
+            first_refresh_started: Optional[str] = ws_db.get_info("first_refresh_started")
+
+        if last_refreshed != None:
+            return datetime.fromisoformat(last_refreshed)
+
+        # A first refresh that never finished leaves a partial database that needs refreshing.
+        if first_refresh_started != None:
+            return None
+
+        # Databases from before the refresh time was recorded.
+        return datetime.fromtimestamp(path.getmtime(DATABASE_FILE))
+
+
+    def is_database_stale(self) -> bool:
+        """
+        Return True if the database is missing or older than the "refresh_after_hours" entry of
+        connection_info.json (default 12).
+        """
+
+        last_refresh: Optional[datetime] = self.get_last_refresh_time()
+        if last_refresh == None:
+            return True
+
+        refresh_after_hours: float = float(self.get_connector().connection_info.get("refresh_after_hours", 12))
+
+        return datetime.now() - last_refresh > timedelta(hours=refresh_after_hours)
+
+
+    def needs_refresh(self, workshop_info: list, stored_workshops: dict, stale_before: str) -> bool:
+        """Return True if a row of the instructor page differs from, or is older than, the stored workshop."""
+
+        workshop_id: str = workshop_info[0][:6]
+
+        if workshop_id not in stored_workshops:
+            return True
+
+        start_date, signed_up, refreshed_at = stored_workshops[workshop_id]
 
-    def construct_participant_info(self, id: str) -> dict:
+        return (
+            start_date != workshop_info[1]
+            or signed_up != self.get_enrollment_count(workshop_info[2])
+            or refreshed_at < stale_before
+        )
+
+
+    def get_enrollment_count(self, enrollment: str) -> int:
+        """Return the signed up count from enrollment text such as "12" or "12 / 25", or -1 if unreadable."""
+
+        try:
+            return int(enrollment.split("/")[0].strip())
+        except ValueError:
+            return -1
+
+
+    def construct_workshop(self, workshop_info: list) -> Optional[dict]:
+        """
+        Returns a dictionary with all the information for one row of the instructor page or
+        None if the session page could not be scraped.
+        """
+
+        workshop: dict = self.make_workshop_stub(workshop_info)
+
+        try:
+            workshop_information: dict = self.connector.get_session_page_content(workshop["workshop_url"])
+            participants: list = self.connector.get_participant_page(workshop["workshop_id"])
+            return self.complete_workshop(workshop, workshop_information, participants)
+        except AttributeError as error:
+            print("Phantom Workshop", workshop["workshop_id"], workshop["workshop_url"])
+            print(error)
+            return None
+
+
+    def make_workshop_stub(self, workshop_info: list) -> dict:
+        """Return the ID, start and session page URL of one row of the instructor page."""
+
+        workshop = dict()
+
+        workshop["workshop_id"] = workshop_info[0][:6]
+        workshop["workshop_start_date_and_time"] = workshop_info[1]
+        workshop["workshop_url"] = f'{self.connector.get_connection_info_for("base_workshop_url")}{workshop["workshop_id"]}'
+
+        return workshop
+
+
+    def complete_workshop(self, workshop: dict, workshop_information: dict, participants: list) -> dict:
+        """Fill in a workshop stub from its parsed session page and participant list."""
+
+        workshop["workshop_name"] = workshop_information["name"]
+        workshop["workshop_description"] = workshop_information["description"]
+        workshop["workshop_signed_up"] = workshop_information["seats_filled"].split(" / ")[0]
+        workshop["workshop_participant_capacity"] = workshop_information["seats_filled"].split(" / ")[1]
+        workshop["workshop_location"] =  workshop_information["location"]
+        workshop["workshop_dates"] = workshop_information["dates"]
+        workshop["workshop_credits"] = workshop_information["credits"]
+        workshop["workshop_fees"] = workshop_information["fee"]
+        workshop["workshop_participant_info_list"] = self.make_participant_info(participants)
+        workshop["workshop_refreshed_at"] = datetime.now().isoformat(timespec="seconds")
+
+        return workshop
+
+
+    def construct_participant_info(self, id: str) -> list:
         """
         Returns a list of dictionaries with each participant's name, email, and school or
         returns an empty list if no participants were found.
         """
 
-        content: list = self.connector.get_participant_page(id)
+        return self.make_participant_info(self.connector.get_participant_page(id))
+
+
+    def make_participant_info(self, content: list) -> list:
+        """Turn the rows of a participant page into dictionaries with name, email, and school."""
 
         participants = list()
 
@@ -73,13 +353,123 @@ class WorkshopsTool:
         return participants
 
 
-    def construct_workshop_database(self, workshops: list):
-        """Create/update database and add all workshops to it."""
-        
-        with WorkshopDatabase() as ws_db:                  
+    def construct_workshop_database(
+        self,
+        workshops: Iterator[Optional[dict]],
+        batch_size: int = 50,
+        cancel_event: Optional[Event] = None
+    ) -> None:
+        """Build the database from scratch, writing the workshops in batches as they arrive."""
+
+        with WorkshopDatabase() as ws_db:
+            if not ws_db.has_workshops_table():
+                # There is nothing to keep, so each batch can be searched as soon as it is written.
+                ws_db.create_workshop_tables()
+                ws_db.set_info("first_refresh_started", datetime.now().isoformat(timespec="seconds"))
+                self.report_ingest(self.write_workshops(ws_db, workshops, batch_size, cancel_event))
+                ws_db.set_info("last_refreshed", datetime.now().isoformat(timespec="seconds"))
+                return
+
+        # Searches keep using the current database until the new one is complete.
+        with ShadowWorkshopDatabase() as ws_db:
             ws_db.create_workshop_tables()
-            for workshop in workshops:
-                ws_db.add_workshop(workshop)
+            self.report_ingest(self.write_workshops(ws_db, workshops, batch_size, cancel_event))
+            ws_db.set_info("last_refreshed", datetime.now().isoformat(timespec="seconds"))
+
+
+    def update_workshop_database(
+        self,
+        workshops: Iterator[Optional[dict]],
+        removed_ids: list,
+        batch_size: int = 50,
+        cancel_event: Optional[Event] = None
+    ) -> None:
+        """
+        Replace the provided workshops a batch at a time and delete the removed ones in a copy
+        of the live database, which is swapped in once the crawl is complete.
+        """
+
+        # Searches keep using the current database, and a failed refresh leaves it as it was.
+        with ShadowWorkshopDatabase(copy_current=True) as ws_db:
+            ws_db.create_workshop_tables(clear=False)
+            self.report_ingest(self.write_workshops(ws_db, workshops, batch_size, cancel_event, replace=True))
+            ws_db.delete_workshops(removed_ids)
+            ws_db.set_info("last_refreshed", datetime.now().isoformat(timespec="seconds"))
+
+
+    def write_workshops(
+        self,
+        ws_db: WorkshopDatabase,
+        workshops: Iterator[Optional[dict]],
+        batch_size: int,
+        cancel_event: Optional[Event] = None,
+        replace: bool = False
+    ) -> dict:
+        """
+        Write the workshops as they arrive in transactions of batch_size workshops, replacing
+        stored copies when replace is True. Raises RefreshCancelled once the crawl has stopped
+        if cancel_event is set. Returns the combined ingest statistics.
+        """
+
+        ingest_stats: dict = {"rows": 0, "seconds": 0.0, "rows_per_second": 0.0}
+        batch = list()
+
+        def write_batch() -> None:
+            with span("database write"):
+                batch_stats: dict = ws_db.add_workshops(batch, replace=replace)
+            ingest_stats["rows"] += batch_stats["rows"]
+            ingest_stats["seconds"] += batch_stats["seconds"]
+            batch.clear()
+
+        for workshop in workshops:
+            if workshop != None:
+                batch.append(workshop)
+            if len(batch) >= batch_size:
+                write_batch()
+
+        if cancel_event != None and cancel_event.is_set():
+            raise RefreshCancelled()
+
+        if len(batch) > 0:
+            write_batch()
+
+        if ingest_stats["seconds"] > 0:
+            ingest_stats["rows_per_second"] = ingest_stats["rows"] / ingest_stats["seconds"]
+
+        return ingest_stats
+
+
+    def report_cache_stats(self, cache_stats: Optional[dict]) -> None:
+        """Print how many scraped pages were served from the page cache."""
+
+        if cache_stats == None:
+            return
+
+        print(
+            f"Page cache: {cache_stats['hits']} hits ({cache_stats['not_modified_hits']} not modified, "
+            f"{cache_stats['unchanged_hits']} unchanged), {cache_stats['misses']} misses, "
+            f"{cache_stats['hit_rate']:.0%} hit rate."
+        )
+
+
+    def report_latency_stats(self, latency_stats: dict) -> None:
+        """Print the request latency percentiles of each endpoint."""
+
+        for endpoint, stats in latency_stats.items():
+            print(
+                f"{endpoint}: {stats['count']} requests, {stats['errors']} failed, "
+                f"p50 {stats['p50'] * 1000:.0f} ms, p90 {stats['p90'] * 1000:.0f} ms, "
+                f"p99 {stats['p99'] * 1000:.0f} ms, max {stats['max'] * 1000:.0f} ms."
+            )
+
+
+    def report_ingest(self, ingest_stats: dict) -> None:
+        """Print the throughput of a database ingest."""
+
+        print(
+            f"Ingested {ingest_stats['rows']} rows in {ingest_stats['seconds']:.2f}s "
+            f"({ingest_stats['rows_per_second']:.0f} rows/s)."
+        )
 
 
     def get_number_of_workshops(self) -> int:
@@ -99,12 +489,15 @@ class WorkshopsTool:
         return self.search_phrase
 
 
-    def get_emails(self) -> str:
-        """Returns a string of emails in a copy and past format for emailing participants."""
+    def get_emails(self, workshops: Optional[list] = None) -> str:
+        """
+        Returns a string of emails in a copy and past format for emailing participants.
+        Uses the most recent search results unless workshops is provided.
+        """
 
         emails = list()
 
-        for workshop in self.searched_workshops:
+        for workshop in (self.searched_workshops if workshops == None else workshops):
             # Check if there is participant information in the workshop.
             if workshop["workshop_participant_info_list"] != []:
                 for participant in workshop["workshop_participant_info_list"]:
@@ -121,67 +514,154 @@ class WorkshopsTool:
 
     def get_matching_workshops(self) -> list:
         """Return a list of workshops that are matching the current search phrase."""
-        
-        self.searched_workshops.clear()
-        self.workshops_dict.clear()
 
-        with WorkshopDatabase() as ws_db:
-            self.number_of_participants = 0
+        return self.set_search_results(self.search_workshops(phrase=self.search_phrase))
 
-            for workshop in ws_db.get_all_workshops():
-                if search(self.search_phrase.lower(), workshop["workshop_name"].lower()) != None:
-                    self.searched_workshops.append(workshop)
-                    self.number_of_participants += int(workshop["workshop_signed_up"])
 
-        self.number_of_workshops = len(self.searched_workshops)
+    def get_matching_workshops_by_date_range(self, start_date: tuple, end_date: tuple) -> list:
+        """Returns a list of workshops matching the current search phrase within a provided date range."""
 
-        return self.searched_workshops
+        return self.set_search_results(
+            self.search_workshops(phrase=self.search_phrase, start_date=start_date, end_date=end_date)
+        )
 
 
-    def get_matching_workshops_by_date_range(self, start_date: tuple, end_date: tuple) -> list:
-        """Returns al ist of matching workshops base on a provided date range."""
+    def get_matching_workshops_by_id(self, search_workshop_id: str) -> list:
+        """
+        Find workshops based on the workshopID and return when found.
+        This will take priority over phrase or date search.
+        """
 
-        # Get a copy of all workshops that match the entered search phrase.
-        workshops_to_check: list = self.get_matching_workshops()[:]
-        self.searched_workshops.clear()
+        return self.set_search_results(self.search_workshops(workshop_id=search_workshop_id))
 
-        searching_start_date: datetime = datetime(*start_date[:3])
-        searching_end_date: datetime = datetime(*end_date[:3])
 
-        self.number_of_participants = 0
-        
-        for workshop in workshops_to_check:
-            workshop_start_date: datetime = datetime.strptime(workshop["workshop_start_date_and_time"], "%m/%d/%Y %I:%M %p")            
+    def search_workshops(
+        self,
+        phrase: str = "",
+        start_date: Optional[tuple] = None,
+        end_date: Optional[tuple] = None,
+        workshop_id: Optional[str] = None,
+        cancel_event: Optional[Event] = None,
+        use_index: bool = False
+    ) -> list:
+        """
+        Return the workshops matching the search without storing them as the search results,
+        so searches can run on a background thread. Dates are (year, month, day) tuples and
+        both days are included in full. A workshop_id takes priority over the phrase and date
+        range.
+        Setting cancel_event interrupts the database query and raises SearchCancelled.
+        With use_index the in memory search index answers instead of the database.
+
+        Database results are cached by search and database generation, so repeating a search
+        is answered from memory until the workshops are written to again.
+        """
 
-            if workshop_start_date >= searching_start_date and workshop_start_date <= searching_end_date:
-                self.searched_workshops.append(workshop)
-                self.number_of_participants += int(workshop["workshop_signed_up"])
+        if workshop_id != None:
+            phrase, start_date, end_date = "", None, None
 
-        self.number_of_workshops = len(self.searched_workshops)
-        return self.searched_workshops
+        searching_start_date: Optional[datetime] = datetime(*start_date[:3]) if start_date != None else None
+        # Workshops start during the last day, not at its midnight, so the range runs to its last minute.
+        searching_end_date: Optional[datetime] = (
+            datetime(*end_date[:3]) + timedelta(days=1, minutes=-1) if end_date != None else None
+        )
 
+        if use_index:
+            search_index: WorkshopSearchIndex = self.get_search_index(cancel_event)
 
-    def get_matching_workshops_by_id(self, search_workshop_id: str) -> list:
+            with span("index search"):
+                workshops: list = search_index.search(phrase, searching_start_date, searching_end_date, workshop_id)
+        elif not path.exists(DATABASE_FILE):
+            # Searching must not create an empty database, which would pass for a fresh one.
+            print("No database located.")
+            workshops: list = list()
+        else:
+            try:
+                with span("search"), WorkshopDatabase() as ws_db:
+                    # The generation is read first, so results are never cached as newer than they are.
+                    search_key: tuple = (
+                        ws_db.get_generation(),
+                        phrase,
+                        tuple(start_date[:3]) if start_date != None else None,
+                        tuple(end_date[:3]) if end_date != None else None,
+                        workshop_id
+                    )
+                    workshops: Optional[list] = self.search_cache.get(search_key)
+
+                    if workshops == None:
+                        ws_db.set_cancel_event(cancel_event)
+                        workshops = ws_db.find_workshops(
+                            phrase=phrase,
+                            start_date=searching_start_date,
+                            end_date=searching_end_date,
+                            workshop_id=workshop_id
+                        )
+                        self.search_cache.put(search_key, workshops)
+            except OperationalError:
+                if cancel_event != None and cancel_event.is_set():
+                    raise SearchCancelled()
+                raise
+
+        if cancel_event != None and cancel_event.is_set():
+            raise SearchCancelled()
+
+        return workshops[:1] if workshop_id != None else workshops
+
+
+    def get_search_index(self, cancel_event: Optional[Event] = None) -> WorkshopSearchIndex:
         """
-        Find workshops based on the workshopID and return when found.
-        This will take priority over phrase or date search.
+        Return the in memory index of every workshop. It is built from the database the first
+        time, and again once the database generation shows the workshops were written to, by
+        this app or by another process such as the command line. Searches asking for it at the
+        same time wait for a single build. Setting cancel_event abandons the build and raises
+        SearchCancelled, the previous index is kept.
         """
 
-        self.searched_workshops.clear()
+        if not path.exists(DATABASE_FILE):
+            # Without a database the index stays empty until a refresh creates one.
+            return WorkshopSearchIndex(list())
 
-        with WorkshopDatabase() as ws_db:
-            self.number_of_participants = 0
+        with self.search_index_build_lock:
+            try:
+                with WorkshopDatabase() as ws_db:
+                    # Read before the workshops, so an index is never taken for newer than it is.
+                    generation: int = ws_db.get_generation()
+                    if self.search_index != None and generation == self.search_index_generation:
+                        return self.search_index
+
+                    ws_db.set_cancel_event(cancel_event)
+                    with span("search index build"):
+                        search_index = WorkshopSearchIndex(ws_db.get_all_workshops())
+            except OperationalError:
+                if cancel_event != None and cancel_event.is_set():
+                    raise SearchCancelled()
+                raise
+
+            self.search_index = search_index
+            self.search_index_generation = generation
+
+            return search_index
+
+
+    def invalidate_search_index(self) -> None:
+        """
+        Drop the search index so the next search builds a new one, even if a database that
+        was created again has come back to the generation of the old index.
+        """
 
-            for workshop in ws_db.get_all_workshops():
-                if search_workshop_id == workshop["workshop_id"]:
-                    self.searched_workshops.append(workshop)
-                    self.number_of_participants = int(workshop["workshop_signed_up"])
-                    self.number_of_workshops = 1
+        self.search_index = None
 
-                    return self.searched_workshops
 
-        self.number_of_workshops = 0
-        return self.search_workshops
+    def set_search_results(self, workshops: list) -> list:
+        """Store the workshops as the most recent search results and update the totals."""
+
+        self.searched_workshops.clear()
+        self.workshops_dict.clear()
+        self.searched_workshops.extend(workshops)
+
+        self.number_of_workshops = len(self.searched_workshops)
+        self.number_of_participants = sum(workshop["workshop_signed_up"] for workshop in self.searched_workshops)
+
+        return self.searched_workshops
 
 
     def get_most_recent_search_results(self) -> list:
@@ -200,10 +680,6 @@ class WorkshopsTool:
     def set_search_phrase(self, phrase: str) -> None:
         """Sets the phrase to be used in the search process."""
 
-        symbols_to_replace: str = "[]\\.^$*+{}|()"
-        for symbol in symbols_to_replace:
-            phrase: str = phrase.replace(symbol, f"\\{symbol}")
-
         self.search_phrase = phrase
 
 